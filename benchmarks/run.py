@@ -0,0 +1,454 @@
+"""
+БЕНЧМАРКИ ГОРЯЧИХ ПУТЕЙ
+=======================
+Замеры на фиксированных данных, без сети и без папок commands:
+
+    soccer365_page     - разбор страницы клуба soccer365 (team_parser.parse_team_page), на страницу
+    spider_player_page - TransfermarktSpider.parse со страницы игрока (с записью в файл команды), на страницу
+    readiness_squad    - PlayerAnalyzer.analyze_team (test.py), на состав
+    match_forecast     - calculate_match_probabilities, на матч
+    analyzer_folders   - готовность игроков + прогноз + сохранение по N папкам матчей, на папку
+
+Страницы лежат в benchmarks/fixtures/ и воспроизводят разметку soccer365 и Transfermarkt
+в объеме реальных страниц (меню, скрипты, новости). Составы и данные команд генерируются
+с фиксированным seed, поэтому каждый запуск меряет одно и то же.
+
+Каждый запуск дописывается строкой в benchmarks/history.jsonl (коммит, машина, параметры,
+min/median/mean/stdev секунд на единицу) и сравнивается с прошлым запуском на той же машине
+с теми же параметрами: замедление медианы больше REGRESSION_THRESHOLD помечается как регрессия.
+
+Пример:
+    python benchmarks/run.py
+    python benchmarks/run.py --only soccer365_page match_forecast --min-time 2
+    python benchmarks/run.py --folders 100 --strict
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+ANALYZER_DIR = os.path.join(PROJECT_ROOT, "football_analyzer")
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+HISTORY_FILE = os.path.join(BENCH_DIR, "history.jsonl")
+
+# Корень проекта и модули анализатора (в анализаторе плоские импорты)
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.append(ANALYZER_DIR)
+
+SEED = 39
+DEFAULT_FOLDERS = 20        # Папок матчей в analyzer_folders
+DEFAULT_SQUAD_SIZE = 25     # Игроков в синтетическом составе
+DEFAULT_MIN_TIME = 1.0      # Секунд замеров на бенчмарк
+MIN_ROUNDS = 5
+MAX_ROUNDS = 10000
+REGRESSION_THRESHOLD = 0.15  # Замедление медианы, считающееся регрессией
+
+# team_id, название, league_id и лига страницы из fixtures
+SOCCER365_TEAM = ("9", "Байер", "17", "Чемпионат Германии по футболу 2025/2026, Бундеслига")
+
+POSITIONS = (
+    ["Вратарь"] * 3
+    + ["Центральный защитник", "Левый защитник", "Правый защитник"] * 3
+    + ["Центральный полузащитник", "Опорный полузащитник", "Атакующий полузащитник"] * 3
+    + ["Центральный нападающий", "Левый вингер", "Правый вингер"] * 2
+)
+
+
+# ---------------------------------------------------------------------------
+# Синтетические данные
+# ---------------------------------------------------------------------------
+
+def synthetic_player(rnd: random.Random, team_name: str, number: int, position: str) -> Dict:
+    """Игрок в формате TransfermarktSpider"""
+    matches = rnd.randint(0, 300)
+    stats = {
+        'total_matches': matches,
+        'total_goals': rnd.randint(0, matches // 3 + 1),
+        'total_own_goals': rnd.randint(0, 3),
+        'total_substitutions_in': rnd.randint(0, matches // 4 + 1),
+        'total_substitutions_out': rnd.randint(0, matches // 3 + 1),
+        'total_yellow_cards': rnd.randint(0, matches // 5 + 1),
+        'total_yellow_red_cards': rnd.randint(0, 2),
+        'total_red_cards': rnd.randint(0, 2),
+        'total_minutes_played': matches * rnd.randint(40, 90),
+    }
+    if position == "Вратарь":
+        stats['total_goals'] = 0
+        stats['total_goals_conceded'] = rnd.randint(matches // 2, matches * 2 + 1)
+        stats['total_clean_sheets'] = rnd.randint(0, matches // 3 + 1)
+    else:
+        stats['total_assists'] = rnd.randint(0, matches // 3 + 1)
+        stats['total_penalty_goals'] = rnd.randint(0, 5)
+    return {
+        'name': f"#{number} Игрок {number}",
+        'position': position,
+        'age': rnd.randint(17, 36),
+        'height': rnd.randint(165, 200),
+        'stats': {'seasons': [], 'total_stats': stats},
+        'url': f"https://www.transfermarkt.world/-/leistungsdaten/spieler/{number}/plus/1",
+        'team': team_name
+    }
+
+
+def synthetic_squad(rnd: random.Random, team_name: str, size: int) -> List[Dict]:
+    return [synthetic_player(rnd, team_name, number, POSITIONS[(number - 1) % len(POSITIONS)])
+            for number in range(1, size + 1)]
+
+
+def synthetic_team_data(rnd: random.Random, team_id: int, team_name: str) -> Dict:
+    """Данные команды в формате team_parser.parse_team_page"""
+    last_results = [rnd.choice((0, 0.5, 1)) for _ in range(5)]
+    home = {'avg_scored': rnd.uniform(0.5, 3.0), 'avg_conceded': rnd.uniform(0.5, 2.5), 'matches_count': rnd.randint(5, 17)}
+    away = {'avg_scored': rnd.uniform(0.3, 2.5), 'avg_conceded': rnd.uniform(0.5, 3.0), 'matches_count': rnd.randint(5, 17)}
+    total = home['matches_count'] + away['matches_count']
+    return {
+        'team_id': str(team_id),
+        'team_name': team_name,
+        'team_url': f"https://soccer365.ru/clubs/{team_id}/",
+        'position_in_league': rnd.randint(1, 18),
+        'last_results': last_results,
+        'form_stats': {
+            'total_matches': len(last_results),
+            'wins': last_results.count(1),
+            'draws': last_results.count(0.5),
+            'losses': last_results.count(0),
+            'points': last_results.count(1) * 3 + last_results.count(0.5),
+            'form': ''.join(['W' if r == 1 else 'D' if r == 0.5 else 'L' for r in last_results])
+        },
+        'scoring_stats': {
+            'home': home,
+            'away': away,
+            'overall': {
+                'avg_scored': (home['avg_scored'] * home['matches_count'] + away['avg_scored'] * away['matches_count']) / total,
+                'avg_conceded': (home['avg_conceded'] * home['matches_count'] + away['avg_conceded'] * away['matches_count']) / total,
+                'total_matches': total
+            }
+        },
+        'league': "Бенчмарк-лига",
+        'league_id': "0"
+    }
+
+
+def build_match_folders(commands_dir: str, count: int, squad_size: int) -> List[str]:
+    """count папок матчей: анализ матча и составы обеих команд (как после парсеров)"""
+    from team_parser import build_match_analysis, save_match_analysis
+    from utils.artifacts import save_artifact
+
+    rnd = random.Random(SEED)
+    folders = []
+    for index in range(count):
+        home_name, away_name = f"Команда {2 * index + 1:03d}", f"Команда {2 * index + 2:03d}"
+        match_name = f"{home_name} - {away_name}"
+        data = {'league': "Бенчмарк-лига", 'matches': [{'match': match_name, 'date_time': "14.03, 17:30"}]}
+        analysis = build_match_analysis(match_name, data,
+                                        synthetic_team_data(rnd, 2 * index + 1, home_name),
+                                        synthetic_team_data(rnd, 2 * index + 2, away_name))
+        analysis_path = save_match_analysis(analysis, commands_dir)
+        folder = os.path.dirname(analysis_path)
+        for team_name in (home_name, away_name):
+            save_artifact(os.path.join(folder, f"{team_name}.json"), synthetic_squad(rnd, team_name, squad_size))
+        folders.append(folder)
+    return folders
+
+
+# ---------------------------------------------------------------------------
+# Бенчмарки: подготовка возвращает (замеряемая функция, единиц за вызов)
+# ---------------------------------------------------------------------------
+
+class BenchContext:
+    """Общие для бенчмарков параметры и рабочая папка"""
+
+    def __init__(self, workdir: str, folders: int, squad_size: int):
+        self.workdir = workdir
+        self.folders = folders
+        self.squad_size = squad_size
+        self._analyzer = None
+        self._readiness = None
+
+    def path(self, *parts: str) -> str:
+        path = os.path.join(self.workdir, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def analyzer_main(self):
+        """football_analyzer/main.py (имя main занято корневым main.py)"""
+        if self._analyzer is None:
+            from orchestrator import load_module
+            self._analyzer = load_module("analyzer_main", os.path.join(ANALYZER_DIR, "main.py"))
+        return self._analyzer
+
+    def readiness(self):
+        """test.py (имя test занято стандартной библиотекой)"""
+        if self._readiness is None:
+            from orchestrator import load_module
+            self._readiness = load_module("readiness", os.path.join(PROJECT_ROOT, "test.py"))
+            # test.py включает INFO-лог на каждую команду
+            logging.getLogger().setLevel(logging.WARNING)
+        return self._readiness
+
+
+def bench_soccer365_page(ctx: BenchContext) -> Tuple[Callable, int]:
+    from bs4 import BeautifulSoup
+    from team_parser import parse_team_page
+
+    with open(os.path.join(FIXTURES_DIR, "soccer365_club.html"), 'rb') as f:
+        raw = f.read()
+    team_id, team_name, league_id, league_name = SOCCER365_TEAM
+
+    def run():
+        soup = BeautifulSoup(raw, 'html.parser')
+        parse_team_page(soup, team_id, team_name, league_id=league_id, results_store=[], league_name=league_name)
+    return run, 1
+
+
+def bench_spider_player_page(ctx: BenchContext) -> Tuple[Callable, int]:
+    from scrapy import Request
+    from scrapy.http import HtmlResponse
+    from scraper.transfermarkt_spider import TransfermarktSpider
+    from utils.artifacts import save_artifact
+
+    team_name = "Команда 001"
+    match_folder = os.path.dirname(ctx.path("spider", "squad", "x"))
+    # Файл команды уже заполнен: сохранение игрока перечитывает и переписывает весь состав
+    squad = synthetic_squad(random.Random(SEED), team_name, ctx.squad_size)
+    save_artifact(os.path.join(match_folder, f"{team_name}.json"), squad)
+
+    responses = []
+    for index, fixture in enumerate(("transfermarkt_player.html", "transfermarkt_goalkeeper.html")):
+        with open(os.path.join(FIXTURES_DIR, fixture), 'rb') as f:
+            url = squad[index]['url']
+            responses.append(HtmlResponse(url=url, body=f.read(), encoding='utf-8', request=Request(url)))
+    spider = TransfermarktSpider(team_name=team_name, match_folder=match_folder)
+    spider.logger.logger.setLevel(logging.WARNING)
+
+    def run():
+        for response in responses:
+            spider.parse(response)
+    return run, len(responses)
+
+
+def bench_readiness_squad(ctx: BenchContext) -> Tuple[Callable, int]:
+    from utils.artifacts import save_artifact
+
+    analyzer = ctx.readiness().PlayerAnalyzer()
+    input_file = ctx.path("readiness", "Команда 001.json")
+    output_file = ctx.path("readiness", "Команда 001_res.json")
+    save_artifact(input_file, synthetic_squad(random.Random(SEED), "Команда 001", ctx.squad_size))
+
+    def run():
+        analyzer.analyze_team(input_file, output_file)
+    return run, 1
+
+
+def bench_match_forecast(ctx: BenchContext) -> Tuple[Callable, int]:
+    from analysis_utils import calculate_match_probabilities
+    from team_utils import TeamProfileCache, load_team_profile
+    from utils.artifacts import load_artifact
+
+    # Профили команд с готовностью игроков, как в анализаторе
+    commands_dir = ctx.path("forecast", "commands", "x")
+    folders = build_match_folders(os.path.dirname(commands_dir), ctx.folders, ctx.squad_size)
+    ctx.readiness().PlayerAnalyzer().analyze_all_teams_in_folder(os.path.dirname(commands_dir))
+    cache = TeamProfileCache()
+    pairs = []
+    for folder in folders:
+        analysis_file = next(f for f in os.listdir(folder) if f.endswith("_analysis.json"))
+        match_data = load_artifact(os.path.join(folder, analysis_file))
+        home, away = match_data["home_team"], match_data["away_team"]
+        pairs.append((
+            load_team_profile(home, True, home["team_name"], os.path.join(folder, f"{home['team_name']}_res.json"), cache),
+            load_team_profile(away, False, away["team_name"], os.path.join(folder, f"{away['team_name']}_res.json"), cache)
+        ))
+
+    def run():
+        for team1, team2 in pairs:
+            calculate_match_probabilities(dict(team1), dict(team2), "sunny", "обычный")
+    return run, len(pairs)
+
+
+def bench_analyzer_folders(ctx: BenchContext) -> Tuple[Callable, int]:
+    from team_utils import team_profile_cache
+
+    analyzer_main = ctx.analyzer_main()
+    player_analyzer = ctx.readiness().PlayerAnalyzer()
+    commands_dir = os.path.dirname(ctx.path("analyzer", "commands", "x"))
+    build_match_folders(commands_dir, ctx.folders, ctx.squad_size)
+
+    def run():
+        # Каждый прогон - с холодным кэшем профилей, как отдельный запуск анализатора
+        team_profile_cache.clear()
+        player_analyzer.analyze_all_teams_in_folder(commands_dir)
+        match_folders = analyzer_main.find_match_folders(commands_dir)
+        for outcome in analyzer_main.iter_match_outcomes(match_folders):
+            if outcome["error"] is not None:
+                raise RuntimeError(f"{outcome['match_folder']}: {outcome['error']}")
+            result = outcome["result"]
+            if result is not None and result["forecast"] is not None:
+                analyzer_main.save_match_forecast(result, outcome["match_folder"])
+    return run, ctx.folders
+
+
+BENCHMARKS = {
+    "soccer365_page": (bench_soccer365_page, "страница"),
+    "spider_player_page": (bench_spider_player_page, "страница"),
+    "readiness_squad": (bench_readiness_squad, "состав"),
+    "match_forecast": (bench_match_forecast, "матч"),
+    "analyzer_folders": (bench_analyzer_folders, "папка"),
+}
+
+
+# ---------------------------------------------------------------------------
+# Замеры и история
+# ---------------------------------------------------------------------------
+
+def measure(func: Callable, items: int, min_time: float) -> Dict:
+    """Прогоны func, пока не наберется min_time (не меньше MIN_ROUNDS); секунды на единицу"""
+    func()  # Прогрев: импорты, кэши разбора, первые файлы
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < MAX_ROUNDS and (len(timings) < MIN_ROUNDS or time.perf_counter() - started < min_time):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) / items)
+    return {
+        "items": items,
+        "rounds": len(timings),
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+    }
+
+
+def git_revision() -> Optional[str]:
+    """Короткий хэш коммита; '+' - есть незакоммиченные изменения"""
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=PROJECT_ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{revision}+" if dirty else revision
+
+
+def load_history(path: str) -> List[Dict]:
+    if not os.path.exists(path):
+        return []
+    history = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                history.append(json.loads(line))
+            except ValueError:
+                continue  # Недописанная строка прерванного запуска
+    return history
+
+
+def find_baseline(history: List[Dict], record: Dict, name: str) -> Optional[Dict]:
+    """Последний замер бенчмарка name на той же машине с теми же параметрами"""
+    for previous in reversed(history):
+        if (previous.get("host") == record["host"] and previous.get("params") == record["params"]
+                and name in previous.get("results", {})):
+            return previous
+    return None
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.2f} с"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} мс"
+    return f"{seconds * 1e6:.1f} мкс"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки парсинга, готовности игроков и прогнозов")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="только эти бенчмарки")
+    parser.add_argument("--folders", type=int, default=DEFAULT_FOLDERS, help="папок матчей (match_forecast, analyzer_folders)")
+    parser.add_argument("--squad-size", type=int, default=DEFAULT_SQUAD_SIZE, help="игроков в составе")
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME, help="секунд замеров на бенчмарк")
+    parser.add_argument("--history", default=HISTORY_FILE, help="файл истории (JSON Lines)")
+    parser.add_argument("--no-save", action="store_true", help="не дописывать запуск в историю")
+    parser.add_argument("--strict", action="store_true", help="код выхода 1 при регрессии")
+    args = parser.parse_args()
+
+    if sys.platform.startswith('win'):
+        sys.stdout.reconfigure(encoding='utf-8')
+
+    names = args.only or list(BENCHMARKS)
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_revision(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "params": {"folders": args.folders, "squad_size": args.squad_size},
+        "results": {}
+    }
+    history = load_history(args.history)
+
+    workdir = tempfile.mkdtemp(prefix="new_sport_bench_")
+    # Свой каталог артефактов: папки бенчмарка не попадают в каталог проекта
+    from utils import catalog
+    catalog.CATALOG_FILE = os.path.join(workdir, "catalog.sqlite")
+    catalog._catalog = None
+
+    ctx = BenchContext(workdir, args.folders, args.squad_size)
+    regressions = []
+    try:
+        print(f"⏱️ Бенчмарки: {', '.join(names)} (коммит {record['commit']}, папок {args.folders}, состав {args.squad_size})")
+        for name in names:
+            setup, unit = BENCHMARKS[name]
+            # Вывод стадий (print в парсерах и анализаторе) в замеры не попадает
+            with redirect_stdout(io.StringIO()):
+                func, items = setup(ctx)
+                result = measure(func, items, args.min_time)
+            result["unit"] = unit
+            record["results"][name] = result
+
+            line = (f"  {name:<20} {format_seconds(result['median']):>10}/{unit}"
+                    f"  (min {format_seconds(result['min'])}, ±{format_seconds(result['stdev'])}, прогонов {result['rounds']})")
+            baseline = find_baseline(history, record, name)
+            if baseline is not None:
+                previous = baseline["results"][name]["median"]
+                change = result["median"] / previous - 1
+                line += f"  {change:+.1%} к {baseline.get('commit')}"
+                if change > REGRESSION_THRESHOLD:
+                    line += "  ⚠️ регрессия"
+                    regressions.append(name)
+            print(line)
+    finally:
+        catalog._catalog = None
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if not args.no_save:
+        with open(args.history, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        print(f"📝 Результаты дописаны в {args.history}")
+
+    if regressions:
+        print(f"⚠️ Регрессии (медиана медленнее на {REGRESSION_THRESHOLD:.0%}+): {', '.join(regressions)}")
+        if args.strict:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,30 @@ DB_CONFIG = {
 
 TIMEOUT = 20
 
+# Формат артефактов в commands/: json (читаемый), orjson или msgpack (компактные, utils/artifacts.py)
+ARTIFACT_FORMAT = 'json'
+ARTIFACT_COMPRESS_LEVEL = 0  # zlib для orjson/msgpack: 0 - без сжатия, 1 - быстро, 9 - максимально
+
+# Каталог артефактов SQLite (путь от корня проекта, None - искать файлы обходом папок)
+CATALOG_FILE = 'catalog.sqlite'
+
+# Метрики стадий (utils/metrics.py): файл снимков JSON Lines от корня проекта, None - метрики выключены
+METRICS_FILE = None
+METRICS_PORT = None          # Порт /metrics для Prometheus (оркестратор, watch.py), None - не отдавать
+METRICS_FLUSH_INTERVAL = 30  # Секунд между снимками в файл
+
+# Статистика обходов пауков Transfermarkt (scraper/crawl_stats.py): JSON Lines от корня проекта
+CRAWL_STATS_FILE = 'crawl_stats.jsonl'
+
+# Травмы: JSON паука травм по матчам и колоночное хранилище для готовности игроков
+# (utils/injury_store.py, utils/injury_index.py), пути от корня проекта
+INJURIES_DIR = 'injuries'
+INJURY_STORE_DIR = 'injury_store'
+INJURY_CRAWL_STATE_FILE = 'injury_crawl_state.json'  # Хэши таблиц травм для main_injury_parser.py --incremental
+
+# Индекс названий команд soccer365 -> URL Transfermarkt (utils/team_resolver.py), путь от корня проекта
+TEAM_RESOLVER_FILE = 'team_resolver.json'
+
 
 # DB_CONFIG = {
 #     'host': 'localhost',
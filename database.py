@@ -5,11 +5,14 @@ import pymysql
 import logging
 from config import DB_CONFIG
 
+from utils import metrics
+
 
 class Database:
     def __init__(self):
         self.conn = self.create_db_connection()
 
+    @metrics.timed("db_query_seconds", db="mysql", call="connect")
     def create_db_connection(self):
         """Создать соединение с базой данных."""
         try:
@@ -20,6 +23,7 @@ class Database:
             logging.error(f"Ошибка подключения к БД: {err}")
             return None
 
+    @metrics.timed("db_query_seconds", db="mysql", call="save_team")
     def save_team(self, team_name, team_url):
         """Сохранить команду в БД."""
         with self.conn.cursor() as cursor:
@@ -48,6 +52,50 @@ class Database:
                 logging.error(f"Ошибка сохранения команды: {err}")
                 return None
 
+    @metrics.timed("db_query_seconds", db="mysql", call="save_teams")
+    def save_teams(self, teams):
+        """
+        Сохранить набор команд [(название, URL), ...] одной транзакцией: добавляются только
+        URL, которых еще нет в Teams (одним многострочным INSERT); существующие строки не
+        меняются - по их названиям команды ищет остальной код.
+        Возвращает (добавлено, конфликты): конфликты - [(название, URL, уже записанное
+        название)] для URL, который уже есть в БД или в наборе под другим названием.
+        """
+        by_url = {}
+        conflicts = []
+        for team_name, team_url in teams:
+            if not team_url:
+                continue
+            if team_url in by_url:
+                if by_url[team_url] != team_name:
+                    conflicts.append((team_name, team_url, by_url[team_url]))
+                continue
+            by_url[team_url] = team_name
+        if not by_url:
+            return 0, conflicts
+        with self.conn.cursor() as cursor:
+            try:
+                placeholders = ", ".join(["%s"] * len(by_url))
+                cursor.execute(f"SELECT team_url, team_name FROM Teams WHERE team_url IN ({placeholders})",
+                               list(by_url))
+                existing = {row[0]: row[1] for row in cursor.fetchall()}
+
+                inserts = [(name, url) for url, name in by_url.items() if url not in existing]
+                conflicts.extend((name, url, existing[url]) for url, name in by_url.items()
+                                 if url in existing and existing[url] != name)
+                if inserts:
+                    cursor.executemany("INSERT INTO Teams (team_name, team_url) VALUES (%s, %s)", inserts)
+                self.conn.commit()
+                logging.info(f"Команд добавлено: {len(inserts)}, уже были: {len(by_url) - len(inserts)}")
+                for name, url, other in conflicts:
+                    logging.warning(f"Команда '{name}': URL {url} уже записан как '{other}' - не сохранена")
+                return len(inserts), conflicts
+            except pymysql.Error as err:
+                self.conn.rollback()
+                logging.error(f"Ошибка сохранения команд: {err}")
+                return 0, conflicts
+
+    @metrics.timed("db_query_seconds", db="mysql", call="save_player")
     def save_player(self, team_id, player_url):
         """Сохранить игрока в БД с привязкой к team_id."""
         if team_id is None:
@@ -69,6 +117,7 @@ class Database:
                 logging.error(f"Ошибка сохранения игрока: {err}")
                 return False
 
+    @metrics.timed("db_query_seconds", db="mysql", call="get_players_by_team")
     def get_players_by_team(self, team_id):
         """Получить список игроков конкретной команды."""
         if not self.conn:
@@ -88,6 +137,7 @@ class Database:
             logging.error(f"Ошибка получения игроков команды {team_id}: {err}")
             return []
 
+    @metrics.timed("db_query_seconds", db="mysql", call="update_player_info")
     def update_player_info(self, player_id, full_name, position):
         """Обновить информацию об игроке."""
         with self.conn.cursor() as cursor:
@@ -103,6 +153,7 @@ class Database:
                 logging.error(f"Ошибка обновления игрока {player_id}: {err}")
                 return False
 
+    @metrics.timed("db_query_seconds", db="mysql", call="save_player_stats")
     def save_player_stats(self, player_id, tournament_stats):
         """Сохранить статистику игрока по турнирам."""
         with self.conn.cursor() as cursor:
@@ -139,6 +190,7 @@ class Database:
                 logging.error(f"Ошибка сохранения статистики игрока {player_id}: {err}")
                 return False
 
+    @metrics.timed("db_query_seconds", db="mysql", call="_get_or_create_tournament_id")
     def _get_or_create_tournament_id(self, tournament_name):
         """Получить или создать ID турнира."""
         with self.conn.cursor() as cursor:
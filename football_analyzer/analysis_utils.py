@@ -1,10 +1,15 @@
 # analysis_utils.py (добавьте новые функции)
 
 import json
-from typing import Dict
+from typing import Dict, Optional
 import os
+import sys
 from datetime import datetime
 
+# Корень проекта - для общих модулей из utils/
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import metrics
+
 def analyze_matchup(team1: Dict, team2: Dict) -> Dict:
     """Анализ противостояния команд"""
     analysis = {
@@ -48,38 +53,43 @@ def analyze_matchup(team1: Dict, team2: Dict) -> Dict:
     
     return analysis
 
-def calculate_match_probabilities(team1: Dict, team2: Dict, weather: str, match_type: str) -> Dict:
-    """Расчет вероятностей с динамическим подходом"""
-    
-    from probability_utils import calculate_motivation, calculate_goal_efficiency, detect_upset_potential, calculate_exact_scores_dynamic, calculate_1x2_from_poisson, calculate_totals_from_poisson, calculate_both_teams_to_score, calculate_individual_totals
+@metrics.timed("forecast_match_seconds")
+def calculate_match_probabilities(team1: Dict, team2: Dict, weather: str, match_type: str, params: Optional[Dict] = None,
+                                  market_ladder: Optional[Dict] = None, with_markets: bool = False) -> Dict:
+    """Расчет вероятностей с динамическим подходом
+    
+    params - словарь констант модели (по умолчанию probability_utils.DEFAULT_MODEL_PARAMS)
+    market_ladder - линии дополнительных рынков (по умолчанию markets.DEFAULT_MARKET_LADDER)
+    with_markets - считать ли раздел "Рынки" (~150 мкс на матч; включают вывод прогнозов
+                   и сервис, бэктесту и бенчмаркам он не нужен)
+    """
     
-    team1_motivation = calculate_motivation(team1, match_type)
-    team2_motivation = calculate_motivation(team2, match_type)
-    team1['motivation'] = team1_motivation
-    team2['motivation'] = team2_motivation
+    from probability_utils import build_match_context, calculate_outcomes_from_grid, calculate_individual_totals, detect_upset_potential, top_exact_scores
+    from markets import build_markets
     
-    goal_potential = calculate_goal_efficiency(team1, team2)
+    # Все промежуточные величины считаются один раз
+    context = build_match_context(team1, team2, match_type, params)
+    goal_potential = context["goal_potential"]
     
-    upset_potential = detect_upset_potential(team1, team2)
+    upset_potential = detect_upset_potential(team1, team2, context["form1"], context["form2"])
     
-    exact_scores = calculate_exact_scores_dynamic(
-        team1, team2, 
-        goal_potential["team1_goals"], 
-        goal_potential["team2_goals"]
-    )
+    outcomes_1x2, totals = calculate_outcomes_from_grid(context["grid"])
+    btts = context["both_teams_to_score"]
     
     forecasts = {
-        "1X2": calculate_1x2_from_poisson(exact_scores),
-        "Тоталы": calculate_totals_from_poisson(exact_scores),
+        "1X2": outcomes_1x2,
+        "Тоталы": totals,
         "Обе забьют": {
-            "Да": calculate_both_teams_to_score(team1, team2),
-            "Нет": 1 - calculate_both_teams_to_score(team1, team2)
+            "Да": btts,
+            "Нет": 1 - btts
         },
         "Индивидуальные тоталы": calculate_individual_totals(
             goal_potential["team1_goals"], 
-            goal_potential["team2_goals"]
+            goal_potential["team2_goals"],
+            context["pmf1"],
+            context["pmf2"]
         ),
-        "Точный счет": dict(sorted(exact_scores.items(), key=lambda x: x[1], reverse=True)[:10]),
+        "Точный счет": top_exact_scores(context["exact_scores"], 10),
         "Анализ матча": {
             **analyze_matchup(team1, team2),
             "upset_alert": any(upset_potential.values()),
@@ -88,6 +98,9 @@ def calculate_match_probabilities(team1: Dict, team2: Dict, weather: str, match_
         }
     }
     
+    if with_markets:
+        forecasts["Рынки"] = build_markets(context["grid"], market_ladder)
+    
     return forecasts
 
 def get_detailed_analysis_str(forecast, team1, team2) -> str:
@@ -162,6 +175,12 @@ def get_forecasts_str(forecast) -> str:
     for score, prob in list(forecast["Точный счет"].items())[:5]:
         lines.append(f"  {score}: {prob:.4f}")
     
+    if "Рынки" in forecast:
+        lines.append(f"\nРЫНКИ:")
+        for market, outcomes in forecast["Рынки"].items():
+            outcomes_str = ", ".join(f"{bet_type}: {prob:.2f}" for bet_type, prob in outcomes.items())
+            lines.append(f"  {market}: {outcomes_str}")
+    
     return "\n".join(lines)
 
 def save_forecast_to_json(forecast: Dict, team1: Dict, team2: Dict, match_data: Dict, output_dir: str = "forecasts") -> str:
@@ -0,0 +1,286 @@
+"""
+БЭКТЕСТ МОДЕЛИ ПРОГНОЗА
+=======================
+Прогоняет исторические матчи через calculate_match_probabilities и оценивает
+качество прогноза (log-loss, Brier, калибровка по рынкам).
+
+Поддерживает перебор констант модели (probability_utils.DEFAULT_MODEL_PARAMS)
+по сетке или случайно в пуле процессов. Данные команд (игроки, сила, характеристики)
+загружаются один раз, для каждой точки параметров пересчитывается только математика.
+
+Исторический матч - папка с *_analysis.json (и *_res.json при наличии), для которой
+известен итоговый счет: поле "result" в анализе ({"home_goals": 2, "away_goals": 1}),
+запись в файле результатов {"Арсенал - Эвертон": "2-1"} или матч в хранилище
+результатов (utils/results_store.py), сыгранный после даты анализа.
+
+Пример:
+    python backtest.py --fixtures commands --store ../results_store --grid grid.json --workers 4
+"""
+
+import argparse
+import copy
+import itertools
+import json
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from math import log
+from typing import Dict, List, Optional, Tuple
+
+from analysis_utils import calculate_match_probabilities
+from probability_utils import DEFAULT_MODEL_PARAMS
+from team_utils import load_team_profile
+
+# Корень проекта - для общих модулей из utils/
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.artifacts import load_artifact
+
+EPS = 1e-9                 # Защита от log(0)
+CALIBRATION_BUCKETS = 10   # Количество корзин калибровки
+
+# Бинарные рынки: (название, ключи прогноза, условие по счету)
+BINARY_MARKETS = [
+    ("П1", ("1X2", "П1"), lambda h, a: h > a),
+    ("X", ("1X2", "X"), lambda h, a: h == a),
+    ("П2", ("1X2", "П2"), lambda h, a: h < a),
+    ("ТБ 1.5", ("Тоталы", ">1.5"), lambda h, a: h + a > 1.5),
+    ("ТБ 2.5", ("Тоталы", ">2.5"), lambda h, a: h + a > 2.5),
+    ("Обе забьют", ("Обе забьют", "Да"), lambda h, a: h > 0 and a > 0),
+]
+
+# Данные воркера: заполняются один раз в initializer пула
+_WORKER_FIXTURES: List[Dict] = []
+
+# =============================================================================
+# ЗАГРУЗКА ИСТОРИЧЕСКИХ МАТЧЕЙ
+# =============================================================================
+
+def parse_score(score) -> Optional[Tuple[int, int]]:
+    """Преобразует '2-1' или {'home_goals': 2, 'away_goals': 1} в кортеж (2, 1)"""
+    try:
+        if isinstance(score, dict):
+            return int(score["home_goals"]), int(score["away_goals"])
+        home_goals, away_goals = str(score).replace(':', '-').split('-')
+        return int(home_goals), int(away_goals)
+    except (KeyError, ValueError, TypeError):
+        return None
+
+def find_score_in_store(results_store, match_data: Dict) -> Optional[Tuple[int, int]]:
+    """
+    Ищет в хранилище результатов первый матч пары команд после даты анализа
+    в лиге матча (кубковая встреча тех же команд - не результат этого матча)
+    """
+    try:
+        home_id = int(match_data["home_team"]["team_id"])
+        away_id = int(match_data["away_team"]["team_id"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    start = match_data.get("analysis_date", "")[:10] or None
+    league_id = str(match_data["home_team"].get("league_id", ""))
+    match = results_store.find_match(home_id, away_id, start=start,
+                                     league_id=int(league_id) if league_id.isdigit() else None)
+    return (match["home_goals"], match["away_goals"]) if match else None
+
+def load_fixtures(fixtures_dir: str, results_file: Optional[str] = None, store_dir: Optional[str] = None) -> List[Dict]:
+    """
+    Собирает исторические матчи с известным счетом.
+
+    Данные команд загружаются здесь один раз - это и есть кэш входных данных,
+    который затем раздается воркерам.
+    """
+    results = {}
+    if results_file:
+        with open(results_file, 'r', encoding='utf-8') as f:
+            results = json.load(f)
+
+    results_store = None
+    if store_dir:
+        from utils.results_store import ResultsStore
+        results_store = ResultsStore(store_dir)
+
+    fixtures = []
+    for root, dirs, files in os.walk(fixtures_dir):
+        analysis_files = [f for f in files if f.endswith("_analysis.json")]
+        if not analysis_files:
+            continue
+
+        match_data = load_artifact(os.path.join(root, analysis_files[0]))
+
+        match_name = match_data.get("match", "")
+        score = parse_score(match_data.get("result") or results.get(match_name))
+        if score is None and results_store is not None:
+            score = find_score_in_store(results_store, match_data)
+        home_data = match_data.get("home_team", {})
+        away_data = match_data.get("away_team", {})
+        if score is None or not home_data or not away_data:
+            continue
+
+        teams = []
+        for team_data, is_home in ((home_data, True), (away_data, False)):
+            team_name = team_data.get("team_name", "")
+            res_file = os.path.join(root, f"{team_name}_res.json")
+            teams.append(load_team_profile(team_data, is_home, team_name, res_file))
+
+        fixtures.append({
+            "match": match_name,
+            "date_time": match_data.get("date_time", ""),
+            "team1": teams[0],
+            "team2": teams[1],
+            "score": score
+        })
+
+    return fixtures
+
+# =============================================================================
+# МЕТРИКИ КАЧЕСТВА
+# =============================================================================
+
+def evaluate(fixtures: List[Dict], params: Dict) -> Dict:
+    """Прогоняет все матчи с заданными параметрами и считает метрики"""
+    log_loss_1x2 = 0.0
+    brier_1x2 = 0.0
+    markets = {name: {"log_loss": 0.0, "brier": 0.0, "buckets": [[0, 0.0, 0] for _ in range(CALIBRATION_BUCKETS)]}
+               for name, _, _ in BINARY_MARKETS}
+
+    for fixture in fixtures:
+        # Мелкая копия: calculate_match_probabilities дописывает в команды мотивацию
+        forecast = calculate_match_probabilities(
+            dict(fixture["team1"]), dict(fixture["team2"]),
+            weather="sunny", match_type="обычный", params=params, with_markets=False
+        )
+        home_goals, away_goals = fixture["score"]
+
+        outcome = "П1" if home_goals > away_goals else "X" if home_goals == away_goals else "П2"
+        log_loss_1x2 -= log(max(EPS, forecast["1X2"][outcome]))
+        brier_1x2 += sum((forecast["1X2"][key] - (1.0 if key == outcome else 0.0)) ** 2 for key in ("П1", "X", "П2"))
+
+        for name, (section, key), condition in BINARY_MARKETS:
+            prob = min(1 - EPS, max(EPS, forecast[section][key]))
+            hit = 1 if condition(home_goals, away_goals) else 0
+            market = markets[name]
+            market["log_loss"] -= log(prob) if hit else log(1 - prob)
+            market["brier"] += (prob - hit) ** 2
+            bucket = market["buckets"][min(CALIBRATION_BUCKETS - 1, int(prob * CALIBRATION_BUCKETS))]
+            bucket[0] += 1
+            bucket[1] += prob
+            bucket[2] += hit
+
+    count = max(1, len(fixtures))
+    report = {
+        "matches": len(fixtures),
+        "log_loss_1x2": log_loss_1x2 / count,
+        "brier_1x2": brier_1x2 / count,
+        "markets": {}
+    }
+    for name, market in markets.items():
+        report["markets"][name] = {
+            "log_loss": market["log_loss"] / count,
+            "brier": market["brier"] / count,
+            "calibration": [
+                {
+                    "bucket": f"{i / CALIBRATION_BUCKETS:.1f}-{(i + 1) / CALIBRATION_BUCKETS:.1f}",
+                    "count": n,
+                    "avg_predicted": round(pred_sum / n, 4),
+                    "observed": round(hits / n, 4)
+                }
+                for i, (n, pred_sum, hits) in enumerate(market["buckets"]) if n
+            ]
+        }
+    return report
+
+# =============================================================================
+# ПЕРЕБОР ПАРАМЕТРОВ
+# =============================================================================
+
+def apply_params(point: Dict) -> Dict:
+    """
+    Накладывает точку перебора на параметры по умолчанию.
+    Ключи таблицы мотивации задаются через точку: 'motivation_table.обычный'.
+    """
+    params = copy.deepcopy(DEFAULT_MODEL_PARAMS)
+    for key, value in point.items():
+        if '.' in key:
+            section, sub_key = key.split('.', 1)
+            params[section][sub_key] = value
+        else:
+            params[key] = value
+    return params
+
+def grid_points(grid: Dict[str, List]) -> List[Dict]:
+    """Все комбинации значений сетки"""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+def random_points(ranges: Dict[str, List[float]], count: int, seed: int = 42) -> List[Dict]:
+    """Случайные точки из диапазонов {'home_advantage': [1.0, 1.6], ...}"""
+    rng = random.Random(seed)
+    return [{key: rng.uniform(low, high) for key, (low, high) in ranges.items()} for _ in range(count)]
+
+def _init_worker(fixtures: List[Dict]) -> None:
+    """Передает воркеру загруженные матчи один раз при старте процесса"""
+    global _WORKER_FIXTURES
+    _WORKER_FIXTURES = fixtures
+
+def _evaluate_point(point: Dict) -> Dict:
+    """Задача воркера: оценка одной точки параметров"""
+    report = evaluate(_WORKER_FIXTURES, apply_params(point))
+    return {"params": point, **report}
+
+def run_sweep(fixtures: List[Dict], points: List[Dict], workers: int = None) -> List[Dict]:
+    """Оценивает все точки в пуле процессов, результаты отсортированы по log-loss 1X2"""
+    if workers == 1:
+        _init_worker(fixtures)
+        results = [_evaluate_point(point) for point in points]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(fixtures,)) as executor:
+            results = list(executor.map(_evaluate_point, points, chunksize=max(1, len(points) // 32)))
+    return sorted(results, key=lambda r: r["log_loss_1x2"])
+
+# =============================================================================
+# ТОЧКА ВХОДА
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Бэктест модели прогноза")
+    parser.add_argument("--fixtures", default="commands", help="папка с историческими матчами")
+    parser.add_argument("--results", help="JSON {матч: счет} для матчей без поля result")
+    parser.add_argument("--store", help="папка хранилища результатов (results_store)")
+    parser.add_argument("--grid", help="JSON сетки {параметр: [значения]}")
+    parser.add_argument("--random", type=int, default=0, help="количество случайных точек")
+    parser.add_argument("--ranges", help="JSON диапазонов {параметр: [min, max]} для --random")
+    parser.add_argument("--workers", type=int, default=None, help="количество процессов")
+    parser.add_argument("--out", default=f"backtest_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    args = parser.parse_args()
+
+    print(f"🔍 Загрузка исторических матчей из: {args.fixtures}")
+    fixtures = load_fixtures(args.fixtures, args.results, args.store)
+    print(f"📁 Матчей с известным счетом: {len(fixtures)}")
+    if not fixtures:
+        print("❌ Нет матчей для бэктеста!")
+        return
+
+    points = [{}]  # Базовая точка - текущие константы
+    if args.grid:
+        with open(args.grid, 'r', encoding='utf-8') as f:
+            points += grid_points(json.load(f))
+    if args.random and args.ranges:
+        with open(args.ranges, 'r', encoding='utf-8') as f:
+            points += random_points(json.load(f), args.random)
+
+    print(f"⚙️ Точек параметров: {len(points)}")
+    results = run_sweep(fixtures, points, args.workers)
+
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump({"generated": datetime.now().isoformat(), "results": results}, f, ensure_ascii=False, indent=2)
+
+    baseline = next(r for r in results if not r["params"])
+    best = results[0]
+    print(f"\n📊 Базовые константы: log-loss 1X2 {baseline['log_loss_1x2']:.4f}, Brier {baseline['brier_1x2']:.4f}")
+    print(f"🏆 Лучшая точка: log-loss 1X2 {best['log_loss_1x2']:.4f}, Brier {best['brier_1x2']:.4f}")
+    print(f"   Параметры: {best['params']}")
+    print(f"💾 Результаты сохранены в: {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+МИКРОБЕНЧМАРК РАСЧЕТА ПРОГНОЗА
+==============================
+Сравнивает задержку на один матч: прежняя цепочка публичных функций
+(каждая величина считается заново) против calculate_match_probabilities
+с контекстом матча. Заодно проверяет, что прогнозы совпадают
+(дополнительные рынки из markets.py замеряются отдельно).
+
+Варианты замеряются поочередно в нескольких прогонах (--runs); выводятся медиана
+и разброс (мин-макс) задержки и ускорения - один прогон на общей машине шумит.
+
+Пример:
+    python bench_forecast.py --commands commands --repeat 2000 --runs 7
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from analysis_utils import analyze_matchup, calculate_match_probabilities
+from probability_utils import (calculate_1x2_from_poisson, calculate_both_teams_to_score,
+                               calculate_exact_scores_dynamic, calculate_goal_efficiency,
+                               calculate_individual_totals, calculate_motivation,
+                               calculate_totals_from_poisson, detect_upset_potential)
+from team_utils import load_team_profile
+
+# Корень проекта - для общих модулей из utils/
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.artifacts import load_artifact
+
+def legacy_match_probabilities(team1: Dict, team2: Dict, weather: str, match_type: str) -> Dict:
+    """Прежняя реализация calculate_match_probabilities - эталон для сравнения"""
+    team1['motivation'] = calculate_motivation(team1, match_type)
+    team2['motivation'] = calculate_motivation(team2, match_type)
+
+    goal_potential = calculate_goal_efficiency(team1, team2)
+    upset_potential = detect_upset_potential(team1, team2)
+    exact_scores = calculate_exact_scores_dynamic(
+        team1, team2, goal_potential["team1_goals"], goal_potential["team2_goals"]
+    )
+
+    return {
+        "1X2": calculate_1x2_from_poisson(exact_scores),
+        "Тоталы": calculate_totals_from_poisson(exact_scores),
+        "Обе забьют": {
+            "Да": calculate_both_teams_to_score(team1, team2),
+            "Нет": 1 - calculate_both_teams_to_score(team1, team2)
+        },
+        "Индивидуальные тоталы": calculate_individual_totals(
+            goal_potential["team1_goals"], goal_potential["team2_goals"]
+        ),
+        "Точный счет": dict(sorted(exact_scores.items(), key=lambda x: x[1], reverse=True)[:10]),
+        "Анализ матча": {
+            **analyze_matchup(team1, team2),
+            "upset_alert": any(upset_potential.values()),
+            "upset_factors": upset_potential,
+            "goal_potential": goal_potential
+        }
+    }
+
+def load_pairs(commands_dir: str) -> List[Tuple[Dict, Dict]]:
+    """Профили команд всех матчей из папки commands"""
+    pairs = []
+    for root, dirs, files in os.walk(commands_dir):
+        analysis_files = [f for f in files if f.endswith("_analysis.json")]
+        if not analysis_files:
+            continue
+        match_data = load_artifact(os.path.join(root, analysis_files[0]))
+        home_data = match_data.get("home_team", {})
+        away_data = match_data.get("away_team", {})
+        if not home_data or not away_data:
+            continue
+        home_name = home_data.get("team_name", "")
+        away_name = away_data.get("team_name", "")
+        pairs.append((
+            load_team_profile(home_data, True, home_name, os.path.join(root, f"{home_name}_res.json")),
+            load_team_profile(away_data, False, away_name, os.path.join(root, f"{away_name}_res.json"))
+        ))
+    return pairs
+
+def time_per_match(func, pairs: List[Tuple[Dict, Dict]], repeat: int, **kwargs) -> float:
+    """Средняя задержка одного матча в микросекундах"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for team1, team2 in pairs:
+            func(dict(team1), dict(team2), "sunny", "обычный", **kwargs)
+    return (time.perf_counter() - start) / (repeat * len(pairs)) * 1e6
+
+def summary(values: List[float], unit: str) -> str:
+    """Медиана и разброс прогонов"""
+    return f"{statistics.median(values):.2f}{unit} (мин {min(values):.2f}, макс {max(values):.2f})"
+
+def main():
+    parser = argparse.ArgumentParser(description="Микробенчмарк расчета прогноза")
+    parser.add_argument("--commands", default="commands", help="папка с матчами")
+    parser.add_argument("--repeat", type=int, default=1000, help="количество повторов на матч")
+    parser.add_argument("--runs", type=int, default=5, help="количество прогонов каждого варианта")
+    args = parser.parse_args()
+
+    pairs = load_pairs(args.commands)
+    if not pairs:
+        print("❌ Нет матчей для бенчмарка!")
+        return
+
+    mismatches = 0
+    for team1, team2 in pairs:
+        legacy_forecast = legacy_match_probabilities(dict(team1), dict(team2), "sunny", "обычный")
+        forecast = calculate_match_probabilities(dict(team1), dict(team2), "sunny", "обычный", with_markets=False)
+        if legacy_forecast != forecast:
+            mismatches += 1
+
+    legacy, current, with_markets = [], [], []
+    for _ in range(max(args.runs, 1)):
+        legacy.append(time_per_match(legacy_match_probabilities, pairs, args.repeat))
+        current.append(time_per_match(calculate_match_probabilities, pairs, args.repeat, with_markets=False))
+        with_markets.append(time_per_match(calculate_match_probabilities, pairs, args.repeat, with_markets=True))
+    speedups = [old / new for old, new in zip(legacy, current)]
+
+    print(f"📁 Матчей: {len(pairs)}, повторов: {args.repeat}, прогонов: {len(legacy)}")
+    print(f"⏱️ Прежняя цепочка: {summary(legacy, ' мкс/матч')}")
+    print(f"⏱️ Контекст матча:  {summary(current, ' мкс/матч')}")
+    print(f"⏱️ С рынками:       {summary(with_markets, ' мкс/матч')}")
+    print(f"📈 Ускорение:       {summary(speedups, 'x')}")
+    print(f"{'✅ Прогнозы совпадают' if not mismatches else f'❌ Расхождений: {mismatches}'}")
+
+if __name__ == "__main__":
+    main()
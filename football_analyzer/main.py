@@ -1,8 +1,23 @@
+import argparse
+import io
 import os
 import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from datetime import datetime
-from team_utils import load_team_data_from_analysis, load_team_data_with_players
-from analysis_utils import calculate_match_probabilities, get_detailed_analysis_str, get_forecasts_str, save_all_forecasts_to_json  # ВСЁ из analysis_utils
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Корень проекта - для общих модулей из utils/
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import catalog, profiling
+from utils.artifacts import load_artifact, save_artifact
+from team_utils import load_team_profile, team_profile_cache
+from analysis_utils import calculate_match_probabilities  # ВСЁ из analysis_utils
+from renderers import DEFAULT_FORMATS, SINKS, create_sinks
+
+STREAM_POLL_INTERVAL = 5  # Секунд между проверками папок в режиме --stream
 
 def save_all_matches_to_json(all_matches_data: list, output_dir: str = "forecasts") -> str:
     """
@@ -36,18 +51,146 @@ def save_all_matches_to_json(all_matches_data: list, output_dir: str = "forecast
     print(f"\n📊 Все матчи сохранены в JSON: {filename}")
     return filename
 
-def process_all_matches(commands_dir: str = "commands") -> None:
-    """Обработка всех матчей в папке commands"""
+def forecast_match_folder(match_folder: str) -> Optional[Dict]:
+    """
+    Прогноз одного матча по его папке в commands.
+    
+    Returns:
+        None, если в папке нет файла анализа, иначе словарь
+        {analysis_file, match_data, team1, team2, forecast}; forecast = None,
+        если в анализе нет данных о командах
+    """
+    analysis_files = [f for f in os.listdir(match_folder) if f.endswith("_analysis.json")]
+    
+    if not analysis_files:
+        print(f"⚠️ В папке {match_folder} не найден файл анализа")
+        return None
+    
+    analysis_file = analysis_files[0]
+    analysis_path = os.path.join(match_folder, analysis_file)
+    
+    print(f"\n🔍 Обработка матча: {analysis_file}")
+    
+    match_data = load_artifact(analysis_path)
+    
+    result = {"analysis_file": analysis_file, "match_data": match_data, "team1": None, "team2": None, "forecast": None}
+    
+    match_name = match_data.get("match", "Неизвестный матч")
+    home_data = match_data.get("home_team", {})
+    away_data = match_data.get("away_team", {})
+    
+    if not home_data or not away_data:
+        print(f"⚠️ Нет данных о командах в матче: {match_name}")
+        return result
+    
+    home_team_name = home_data.get("team_name", "Команда 1")
+    away_team_name = away_data.get("team_name", "Команда 2")
+    
+    print(f"   Матч: {match_name}")
+    print(f"   Домашняя: {home_team_name}")
+    print(f"   Гостевая: {away_team_name}")
+    
+    home_res_file = os.path.join(match_folder, f"{home_team_name}_res.json")
+    away_res_file = os.path.join(match_folder, f"{away_team_name}_res.json")
+    
+    # Профили команд берутся из кэша, если команда уже встречалась
+    team1 = load_team_profile(home_data, True, home_team_name, home_res_file)
+    if not os.path.exists(home_res_file):
+        print(f"   ⚠️ Файл игроков для домашней команды не найден: {home_res_file}")
+    
+    team2 = load_team_profile(away_data, False, away_team_name, away_res_file)
+    if not os.path.exists(away_res_file):
+        print(f"   ⚠️ Файл игроков для гостевой команды не найден: {away_res_file}")
+    
+    result["team1"] = team1
+    result["team2"] = team2
+    result["forecast"] = calculate_match_probabilities(
+        team1=team1,
+        team2=team2,
+        weather="sunny",
+        match_type="обычный",
+        with_markets=True
+    )
+    return result
+
+def save_match_forecast(result: Dict, match_folder: str) -> str:
+    """
+    Сохраняет прогноз одного матча рядом с его анализом: {папка}/{матч}_forecast.json
+    
+    Returns:
+        Путь к сохраненному файлу
+    """
+    match_data = result["match_data"]
+    base_name = result["analysis_file"][:-len("_analysis.json")]
+    filename = os.path.join(match_folder, f"{base_name}_forecast.json")
+    
+    json_data = {
+        "match": match_data.get("match", ""),
+        "date_time": match_data.get("date_time", ""),
+        "league": match_data.get("league", ""),
+        "generated": datetime.now().isoformat(),
+        "forecast": result["forecast"]
+    }
+    
+    return save_artifact(filename, json_data)
+
+def find_match_folders(commands_dir: str = "commands") -> List[str]:
+    """Все папки с файлом *_analysis.json (из каталога артефактов)"""
+    return catalog.find_match_folders(commands_dir)
+
+def analyze_match_folder(match_folder: str) -> Dict:
+    """
+    Прогноз матча для сводки (только данные - отчеты строят приемники из renderers.py).
+    
+    Returns:
+        {match_folder, result, error, log, cache}: result - как у forecast_match_folder,
+        error - текст ошибки, log - вывод воркера (в главном процессе пустой, печать идет сразу),
+        cache - (попадания, расчеты) кэша профилей
+    """
+    hits, misses = team_profile_cache.hits, team_profile_cache.misses
+    outcome = {"match_folder": match_folder, "result": None, "error": None, "log": ""}
+    try:
+        outcome["result"] = forecast_match_folder(match_folder)
+    except Exception as e:
+        outcome["error"] = str(e)
+    outcome["cache"] = (team_profile_cache.hits - hits, team_profile_cache.misses - misses)
+    return outcome
+
+def _analyze_match_folder_worker(match_folder: str) -> Dict:
+    """Задача воркера: вывод перехватывается и печатается главным процессом по порядку матчей"""
+    log = io.StringIO()
+    with redirect_stdout(log):
+        outcome = analyze_match_folder(match_folder)
+    outcome["log"] = log.getvalue()
+    return outcome
+
+def iter_match_outcomes(match_folders: List[str], workers: int = 1) -> Iterator[Dict]:
+    """
+    Результаты analyze_match_folder в порядке match_folders.
+    workers > 1 - матчи распределяются по процессам (профили команд загружаются
+    в воркерах), результаты собираются в исходном порядке.
+    """
+    if workers <= 1 or len(match_folders) < 2:
+        for match_folder in match_folders:
+            with profiling.section(os.path.basename(match_folder)):
+                outcome = analyze_match_folder(match_folder)
+            yield outcome
+        return
+    
+    chunksize = max(1, len(match_folders) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(_analyze_match_folder_worker, match_folders, chunksize=chunksize)
+
+def process_all_matches(commands_dir: str = "commands", workers: int = 1, formats=DEFAULT_FORMATS) -> None:
+    """
+    Обработка всех матчей в папке commands (workers > 1 - в пуле процессов).
+    formats - форматы отчета из renderers.py; каждый матч дописывается в отчеты сразу после расчета.
+    """
     
     print(f"🔍 Поиск матчей в папке: {commands_dir}")
     
     # Находим все папки с матчами
-    match_folders = []
-    for root, dirs, files in os.walk(commands_dir):
-        for file in files:
-            if file.endswith("_analysis.json"):
-                match_folders.append(root)
-                break
+    match_folders = find_match_folders(commands_dir)
     
     print(f"📁 Найдено папок с матчами: {len(match_folders)}")
     
@@ -55,121 +198,179 @@ def process_all_matches(commands_dir: str = "commands") -> None:
         print("❌ Не найдены папки с матчами!")
         return
     
-    # Файл для сохранения результатов в TXT
-    output_file = f"all_matches_forecast_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-    
-    # Список для всех прогнозов в JSON формате
-    all_forecasts_json = []  # ИЗМЕНЕНО: для save_all_forecasts_to_json
+    sinks = create_sinks(formats)
+    summary = {
+        "total_matches": 0,
+        "processed_matches": 0,
+        "outputs": {fmt: sink.path for fmt, sink in sinks.items()}
+    }
+    cache_hits, cache_misses = 0, 0
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(f"📊 СВОДКА ПРОГНОЗОВ НА ВСЕ МАТЧИ\n")
-        f.write(f"Сгенерировано: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write("="*80 + "\n\n")
-        
-        total_matches = 0
-        processed_matches = 0
-        
-        for match_folder in match_folders:
-            analysis_files = [f for f in os.listdir(match_folder) if f.endswith("_analysis.json")]
+    for sink in sinks.values():
+        sink.open()
+    try:
+        for outcome in iter_match_outcomes(match_folders, workers):
+            print(outcome["log"], end="")
+            cache_hits += outcome["cache"][0]
+            cache_misses += outcome["cache"][1]
+            result = outcome["result"]
             
-            if not analysis_files:
-                print(f"⚠️ В папке {match_folder} не найден файл анализа")
+            if outcome["error"] is not None:
+                analysis_file = os.path.basename(outcome["match_folder"])
+                if result is not None:
+                    summary["total_matches"] += 1
+                    analysis_file = result["analysis_file"]
+                print(f"   ❌ Ошибка обработки матча {analysis_file}: {outcome['error']}")
+                for sink in sinks.values():
+                    sink.write_error(analysis_file, outcome["error"])
                 continue
             
-            analysis_file = analysis_files[0]
-            analysis_path = os.path.join(match_folder, analysis_file)
+            if result is None:
+                continue
             
-            print(f"\n🔍 Обработка матча: {analysis_file}")
+            summary["total_matches"] += 1
+            if result["forecast"] is None:
+                continue
             
-            try:
-                with open(analysis_path, 'r', encoding='utf-8') as af:
-                    match_data = json.load(af)
-                
-                total_matches += 1
-                
-                match_name = match_data.get("match", "Неизвестный матч")
-                home_data = match_data.get("home_team", {})
-                away_data = match_data.get("away_team", {})
-                
-                if not home_data or not away_data:
-                    print(f"⚠️ Нет данных о командах в матче: {match_name}")
-                    continue
-                
-                home_team_name = home_data.get("team_name", "Команда 1")
-                away_team_name = away_data.get("team_name", "Команда 2")
-                
-                print(f"   Матч: {match_name}")
-                print(f"   Домашняя: {home_team_name}")
-                print(f"   Гостевая: {away_team_name}")
-                
-                home_res_file = os.path.join(match_folder, f"{home_team_name}_res.json")
-                away_res_file = os.path.join(match_folder, f"{away_team_name}_res.json")
-                
-                if os.path.exists(home_res_file):
-                    team1 = load_team_data_with_players(home_data, True, home_team_name, home_res_file)
-                else:
-                    team1 = load_team_data_from_analysis(home_data, True, home_team_name)
-                    print(f"   ⚠️ Файл игроков для домашней команды не найден: {home_res_file}")
-                
-                if os.path.exists(away_res_file):
-                    team2 = load_team_data_with_players(away_data, False, away_team_name, away_res_file)
-                else:
-                    team2 = load_team_data_from_analysis(away_data, False, away_team_name)
-                    print(f"   ⚠️ Файл игроков для гостевой команды не найден: {away_res_file}")
-                
-                forecast = calculate_match_probabilities(
-                    team1=team1,
-                    team2=team2,
-                    weather="sunny",
-                    match_type="обычный"
-                )
-                
-                analysis_str = get_detailed_analysis_str(forecast, team1, team2)
-                forecasts_str = get_forecasts_str(forecast)
-                
-                f.write(f"\n🎯 МАТЧ: {match_name}\n")
-                f.write(f"📅 Дата: {match_data.get('date_time', 'Неизвестно')}\n")
-                f.write(f"🏆 Лига: {match_data.get('league', 'Неизвестно')}\n")
-                f.write("-"*60 + "\n")
-                f.write(analysis_str)
-                f.write("\n")
-                f.write(forecasts_str)
-                f.write("\n" + "="*80 + "\n\n")
-                
-                # Добавляем прогноз в список для JSON
-                all_forecasts_json.append(forecast)  # ИЗМЕНЕНО
-                
-                processed_matches += 1
-                print(f"   ✅ Обработан успешно")
-                
-            except Exception as e:
-                print(f"   ❌ Ошибка обработки матча {analysis_file}: {e}")
-                f.write(f"\n❌ ОШИБКА ОБРАБОТКИ МАТЧА: {analysis_file}\n")
-                f.write(f"Ошибка: {str(e)}\n")
-                f.write("="*80 + "\n\n")
-    
-    # Сохраняем все прогнозы в один JSON файл используя функцию из analysis_utils
-    json_file = save_all_forecasts_to_json(all_forecasts_json)  # ИЗМЕНЕНО
+            for sink in sinks.values():
+                sink.write_match(result)
+            
+            summary["processed_matches"] += 1
+            print(f"   ✅ Обработан успешно")
+    finally:
+        for sink in sinks.values():
+            sink.close(summary)
     
     print(f"\n{'='*60}")
     print(f"📊 ОБРАБОТКА ЗАВЕРШЕНА")
     print(f"{'='*60}")
-    print(f"Всего матчей найдено: {total_matches}")
-    print(f"Успешно обработано: {processed_matches}")
-    print(f"Результаты сохранены в: {output_file}")
-    print(f"JSON данные сохранены в: {json_file}")
-    
-    with open(output_file, 'a', encoding='utf-8') as f:
-        f.write(f"\n{'='*80}\n")
-        f.write(f"📈 ИТОГОВАЯ СТАТИСТИКА\n")
-        f.write(f"{'='*80}\n")
-        f.write(f"Всего матчей найдено: {total_matches}\n")
-        f.write(f"Успешно обработано: {processed_matches}\n")
-        f.write(f"Дата генерации: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"JSON файл: {json_file}\n")
+    print(f"Всего матчей найдено: {summary['total_matches']}")
+    print(f"Успешно обработано: {summary['processed_matches']}")
+    print(f"Кэш профилей команд: {cache_hits} попаданий, {cache_misses} расчетов")
+    for fmt, path in summary["outputs"].items():
+        print(f"Отчет {fmt.upper()} сохранен в: {path}")
+
+def match_ready_signature(match_folder: str, team_names_cache: Dict,
+                          res_cache: Optional[Dict] = None) -> Optional[Tuple]:
+    """
+    Подпись готового к прогнозу матча: время изменения анализа и обоих *_res.json.
+    None - если анализа или одного из файлов игроков еще нет (или файл недописан).
+    res_cache (путь *_res.json -> mtime прочитанной целиком версии): файл разбирается
+    для проверки полноты только после изменения, а не при каждой проверке папок.
+    """
+    analysis_files = [f for f in os.listdir(match_folder) if f.endswith("_analysis.json")]
+    if not analysis_files:
+        return None
+    analysis_path = os.path.join(match_folder, analysis_files[0])
+    analysis_mtime = os.path.getmtime(analysis_path)
+    
+    # Названия команд читаются из анализа только при его изменении
+    cached = team_names_cache.get(match_folder)
+    if not cached or cached[0] != analysis_mtime:
+        try:
+            match_data = load_artifact(analysis_path)
+        except (ValueError, OSError):
+            return None
+        team_names = (match_data.get("home_team", {}).get("team_name"), match_data.get("away_team", {}).get("team_name"))
+        cached = team_names_cache[match_folder] = (analysis_mtime, team_names)
+    
+    signature = [analysis_mtime]
+    for team_name in cached[1]:
+        if not team_name:
+            return None
+        res_file = os.path.join(match_folder, f"{team_name}_res.json")
+        try:
+            res_mtime = os.path.getmtime(res_file)
+            if res_cache is None or res_cache.get(res_file) != res_mtime:
+                load_artifact(res_file)
+                if res_cache is not None:
+                    res_cache[res_file] = res_mtime
+            signature.append(res_mtime)
+        except (FileNotFoundError, ValueError):
+            return None
+    return tuple(signature)
+
+def stream_matches(commands_dir: str = "commands", interval: float = STREAM_POLL_INTERVAL, idle_exit: float = 0) -> None:
+    """
+    Потоковый режим: прогноз матча считается, как только в его папке появились
+    оба файла *_res.json. Прогноз сохраняется в {матч}_forecast.json, а в stdout
+    выводится одна JSON-строка на матч (ход работы - в stderr).
+    При обновлении анализа или файла игроков прогноз выпускается повторно.
+    
+    Args:
+        commands_dir: папка с матчами
+        interval: пауза между проверками папок, сек
+        idle_exit: завершить работу после стольких секунд без новых прогнозов (0 - работать до Ctrl+C)
+    """
+    emitted = {}           # папка -> подпись, с которой выпущен прогноз
+    team_names_cache = {}  # папка -> (mtime анализа, названия команд)
+    res_cache = {}         # *_res.json -> mtime версии, прочитанной целиком
+    last_emit = time.time()
+    
+    print(f"📡 Потоковый режим: {commands_dir}, проверка каждые {interval} сек", file=sys.stderr)
+    
+    try:
+        while True:
+            for match_folder in find_match_folders(commands_dir):
+                signature = match_ready_signature(match_folder, team_names_cache, res_cache)
+                if signature is None or emitted.get(match_folder) == signature:
+                    continue
+                
+                # Подпись запоминается и при неудаче: повтор - только после изменения входов
+                emitted[match_folder] = signature
+                try:
+                    with redirect_stdout(sys.stderr), profiling.section(os.path.basename(match_folder)):
+                        result = forecast_match_folder(match_folder)
+                        if not result or result["forecast"] is None:
+                            continue
+                        forecast_file = save_match_forecast(result, match_folder)
+                except Exception as e:
+                    print(f"   ❌ Ошибка обработки матча {match_folder}: {e}", file=sys.stderr)
+                    continue
+                
+                last_emit = time.time()
+                match_data = result["match_data"]
+                print(json.dumps({
+                    "match": match_data.get("match", ""),
+                    "date_time": match_data.get("date_time", ""),
+                    "league": match_data.get("league", ""),
+                    "forecast_file": forecast_file,
+                    "forecast": result["forecast"]
+                }, ensure_ascii=False), flush=True)
+            
+            if idle_exit and time.time() - last_emit > idle_exit:
+                print(f"⏹️ Нет новых прогнозов {idle_exit} сек, завершение", file=sys.stderr)
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("⏹️ Потоковый режим остановлен", file=sys.stderr)
 
 if __name__ == "__main__":
-    print("="*60)
-    print("🏆 АНАЛИЗАТОР ФУТБОЛЬНЫХ МАТЧЕЙ")
-    print("="*60)
-    process_all_matches("commands")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Анализатор футбольных матчей")
+    parser.add_argument("--commands", default="commands", help="папка с матчами")
+    parser.add_argument("--stream", action="store_true",
+                        help="выпускать прогноз каждого матча, как только готовы оба *_res.json")
+    parser.add_argument("--interval", type=float, default=STREAM_POLL_INTERVAL, help="пауза между проверками в --stream, сек")
+    parser.add_argument("--idle-exit", type=float, default=0,
+                        help="в --stream завершиться после стольких секунд без новых прогнозов")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="количество процессов для прогноза матчей (0 - по числу ядер)")
+    parser.add_argument("--format", nargs="+", choices=list(SINKS), default=list(DEFAULT_FORMATS),
+                        help="форматы сводки; подробный текст анализа строится только для txt")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    
+    workers = args.workers or os.cpu_count()
+    if args.profile and workers > 1:
+        # Профилируется только текущий процесс - матчи считаются в нем
+        print("🔬 --profile: прогноз в одном процессе вместо --workers", file=sys.stderr)
+        workers = 1
+    
+    with profiling.session("analyzer", args):
+        if args.stream:
+            stream_matches(args.commands, args.interval, args.idle_exit)
+        else:
+            print("="*60)
+            print("🏆 АНАЛИЗАТОР ФУТБОЛЬНЫХ МАТЧЕЙ")
+            print("="*60)
+            process_all_matches(args.commands, workers, args.format)
\ No newline at end of file
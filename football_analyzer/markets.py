@@ -0,0 +1,224 @@
+"""
+ГЕНЕРАТОР РЫНКОВ ПО МАТРИЦЕ СЧЕТОВ
+==================================
+Все рынки считаются из одной матрицы вероятностей счетов grid[голы хозяев][голы гостей]
+(probability_utils.calculate_score_grid). Матрица один раз сворачивается в распределения
+суммы голов, разницы мячей и голов каждой команды, по ним строятся накопленные суммы -
+после этого каждая линия рынка стоит O(1).
+
+Набор линий задается лестницей (DEFAULT_MARKET_LADDER), ее можно передать свою.
+"""
+
+from functools import lru_cache
+from itertools import accumulate
+from math import ceil, floor
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_MARKET_LADDER = {
+    # Линии тоталов матча (половинные, целые или четвертные - как у фор)
+    'totals': [0.5, 1.5, 2.5, 3.5, 4.5, 5.5],
+    # Линии индивидуальных тоталов
+    'team_totals': [0.5, 1.5, 2.5],
+    # Азиатские форы хозяев (для гостей - противоположная линия), включая четвертные
+    'handicaps': [-2.5, -2.25, -2.0, -1.75, -1.5, -1.25, -1.0, -0.75, -0.5, -0.25, 0.0,
+                  0.25, 0.5, 0.75, 1.0, 1.25, 1.5, 1.75, 2.0, 2.25, 2.5],
+    # Разница мячей: победа с разницей 1..N-1 и N+
+    'max_margin': 3
+}
+
+def _fair_probability(low: Tuple[float, float], high: Tuple[float, float]) -> float:
+    """
+    Справедливая вероятность ставки из двух половин (выигрыш, возврат).
+
+    Из условия нулевого матожидания: p = (W1 + W2) / (2 - P1 - P2), где W - выигрыш,
+    P - возврат каждой половины. Для целых и половинных линий обе половины одинаковы
+    и это W / (1 - P).
+    """
+    pushes = low[1] + high[1]
+    return (low[0] + high[0]) / (2 - pushes) if pushes < 2 else 0.0
+
+class ScoreDistributions:
+    """Распределения, полученные из матрицы счетов, и их накопленные суммы"""
+
+    def __init__(self, grid: List[List[float]]):
+        self.max_home = len(grid) - 1
+        self.max_away = len(grid[0]) - 1 if grid else 0
+
+        total = [0.0] * (self.max_home + self.max_away + 1)
+        diff = [0.0] * (self.max_home + self.max_away + 1)  # индекс = разница + max_away
+        home = [0.0] * (self.max_home + 1)
+        away = [0.0] * (self.max_away + 1)
+
+        for i, row in enumerate(grid):
+            for j, prob in enumerate(row):
+                total[i + j] += prob
+                diff[i - j + self.max_away] += prob
+                home[i] += prob
+                away[j] += prob
+
+        self.grid = grid
+        self.total = total
+        self.diff = diff
+        self.total_cdf = list(accumulate(total))
+        self.diff_cdf = list(accumulate(diff))
+        self.home_cdf = list(accumulate(home))
+        self.away_cdf = list(accumulate(away))
+
+    @staticmethod
+    def _cdf_at(cdf: List[float], index: int) -> float:
+        """P(X <= index) с учетом выхода за границы массива"""
+        if index < 0:
+            return 0.0
+        if index >= len(cdf):
+            return cdf[-1]
+        return cdf[index]
+
+    @classmethod
+    def _under_parts(cls, cdf: List[float], line: float) -> Tuple[float, float]:
+        """
+        Выигрыш и возврат ставки на меньше line (целая или половинная линия):
+        выигрыш при голах < line, возврат при == line.
+        """
+        below = cls._cdf_at(cdf, ceil(line) - 1)
+        if float(line).is_integer():
+            return below, cls._cdf_at(cdf, int(line)) - below
+        return below, 0.0
+
+    def _under(self, cdf: List[float], line: float) -> float:
+        """Справедливая вероятность меньше line, четвертные линии - как у азиатских фор"""
+        if (line * 4) % 2:
+            return _fair_probability(self._under_parts(cdf, line - 0.25),
+                                     self._under_parts(cdf, line + 0.25))
+        parts = self._under_parts(cdf, line)
+        return _fair_probability(parts, parts)
+
+    def total_under(self, line: float) -> float:
+        """Справедливая вероятность ТМ line (для половинной линии - P(сумма голов < line))"""
+        return self._under(self.total_cdf, line)
+
+    def team_under(self, line: float, home: bool) -> float:
+        """Справедливая вероятность ИТМ line (для половинной линии - P(голы команды < line))"""
+        return self._under(self.home_cdf if home else self.away_cdf, line)
+
+    def diff_at_most(self, margin: int) -> float:
+        """P(голы хозяев - голы гостей <= margin)"""
+        return self._cdf_at(self.diff_cdf, margin + self.max_away)
+
+    def diff_exact(self, margin: int) -> float:
+        """P(голы хозяев - голы гостей == margin)"""
+        index = margin + self.max_away
+        return self.diff[index] if 0 <= index < len(self.diff) else 0.0
+
+def _handicap_parts(dist: ScoreDistributions, line: float, home: bool) -> Tuple[float, float]:
+    """
+    Выигрыш и возврат ставки на фору line (целая или половинная линия).
+
+    Хозяева: выигрыш при разнице > -line, возврат при == -line.
+    Гости:   выигрыш при разнице < line, возврат при == line.
+    """
+    is_whole = float(line).is_integer()
+    if home:
+        return 1.0 - dist.diff_at_most(floor(-line)), dist.diff_exact(int(-line)) if is_whole else 0.0
+    return dist.diff_at_most(ceil(line) - 1), dist.diff_exact(int(line)) if is_whole else 0.0
+
+def asian_handicaps(dist: ScoreDistributions, lines: List[float], home: bool = True) -> List[float]:
+    """
+    Справедливые вероятности азиатских фор по списку линий.
+
+    Четвертная линия - половина ставки на line-0.25 и половина на line+0.25
+    (см. _fair_probability). Расчеты соседних целых/половинных линий
+    переиспользуются четвертными.
+    """
+    settled = {}
+
+    def settle(line: float) -> Tuple[float, float]:
+        if line not in settled:
+            settled[line] = _handicap_parts(dist, line, home)
+        return settled[line]
+
+    result = []
+    for line in lines:
+        if (line * 4) % 2:
+            result.append(_fair_probability(settle(line - 0.25), settle(line + 0.25)))
+        else:
+            result.append(_fair_probability(settle(line), settle(line)))
+    return result
+
+@lru_cache(maxsize=None)
+def _format_line(line: float) -> str:
+    """Линия форы со знаком: +0.25, -1, 0"""
+    if line == 0:
+        return "0"
+    return f"{line:+.2f}".rstrip('0').rstrip('.')
+
+def build_markets(grid: List[List[float]], ladder: Optional[Dict] = None) -> Dict:
+    """
+    Все рынки матча по матрице счетов.
+
+    Args:
+        grid: нормированная матрица вероятностей счетов
+        ladder: набор линий (по умолчанию DEFAULT_MARKET_LADDER)
+
+    Returns:
+        Словарь {название рынка: {исход: вероятность}}
+    """
+    ladder = {**DEFAULT_MARKET_LADDER, **(ladder or {})}
+    dist = ScoreDistributions(grid)
+
+    home_win = 1.0 - dist.diff_at_most(0)
+    draw = dist.diff_exact(0)
+    away_win = dist.diff_at_most(-1)
+
+    totals = {}
+    for line in ladder['totals']:
+        under = dist.total_under(line)
+        totals[f"ТБ {line}"] = 1.0 - under
+        totals[f"ТМ {line}"] = under
+
+    team_totals = {}
+    for team, home in (("1", True), ("2", False)):
+        for line in ladder['team_totals']:
+            under = dist.team_under(line, home)
+            team_totals[f"ИТБ{team} {line}"] = 1.0 - under
+            team_totals[f"ИТМ{team} {line}"] = under
+
+    handicaps = {}
+    for team, home in (("1", True), ("2", False)):
+        for line, prob in zip(ladder['handicaps'], asian_handicaps(dist, ladder['handicaps'], home)):
+            handicaps[f"Ф{team}({_format_line(line)})"] = prob
+
+    max_margin = ladder['max_margin']
+    margins = {}
+    for margin in range(1, max_margin):
+        margins[f"П1 с разницей {margin}"] = dist.diff_exact(margin)
+    margins[f"П1 с разницей {max_margin}+"] = 1.0 - dist.diff_at_most(max_margin - 1)
+    margins["Ничья"] = draw
+    for margin in range(1, max_margin):
+        margins[f"П2 с разницей {margin}"] = dist.diff_exact(-margin)
+    margins[f"П2 с разницей {max_margin}+"] = dist.diff_at_most(-max_margin)
+
+    even = sum(dist.total[0::2])
+
+    return {
+        "Тоталы": totals,
+        "Индивидуальные тоталы": team_totals,
+        "Азиатские форы": handicaps,
+        "Двойной шанс": {
+            "1X": home_win + draw,
+            "12": home_win + away_win,
+            "X2": draw + away_win
+        },
+        "Ставка без ничьей": {
+            "П1": home_win / (home_win + away_win) if home_win + away_win else 0.5,
+            "П2": away_win / (home_win + away_win) if home_win + away_win else 0.5
+        },
+        "Победа всухую": {
+            "П1 всухую": sum(row[0] for row in grid[1:]),
+            "П2 всухую": sum(grid[0][1:]) if grid else 0.0
+        },
+        "Разница мячей": margins,
+        "Чет/нечет": {
+            "Чет": even,
+            "Нечет": 1.0 - even
+        }
+    }
@@ -1,43 +1,82 @@
+import heapq
 from math import factorial, exp
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
+
+# Константы модели прогноза (значения по умолчанию).
+# Бэктест (backtest.py) подбирает их перебором, передавая свой словарь params.
+DEFAULT_MODEL_PARAMS = {
+    'home_advantage': 1.3,      # множитель голов хозяев
+    'away_penalty': 0.9,        # множитель голов гостей
+    'star_threshold': 0.7,      # порог готовности звездного нападающего
+    'star_boost': 1.25,         # бонус за звездного нападающего
+    'defense_weight': 0.8,      # влияние защиты соперника на атаку
+    'form_base': 0.8,           # form_boost = form_base + форма * form_weight
+    'form_weight': 0.4,
+    'motivation_weight': 2,     # motivation_boost = 1 + мотивация * motivation_weight
+    'motivation_table': {
+        'вылет': 0.20,
+        'еврокубки': 0.15,
+        'дерби': 0.12,
+        'кубок': 0.10,
+        'обычный': 0.03
+    }
+}
 
 def poisson_probability(mean, goals):
     """Расчет вероятности по распределению Пуассона"""
     return (mean ** goals) * exp(-mean) / factorial(goals)
 
-def calculate_dynamic_attack(team: Dict, opponent: Dict) -> float:
-    """Динамический расчет атаки с учетом соперника"""
+def poisson_pmf(mean: float, max_goals: int = 5) -> List[float]:
+    """Вероятности 0..max_goals голов по Пуассону"""
+    return [poisson_probability(mean, goals) for goals in range(max_goals + 1)]
+
+def calculate_form(team: Dict) -> Optional[float]:
+    """Средний результат последних матчей (None, если результатов нет)"""
+    results = team.get('last_results')
+    if not results:
+        return None
+    return sum(results) / len(results)
+
+def calculate_dynamic_attack(team: Dict, opponent: Dict, params: Optional[Dict] = None, form: Optional[float] = None) -> float:
+    """Динамический расчет атаки с учетом соперника
+    
+    form - уже посчитанная calculate_form(team), чтобы не пересчитывать
+    """
+    params = params or DEFAULT_MODEL_PARAMS
     base_attack = team["attack_power"]
     
-    defense_multiplier = 1.0 + (0.5 - opponent["defense_power"]) * 0.8
+    defense_multiplier = 1.0 + (0.5 - opponent["defense_power"]) * params['defense_weight']
     
+    if form is None:
+        form = calculate_form(team)
     form_boost = 1.0
-    if team.get('last_results'):
-        recent_goals = sum(team['last_results'])
-        form_boost = 0.8 + (recent_goals / len(team['last_results'])) * 0.4
+    if form is not None:
+        form_boost = params['form_base'] + form * params['form_weight']
     
-    motivation_boost = 1.0 + team.get('motivation', 0) * 2
+    motivation_boost = 1.0 + team.get('motivation', 0) * params['motivation_weight']
     
     return base_attack * defense_multiplier * form_boost * motivation_boost
 
-def calculate_goal_efficiency(team1: Dict, team2: Dict) -> Dict:
+def calculate_goal_efficiency(team1: Dict, team2: Dict, params: Optional[Dict] = None,
+                              form1: Optional[float] = None, form2: Optional[float] = None) -> Dict:
     """Расчет реальной голевой эффективности"""
+    params = params or DEFAULT_MODEL_PARAMS
     
-    team1_goal_potential = calculate_dynamic_attack(team1, team2)
-    team2_goal_potential = calculate_dynamic_attack(team2, team1)
+    team1_goal_potential = calculate_dynamic_attack(team1, team2, params, form1)
+    team2_goal_potential = calculate_dynamic_attack(team2, team1, params, form2)
     
     if team1["is_home"]:
-        team1_goal_potential *= 1.3
-        team2_goal_potential *= 0.9
+        team1_goal_potential *= params['home_advantage']
+        team2_goal_potential *= params['away_penalty']
     else:
-        team1_goal_potential *= 0.9
-        team2_goal_potential *= 1.3
+        team1_goal_potential *= params['away_penalty']
+        team2_goal_potential *= params['home_advantage']
     
-    if team1["top_attackers"] and team1["top_attackers"][0] > 0.7:
-        team1_goal_potential *= 1.25
+    if team1["top_attackers"] and team1["top_attackers"][0] > params['star_threshold']:
+        team1_goal_potential *= params['star_boost']
     
-    if team2["top_attackers"] and team2["top_attackers"][0] > 0.7:
-        team2_goal_potential *= 1.25
+    if team2["top_attackers"] and team2["top_attackers"][0] > params['star_threshold']:
+        team2_goal_potential *= params['star_boost']
     
     return {
         "team1_goals": max(0.3, team1_goal_potential),
@@ -59,7 +98,7 @@ def calculate_both_teams_to_score(team1: Dict, team2: Dict) -> float:
     
     return min(0.85, max(0.15, both_score_prob))
 
-def detect_upset_potential(team1: Dict, team2: Dict) -> Dict:
+def detect_upset_potential(team1: Dict, team2: Dict, form1: Optional[float] = None, form2: Optional[float] = None) -> Dict:
     """Обнаружение потенциала для неожиданного результата"""
     
     upset_factors = {
@@ -79,9 +118,11 @@ def detect_upset_potential(team1: Dict, team2: Dict) -> Dict:
     if team2["top_attackers"] and team2["top_attackers"][0] > 0.75:
         upset_factors["star_player_impact"] = True
     
-    if team1.get('last_results') and team2.get('last_results'):
-        form1 = sum(team1['last_results']) / len(team1['last_results'])
-        form2 = sum(team2['last_results']) / len(team2['last_results'])
+    if form1 is None:
+        form1 = calculate_form(team1)
+    if form2 is None:
+        form2 = calculate_form(team2)
+    if form1 is not None and form2 is not None:
         if form2 > form1 * 1.5:
             upset_factors["recent_form_gap"] = True
     
@@ -93,14 +134,45 @@ def calculate_exact_scores_dynamic(team1: Dict, team2: Dict, mean_goals_team1: f
     mean_goals_team1 = max(0.4, mean_goals_team1)
     mean_goals_team2 = max(0.4, mean_goals_team2)
     
-    scores = {}
-    for i in range(max_goals + 1):
-        for j in range(max_goals + 1):
-            prob = poisson_probability(mean_goals_team1, i) * poisson_probability(mean_goals_team2, j)
-            scores[f"{i}-{j}"] = round(prob, 4)
+    grid = calculate_score_grid(poisson_pmf(mean_goals_team1, max_goals), poisson_pmf(mean_goals_team2, max_goals))
+    return score_grid_to_dict(grid)
+
+def calculate_score_grid(pmf1: List[float], pmf2: List[float]) -> List[List[float]]:
+    """Нормированная матрица вероятностей счетов: grid[голы хозяев][голы гостей]"""
+    grid = [[round(p1 * p2, 4) for p2 in pmf2] for p1 in pmf1]
+    total = sum(prob for row in grid for prob in row)
+    return [[prob / total for prob in row] for row in grid]
+
+def score_grid_to_dict(grid: List[List[float]]) -> Dict:
+    """Матрица счетов в словарь {'i-j': вероятность}"""
+    return {f"{i}-{j}": prob for i, row in enumerate(grid) for j, prob in enumerate(row)}
+
+def calculate_outcomes_from_grid(grid: List[List[float]]) -> Tuple[Dict, Dict]:
+    """1X2 и тоталы 1.5/2.5 за один проход по матрице счетов"""
+    p1 = draw = p2 = 0.0
+    over_15 = over_25 = 0.0
+    
+    for i, row in enumerate(grid):
+        for j, prob in enumerate(row):
+            if i > j:
+                p1 += prob
+            elif i == j:
+                draw += prob
+            else:
+                p2 += prob
+            if i + j > 1.5:
+                over_15 += prob
+            if i + j > 2.5:
+                over_25 += prob
     
-    total = sum(scores.values())
-    return {score: prob/total for score, prob in scores.items()}
+    return (
+        {"П1": p1, "X": draw, "П2": p2},
+        {">1.5": over_15, "<1.5": 1 - over_15, ">2.5": over_25, "<2.5": 1 - over_25}
+    )
+
+def top_exact_scores(exact_scores: Dict, n: int = 10) -> Dict:
+    """Топ-N точных счетов без полной сортировки (при равенстве порядок как у sorted)"""
+    return dict(heapq.nlargest(n, exact_scores.items(), key=lambda x: x[1]))
 
 def calculate_1x2_from_poisson(exact_scores: Dict) -> Dict:
     """Расчет 1X2 на основе точных счетов"""
@@ -140,10 +212,18 @@ def calculate_totals_from_poisson(exact_scores: Dict) -> Dict:
         "<2.5": 1 - over_25
     }
 
-def calculate_individual_totals(mean_goals_team1: float, mean_goals_team2: float) -> Dict:
-    """Расчет индивидуальных тоталов"""
-    itb1_15 = 1 - (poisson_probability(mean_goals_team1, 0) + poisson_probability(mean_goals_team1, 1))
-    itb2_15 = 1 - (poisson_probability(mean_goals_team2, 0) + poisson_probability(mean_goals_team2, 1))
+def calculate_individual_totals(mean_goals_team1: float, mean_goals_team2: float,
+                                pmf1: Optional[List[float]] = None, pmf2: Optional[List[float]] = None) -> Dict:
+    """Расчет индивидуальных тоталов
+    
+    pmf1/pmf2 - уже посчитанные poisson_pmf для этих же средних (если есть)
+    """
+    if pmf1 is None:
+        pmf1 = [poisson_probability(mean_goals_team1, 0), poisson_probability(mean_goals_team1, 1)]
+    if pmf2 is None:
+        pmf2 = [poisson_probability(mean_goals_team2, 0), poisson_probability(mean_goals_team2, 1)]
+    itb1_15 = 1 - (pmf1[0] + pmf1[1])
+    itb2_15 = 1 - (pmf2[0] + pmf2[1])
     
     return {
         "ИТБ1 1.5": max(0.05, min(0.95, itb1_15)),
@@ -152,15 +232,11 @@ def calculate_individual_totals(mean_goals_team1: float, mean_goals_team2: float
         "ИТМ2 1.5": max(0.05, min(0.95, 1 - itb2_15))
     }
 
-def calculate_motivation(team: Dict, match_type: str) -> float:
+def calculate_motivation(team: Dict, match_type: str, params: Optional[Dict] = None, form: Optional[float] = None) -> float:
     """Расчет мотивации команды"""
-    base_motivation = {
-        'вылет': 0.20,
-        'еврокубки': 0.15,
-        'дерби': 0.12,
-        'кубок': 0.10,
-        'обычный': 0.03
-    }.get(match_type, 0.03)
+    params = params or DEFAULT_MODEL_PARAMS
+    motivation_table = params['motivation_table']
+    base_motivation = motivation_table.get(match_type, motivation_table.get('обычный', 0.03))
     
     position = team.get('position_in_league', 1)
     
@@ -173,11 +249,46 @@ def calculate_motivation(team: Dict, match_type: str) -> float:
     elif position <= 8:
         base_motivation += 0.04
     
-    if team.get('last_results'):
-        win_rate = sum(team['last_results']) / len(team['last_results'])
+    win_rate = form if form is not None else calculate_form(team)
+    if win_rate is not None:
         if win_rate > 0.6:
             base_motivation += 0.04
         elif win_rate < 0.2:
             base_motivation -= 0.03
     
-    return min(0.25, max(0.0, base_motivation))
\ No newline at end of file
+    return min(0.25, max(0.0, base_motivation))
+
+def build_match_context(team1: Dict, team2: Dict, match_type: str, params: Optional[Dict] = None, max_goals: int = 5) -> Dict:
+    """
+    Контекст матча: все промежуточные величины прогноза, посчитанные по одному разу.
+    
+    Записывает мотивацию в team1/team2 (как и раньше делал calculate_match_probabilities).
+    Векторы Пуассона для матрицы счетов переиспользуются в индивидуальных тоталах,
+    если среднее не было поднято до минимума 0.4.
+    """
+    params = params or DEFAULT_MODEL_PARAMS
+    
+    form1 = calculate_form(team1)
+    form2 = calculate_form(team2)
+    
+    team1['motivation'] = calculate_motivation(team1, match_type, params, form1)
+    team2['motivation'] = calculate_motivation(team2, match_type, params, form2)
+    
+    goal_potential = calculate_goal_efficiency(team1, team2, params, form1, form2)
+    mean1 = goal_potential["team1_goals"]
+    mean2 = goal_potential["team2_goals"]
+    
+    pmf1 = poisson_pmf(max(0.4, mean1), max_goals)
+    pmf2 = poisson_pmf(max(0.4, mean2), max_goals)
+    grid = calculate_score_grid(pmf1, pmf2)
+    
+    return {
+        "form1": form1,
+        "form2": form2,
+        "goal_potential": goal_potential,
+        "pmf1": pmf1 if mean1 >= 0.4 else None,
+        "pmf2": pmf2 if mean2 >= 0.4 else None,
+        "grid": grid,
+        "exact_scores": score_grid_to_dict(grid),
+        "both_teams_to_score": calculate_both_teams_to_score(team1, team2)
+    }
@@ -0,0 +1,221 @@
+"""
+ОТЧЕТЫ ПО ПРОГНОЗАМ
+===================
+Расчет прогноза (forecast_match_folder) возвращает только структуры данных,
+а текст/таблицы строятся здесь и только для выбранных форматов:
+
+    txt   - подробная сводка с анализом матча (all_matches_forecast_*.txt)
+    json  - список прогнозов (forecasts/all_forecasts_*.json)
+    csv   - одна строка на матч с основными рынками (forecasts/all_forecasts_*.csv)
+    html  - таблица основных рынков для просмотра в браузере (forecasts/all_forecasts_*.html)
+
+Каждый формат - отдельный приемник: матч записывается в файл сразу после расчета,
+весь отчет в памяти не держится.
+"""
+
+import csv
+import json
+import os
+from datetime import datetime
+from html import escape
+from typing import Dict, List, Optional
+
+DEFAULT_FORMATS = ("txt", "json")
+
+# Колонки CSV/HTML: (заголовок, раздел прогноза, исход)
+MARKET_COLUMNS = [
+    ("П1", "1X2", "П1"),
+    ("X", "1X2", "X"),
+    ("П2", "1X2", "П2"),
+    ("ТБ 2.5", "Тоталы", ">2.5"),
+    ("ТМ 2.5", "Тоталы", "<2.5"),
+    ("Обе забьют", "Обе забьют", "Да"),
+]
+
+
+def _match_info(result: Dict) -> Dict:
+    """Общие поля матча для табличных форматов"""
+    match_data = result["match_data"]
+    forecast = result["forecast"]
+    goal_potential = forecast["Анализ матча"]["goal_potential"]
+    top_score, top_prob = next(iter(forecast["Точный счет"].items()), ("", 0.0))
+    return {
+        "match": match_data.get("match", ""),
+        "date_time": match_data.get("date_time", ""),
+        "league": match_data.get("league", ""),
+        "home_xg": goal_potential["team1_goals"],
+        "away_xg": goal_potential["team2_goals"],
+        "markets": [forecast.get(section, {}).get(outcome) for _, section, outcome in MARKET_COLUMNS],
+        "top_score": top_score,
+        "top_score_prob": top_prob,
+    }
+
+
+class ReportSink:
+    """Приемник отчета: open -> write_match/write_error по мере расчета -> close"""
+
+    newline = None  # Режим перевода строк при открытии файла
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+
+    def open(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.file = open(self.path, 'w', encoding='utf-8', newline=self.newline)
+        self.write_header()
+
+    def write_header(self) -> None:
+        pass
+
+    def write_match(self, result: Dict) -> None:
+        raise NotImplementedError
+
+    def write_error(self, analysis_file: str, error: str) -> None:
+        pass
+
+    def write_footer(self, summary: Dict) -> None:
+        pass
+
+    def close(self, summary: Dict) -> None:
+        if self.file is None:
+            return
+        self.write_footer(summary)
+        self.file.close()
+        self.file = None
+
+
+class TxtSink(ReportSink):
+    """Подробная текстовая сводка (прежний формат all_matches_forecast_*.txt)"""
+
+    def write_header(self) -> None:
+        self.file.write(f"📊 СВОДКА ПРОГНОЗОВ НА ВСЕ МАТЧИ\n")
+        self.file.write(f"Сгенерировано: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        self.file.write("="*80 + "\n\n")
+
+    def write_match(self, result: Dict) -> None:
+        # Текст строится только здесь - при выводе без txt он не нужен
+        from analysis_utils import get_detailed_analysis_str, get_forecasts_str
+
+        match_data = result["match_data"]
+        forecast = result["forecast"]
+        self.file.write(f"\n🎯 МАТЧ: {match_data.get('match', 'Неизвестный матч')}\n")
+        self.file.write(f"📅 Дата: {match_data.get('date_time', 'Неизвестно')}\n")
+        self.file.write(f"🏆 Лига: {match_data.get('league', 'Неизвестно')}\n")
+        self.file.write("-"*60 + "\n")
+        self.file.write(get_detailed_analysis_str(forecast, result["team1"], result["team2"]))
+        self.file.write("\n")
+        self.file.write(get_forecasts_str(forecast))
+        self.file.write("\n" + "="*80 + "\n\n")
+
+    def write_error(self, analysis_file: str, error: str) -> None:
+        self.file.write(f"\n❌ ОШИБКА ОБРАБОТКИ МАТЧА: {analysis_file}\n")
+        self.file.write(f"Ошибка: {error}\n")
+        self.file.write("="*80 + "\n\n")
+
+    def write_footer(self, summary: Dict) -> None:
+        self.file.write(f"\n{'='*80}\n")
+        self.file.write(f"📈 ИТОГОВАЯ СТАТИСТИКА\n")
+        self.file.write(f"{'='*80}\n")
+        self.file.write(f"Всего матчей найдено: {summary['total_matches']}\n")
+        self.file.write(f"Успешно обработано: {summary['processed_matches']}\n")
+        self.file.write(f"Дата генерации: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        for fmt, path in summary["outputs"].items():
+            if fmt != "txt":
+                self.file.write(f"{fmt.upper()} файл: {path}\n")
+
+
+class JsonSink(ReportSink):
+    """
+    Список прогнозов. Элементы дописываются по одному, результат совпадает
+    с json.dump(список, indent=2).
+    """
+
+    def write_header(self) -> None:
+        self.count = 0
+        self.file.write("[")
+
+    def write_match(self, result: Dict) -> None:
+        item = json.dumps(result["forecast"], ensure_ascii=False, indent=2).replace("\n", "\n  ")
+        self.file.write(("," if self.count else "") + "\n  " + item)
+        self.count += 1
+
+    def write_footer(self, summary: Dict) -> None:
+        self.file.write("\n]" if self.count else "]")
+
+
+class CsvSink(ReportSink):
+    """Одна строка на матч: основные рынки, ожидаемые голы и самый вероятный счет"""
+
+    newline = ''  # csv.writer сам расставляет переводы строк
+
+    def write_header(self) -> None:
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(["Матч", "Дата", "Лига", "xG хозяев", "xG гостей"]
+                             + [title for title, _, _ in MARKET_COLUMNS]
+                             + ["Точный счет", "Вероятность счета"])
+
+    def write_match(self, result: Dict) -> None:
+        info = _match_info(result)
+        self.writer.writerow(
+            [info["match"], info["date_time"], info["league"], f"{info['home_xg']:.2f}", f"{info['away_xg']:.2f}"]
+            + ["" if prob is None else f"{prob:.4f}" for prob in info["markets"]]
+            + [info["top_score"], f"{info['top_score_prob']:.4f}"]
+        )
+
+
+class HtmlSink(ReportSink):
+    """Таблица основных рынков"""
+
+    def write_header(self) -> None:
+        headers = ["Матч", "Дата", "Лига", "xG"] + [title for title, _, _ in MARKET_COLUMNS] + ["Счет"]
+        self.file.write(
+            "<!DOCTYPE html>\n<html lang=\"ru\">\n<head>\n<meta charset=\"utf-8\">\n"
+            "<title>Сводка прогнозов</title>\n"
+            "<style>body{font-family:sans-serif}table{border-collapse:collapse}"
+            "td,th{border:1px solid #ccc;padding:4px 8px}td.num{text-align:right}</style>\n"
+            "</head>\n<body>\n"
+            f"<h1>📊 Сводка прогнозов</h1>\n<p>Сгенерировано: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>\n"
+            "<table>\n<tr>" + "".join(f"<th>{escape(h)}</th>" for h in headers) + "</tr>\n"
+        )
+
+    def write_match(self, result: Dict) -> None:
+        info = _match_info(result)
+        cells = [f"<td>{escape(str(info[key]))}</td>" for key in ("match", "date_time", "league")]
+        cells.append(f"<td class=\"num\">{info['home_xg']:.2f} : {info['away_xg']:.2f}</td>")
+        cells += [f"<td class=\"num\">{'' if prob is None else f'{prob:.0%}'}</td>" for prob in info["markets"]]
+        cells.append(f"<td class=\"num\">{escape(info['top_score'])} ({info['top_score_prob']:.0%})</td>")
+        self.file.write("<tr>" + "".join(cells) + "</tr>\n")
+
+    def write_error(self, analysis_file: str, error: str) -> None:
+        self.file.write(f"<tr><td colspan=\"{5 + len(MARKET_COLUMNS)}\">❌ {escape(analysis_file)}: {escape(error)}</td></tr>\n")
+
+    def write_footer(self, summary: Dict) -> None:
+        self.file.write(
+            f"</table>\n<p>Всего матчей найдено: {summary['total_matches']}, "
+            f"успешно обработано: {summary['processed_matches']}</p>\n</body>\n</html>\n"
+        )
+
+
+SINKS = {
+    "txt": TxtSink,
+    "json": JsonSink,
+    "csv": CsvSink,
+    "html": HtmlSink,
+}
+
+
+def report_path(fmt: str, stamp: str, output_dir: str = "forecasts") -> str:
+    """Имя файла отчета (TXT - в текущей папке, как раньше, остальные - в output_dir)"""
+    if fmt == "txt":
+        return f"all_matches_forecast_{stamp}.txt"
+    return f"{output_dir}/all_forecasts_{stamp}.{fmt}"
+
+
+def create_sinks(formats: List[str], output_dir: str = "forecasts", stamp: Optional[str] = None) -> Dict[str, ReportSink]:
+    """Приемники выбранных форматов (еще не открытые)"""
+    stamp = stamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+    unknown = [fmt for fmt in formats if fmt not in SINKS]
+    if unknown:
+        raise ValueError(f"Неизвестные форматы отчета: {', '.join(unknown)} (доступны: {', '.join(SINKS)})")
+    return {fmt: SINKS[fmt](report_path(fmt, stamp, output_dir)) for fmt in dict.fromkeys(formats)}
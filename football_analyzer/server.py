@@ -0,0 +1,312 @@
+"""
+HTTP-СЕРВИС ПРОГНОЗОВ
+=====================
+Локальный сервис на asyncio (без сторонних библиотек): данные команд, профили и
+модуль расчета загружены в памяти, ответы кэшируются по хэшу входных данных.
+
+    GET  /forecast?home=Байер&away=Бавария   - прогноз матча
+    POST /forecast/batch                      - {"matches": [{"home": ..., "away": ...}, ...]}
+    GET  /teams                               - известные команды
+    POST /reload                              - перечитать папки матчей
+    GET  /health                              - состояние и статистика кэша
+
+Данные команды берутся из последнего по времени *_analysis.json, где она встречается,
+и ее *_res.json из той же папки.
+
+Пример:
+    python server.py --commands commands --port 8765
+    curl "http://127.0.0.1:8765/forecast?home=Байер&away=Бавария"
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from analysis_utils import calculate_match_probabilities
+from team_utils import TeamProfileCache, load_team_profile, team_profile_cache, team_source_hash
+
+# Корень проекта - для общих модулей из utils/
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import catalog, metrics
+from utils.artifacts import load_artifact
+from utils.team_resolver import NameIndex
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+RESPONSE_CACHE_SIZE = 4096   # Сколько готовых ответов держать в памяти
+MAX_BATCH_SIZE = 500         # Матчей в одном запросе /forecast/batch
+MAX_BODY_SIZE = 1024 * 1024
+
+HTTP_STATUSES = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+def encode_body(body: Dict) -> bytes:
+    return json.dumps(body, ensure_ascii=False).encode('utf-8')
+
+
+def team_key(name: str) -> str:
+    """Ключ поиска команды: без учета регистра и лишних пробелов"""
+    return " ".join(name.split()).casefold()
+
+
+class TeamIndex:
+    """Ключ команды -> (название, данные из анализа, путь к *_res.json, хэш источника)"""
+
+    def __init__(self, commands_dir: str):
+        self.commands_dir = commands_dir
+        self.teams: Dict[str, Tuple[str, Dict, str, str]] = {}
+        self.names = NameIndex()  # Нормализованные названия ("ФК Копенгаген" = "Копенгаген")
+        self.loaded_at = None
+
+    def load(self) -> int:
+        teams = {}
+        analysis_files = []
+        for match_folder in catalog.find_match_folders(self.commands_dir):
+            for filename in os.listdir(match_folder):
+                if filename.endswith("_analysis.json"):
+                    path = os.path.join(match_folder, filename)
+                    analysis_files.append((os.path.getmtime(path), path))
+                    break
+
+        # Более свежий анализ перекрывает старый
+        for _, path in sorted(analysis_files):
+            try:
+                match_data = load_artifact(path)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Не удалось прочитать {path}: {e}", file=sys.stderr)
+                continue
+            for side in ("home_team", "away_team"):
+                team_data = match_data.get(side) or {}
+                name = team_data.get("team_name")
+                if not name:
+                    continue
+                res_file = os.path.join(os.path.dirname(path), f"{name}_res.json")
+                res_bytes = b''
+                if os.path.exists(res_file):
+                    with open(res_file, 'rb') as f:
+                        res_bytes = f.read()
+                teams[team_key(name)] = (name, team_data, res_file, team_source_hash(team_data, res_bytes))
+
+        names = NameIndex()
+        for key, (name, _, _, _) in teams.items():
+            names.add(name, key)
+        self.teams = teams
+        self.names = names
+        self.loaded_at = time.time()
+        return len(teams)
+
+    def get(self, name: str) -> Optional[Tuple[str, Dict, str, str]]:
+        team = self.teams.get(team_key(name))
+        if team is None:
+            # Только точное совпадение после нормализации: похожее название - другая
+            # команда ("Манчестер Сити" не "Манчестер Юнайтед"), ответ 404
+            matched = self.names.match(name)
+            if matched and matched[2] == "exact":
+                team = self.teams.get(matched[0])
+        return team
+
+
+class ForecastService:
+    """Расчет прогнозов с кэшем готовых ответов"""
+
+    def __init__(self, commands_dir: str, cache_size: int = RESPONSE_CACHE_SIZE):
+        self.index = TeamIndex(commands_dir)
+        # Тот же LRU, что и для профилей команд; значения - (тело ответа, закодированный JSON)
+        self.responses = TeamProfileCache(cache_size)
+        self.requests = 0
+
+    def reload(self) -> int:
+        return self.index.load()
+
+    def _cached_forecast(self, home: str, away: str) -> Tuple[int, Dict, Optional[bytes]]:
+        """(HTTP-статус, тело, закодированное тело) для одной пары команд"""
+        home_entry = self.index.get(home)
+        away_entry = self.index.get(away)
+        missing = [name for name, entry in ((home, home_entry), (away, away_entry)) if entry is None]
+        if missing:
+            return 404, {"error": f"Нет данных о командах: {', '.join(missing)}"}, None
+
+        # Хэши источников в ключе: после /reload с новыми данными старый ответ не подойдет
+        key = (home_entry[3], away_entry[3], home_entry[0], away_entry[0])
+        cached = self.responses.get(key)
+        if cached is not None:
+            return 200, cached[0], cached[1]
+
+        home_name, home_data, home_res, _ = home_entry
+        away_name, away_data, away_res, _ = away_entry
+        team1 = load_team_profile(home_data, True, home_name, home_res)
+        team2 = load_team_profile(away_data, False, away_name, away_res)
+        body = {
+            "match": f"{home_name} - {away_name}",
+            "home": home_name,
+            "away": away_name,
+            "forecast": calculate_match_probabilities(team1, team2, weather="sunny", match_type="обычный",
+                                                      with_markets=True)
+        }
+        encoded = encode_body(body)
+        self.responses.put(key, (body, encoded))
+        return 200, body, encoded
+
+    def forecast(self, home: str, away: str) -> Tuple[int, Dict]:
+        """(HTTP-статус, тело ответа) для одной пары команд"""
+        status, body, _ = self._cached_forecast(home, away)
+        return status, body
+
+    def batch(self, matches: List[Dict]) -> Tuple[int, Dict]:
+        if not isinstance(matches, list) or len(matches) > MAX_BATCH_SIZE:
+            return 400, {"error": f"Ожидается список до {MAX_BATCH_SIZE} матчей"}
+        results = []
+        for match in matches:
+            if not isinstance(match, dict) or not match.get("home") or not match.get("away"):
+                results.append({"status": 400, "error": "Нужны поля home и away"})
+                continue
+            status, body = self.forecast(match["home"], match["away"])
+            results.append({"status": status, **body})
+        return 200, {"results": results}
+
+    def health(self) -> Dict:
+        return {
+            "teams": len(self.index.teams),
+            "loaded_at": self.index.loaded_at,
+            "requests": self.requests,
+            "response_cache": {"size": len(self.responses), "hits": self.responses.hits, "misses": self.responses.misses},
+            "profile_cache": {"size": len(team_profile_cache), "hits": team_profile_cache.hits,
+                              "misses": team_profile_cache.misses}
+        }
+
+    def handle(self, method: str, target: str, body: bytes) -> Tuple[int, bytes]:
+        """Маршрутизация запроса: (HTTP-статус, JSON-тело ответа)"""
+        self.requests += 1
+        url = urlsplit(target)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if url.path == "/forecast" and method == "GET" and query.get("home") and query.get("away"):
+            # Прогноз из кэша отдается уже закодированным
+            status, payload, encoded = self._cached_forecast(query["home"], query["away"])
+            return status, encoded if encoded is not None else encode_body(payload)
+
+        status, payload = self.route(method, url.path, query, body)
+        return status, encode_body(payload)
+
+    def route(self, method: str, path: str, query: Dict, body: bytes) -> Tuple[int, Dict]:
+        if path == "/forecast":
+            if method != "GET":
+                return 405, {"error": "Только GET"}
+            return 400, {"error": "Нужны параметры home и away"}
+
+        if path == "/forecast/batch":
+            if method != "POST":
+                return 405, {"error": "Только POST"}
+            try:
+                payload = json.loads(body or b'{}')
+            except ValueError:
+                return 400, {"error": "Тело запроса - не JSON"}
+            return self.batch(payload.get("matches") if isinstance(payload, dict) else payload)
+
+        if path == "/teams":
+            return 200, {"teams": sorted(entry[0] for entry in self.index.teams.values())}
+
+        if path == "/reload":
+            if method != "POST":
+                return 405, {"error": "Только POST"}
+            return 200, {"teams": self.reload()}
+
+        if path == "/health":
+            return 200, self.health()
+
+        return 404, {"error": f"Неизвестный путь: {path}"}
+
+
+def encode_response(status: int, payload: bytes, keep_alive: bool) -> bytes:
+    headers = (
+        f"HTTP/1.1 {status} {HTTP_STATUSES.get(status, '')}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return headers.encode('ascii') + payload
+
+
+class ForecastServer:
+    """Минимальный HTTP/1.1 поверх asyncio: keep-alive, Content-Length, без chunked"""
+
+    def __init__(self, service: ForecastService):
+        self.service = service
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+
+                lines = head.decode('latin-1').split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    writer.write(encode_response(400, encode_body({"error": "Некорректный запрос"}), False))
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                length = int(headers.get("content-length", 0) or 0)
+                if length > MAX_BODY_SIZE:
+                    writer.write(encode_response(413, encode_body({"error": "Слишком большой запрос"}), False))
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                writer.write(self.respond(method, target, body, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    def respond(self, method: str, target: str, body: bytes, keep_alive: bool) -> bytes:
+        try:
+            status, payload = self.service.handle(method, target, body)
+        except Exception as e:
+            status, payload = 500, encode_body({"error": str(e)})
+        return encode_response(status, payload, keep_alive)
+
+
+async def serve(service: ForecastService, host: str, port: int) -> None:
+    server = ForecastServer(service)
+    tcp_server = await asyncio.start_server(server.handle_connection, host, port)
+    print(f"🌐 Сервис прогнозов: http://{host}:{port} (команд: {len(service.index.teams)})", file=sys.stderr)
+    async with tcp_server:
+        await tcp_server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP-сервис прогнозов")
+    parser.add_argument("--commands", default="commands", help="папка с матчами")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    if sys.platform.startswith('win'):
+        sys.stdout.reconfigure(encoding='utf-8')
+
+    service = ForecastService(args.commands)
+    service.reload()
+    metrics.serve()
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        print("⏹️ Сервис остановлен", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
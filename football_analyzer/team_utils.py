@@ -1,7 +1,21 @@
+import hashlib
 import json
 import numpy as np
 import os
-from typing import Dict, List, Tuple
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# Корень проекта - для общих модулей из utils/
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.artifacts import decode_artifact, load_artifact
+
+TEAM_PROFILE_CACHE_SIZE = 256  # Сколько профилей команд держать в памяти
+
+# Поля анализа матча, от которых зависит профиль команды
+# (scraped_at, team_url и т.п. не влияют на расчет и не должны ломать кэш)
+PROFILE_SOURCE_FIELDS = ("position_in_league", "last_results", "scoring_stats")
 
 def calculate_team_strengths(players: List[Dict]) -> Tuple[float, float, float, List[float]]:
     """Расчет силы команды по позициям"""
@@ -14,6 +28,9 @@ def calculate_team_strengths(players: List[Dict]) -> Tuple[float, float, float,
     attackers = []
     
     for player in players:
+        # Травмированные на дату расчета готовности (test.py) не играют
+        if player.get('available') is False:
+            continue
         pos = player['position'].lower()
         readiness = player['readiness']
         
@@ -187,12 +204,20 @@ def load_team_data_with_players(team_data: Dict, is_home: bool, team_name: str,
     """Загрузка данных команды с игроками из *_res.json файла"""
     try:
         if os.path.exists(res_file_path):
-            with open(res_file_path, 'r', encoding='utf-8') as f:
-                players = json.load(f)
+            players = load_artifact(res_file_path)
         else:
             players = []
             print(f"⚠️ Файл с игроками не найден: {res_file_path}")
         
+        return build_team_data_with_players(team_data, is_home, team_name, players)
+        
+    except Exception as e:
+        print(f"❌ Ошибка загрузки команды {team_name} с игроками: {e}")
+        return load_team_data_from_analysis(team_data, is_home, team_name)
+
+def build_team_data_with_players(team_data: Dict, is_home: bool, team_name: str, players: List[Dict]) -> Dict:
+    """Расчет профиля команды по уже загруженному списку игроков"""
+    try:
         avg_readiness, attack_power, defense_power, top_attackers = calculate_team_strengths(players)
         
         position_in_league = team_data.get("position_in_league", 10)
@@ -234,4 +259,88 @@ def load_team_data_with_players(team_data: Dict, is_home: bool, team_name: str,
         
     except Exception as e:
         print(f"❌ Ошибка загрузки команды {team_name} с игроками: {e}")
-        return load_team_data_from_analysis(team_data, is_home, team_name)
\ No newline at end of file
+        return load_team_data_from_analysis(team_data, is_home, team_name)
+
+class TeamProfileCache:
+    """
+    LRU-кэш профилей команд.
+    
+    Ключ - (команда, хэш источника, is_home). Хэш считается по содержимому
+    *_res.json и полям анализа, влияющим на расчет, поэтому одна и та же команда
+    из разных папок матчей (и дубликатов папок) рассчитывается один раз.
+    Оркестратор вызывает стадии из нескольких потоков - доступ под блокировкой.
+    """
+    
+    def __init__(self, maxsize: int = TEAM_PROFILE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Tuple) -> Optional[Dict]:
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is None:
+                self.misses += 1
+                return None
+            self._profiles.move_to_end(key)
+            self.hits += 1
+            return profile
+    
+    def put(self, key: Tuple, profile: Dict) -> None:
+        with self._lock:
+            self._profiles[key] = profile
+            self._profiles.move_to_end(key)
+            while len(self._profiles) > self.maxsize:
+                self._profiles.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._profiles.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+# Общий кэш процесса
+team_profile_cache = TeamProfileCache()
+
+def team_source_hash(team_data: Dict, res_bytes: bytes) -> str:
+    """Хэш входных данных профиля: файл игроков + значимые поля анализа"""
+    source = {field: team_data.get(field) for field in PROFILE_SOURCE_FIELDS}
+    digest = hashlib.sha1(res_bytes)
+    digest.update(json.dumps(source, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    return digest.hexdigest()
+
+def load_team_profile(team_data: Dict, is_home: bool, team_name: str, res_file_path: Optional[str] = None,
+                      cache: Optional[TeamProfileCache] = None) -> Dict:
+    """
+    Профиль команды с учетом кэша.
+    
+    Если *_res.json есть - профиль считается по игрокам, иначе по данным анализа.
+    Возвращается копия словаря: расчет прогноза дописывает в команду мотивацию.
+    """
+    cache = cache if cache is not None else team_profile_cache
+    
+    res_bytes = b''
+    if res_file_path and os.path.exists(res_file_path):
+        with open(res_file_path, 'rb') as f:
+            res_bytes = f.read()
+    
+    key = (team_name, team_source_hash(team_data, res_bytes), is_home)
+    profile = cache.get(key)
+    if profile is None:
+        if res_bytes:
+            try:
+                players = decode_artifact(res_bytes)
+                profile = build_team_data_with_players(team_data, is_home, team_name, players)
+            except Exception as e:
+                print(f"❌ Ошибка загрузки команды {team_name} с игроками: {e}")
+                profile = load_team_data_from_analysis(team_data, is_home, team_name)
+        else:
+            profile = load_team_data_from_analysis(team_data, is_home, team_name)
+        cache.put(key, profile)
+    
+    return dict(profile)
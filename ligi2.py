@@ -1,5 +1,6 @@
 import requests
 from bs4 import BeautifulSoup
+from utils import http_replay
 import json
 import re
 
@@ -160,6 +161,8 @@ def save_to_json(data, filename):
         print(f"Ошибка при сохранении файла {filename}: {e}")
 
 def main():
+    http_replay.install()
+    
     url = "https://soccer365.ru/competitions/12/"
     
     print("Парсинг данных...")
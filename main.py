@@ -6,6 +6,7 @@ from twisted.internet import reactor, defer
 from scrapy.crawler import CrawlerRunner
 from scrapy.utils.log import configure_logging
 from database import Database
+from utils.catalog import KIND_UPCOMING, find_artifacts
 from utils.logger import setup_logger
 from scraper.transfermarkt_spider import TransfermarktSpider
 from scraper.base_scraper import BaseScraper
@@ -55,20 +56,17 @@ def get_all_matches_from_competitions():
         logging.error(f"Папка {competitions_dir} не существует")
         return all_matches
     
-    for root, dirs, files in os.walk(competitions_dir):
-        for filename in files:
-            if filename.endswith('.json') and 'upcoming_matches' in filename:
-                file_path = os.path.join(root, filename)
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
+    for file_path in find_artifacts(competitions_dir, KIND_UPCOMING):
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            
+            for match in data.get('matches', []):
+                all_matches.append(match)
+                logging.info(f"Матч: {match['home_team']} vs {match['away_team']}")
                     
-                    for match in data.get('matches', []):
-                        all_matches.append(match)
-                        logging.info(f"Матч: {match['home_team']} vs {match['away_team']}")
-                            
-                except Exception as e:
-                    logging.error(f"Ошибка чтения {filename}: {str(e)}")
+        except Exception as e:
+            logging.error(f"Ошибка чтения {os.path.basename(file_path)}: {str(e)}")
     
     logging.info(f"Всего матчей: {len(all_matches)}")
     return all_matches
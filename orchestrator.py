@@ -0,0 +1,479 @@
+"""
+ОРКЕСТРАТОР КОНВЕЙЕРА
+=====================
+Заменяет ручной запуск скриптов по ПОРЯДОК.txt. Каждый матч - небольшой граф
+зависимостей между артефактами в его папке commands/{матч}/:
+
+    analysis          {матч}_analysis.json      team_parser (soccer365)
+      ├── crawl       {хозяева}.json / {гости}.json    parser_main (Transfermarkt, подпроцесс)
+      │     └── readiness   {команда}_res.json          test.py (PlayerAnalyzer)
+      └── forecast    {матч}_forecast.json      football_analyzer (после readiness обеих команд)
+
+Задачи разных матчей выполняются параллельно в пуле потоков, количество одновременных
+задач каждой стадии ограничено (STAGE_LIMITS): браузер и Scrapy - по одному, расчеты -
+несколько. Задача отдается в пул, только когда у ее стадии есть свободное место, остальные
+ждут в очереди своей стадии и не занимают потоки. Пока матч B парсится, матч A уже считается.
+
+Пересборка как в make: для каждого артефакта в STATE_FILE хранится хэш его входов
+(содержимое входных файлов и кода стадии). Стадия запускается, только если артефакта
+нет, хэш входов изменился или стадия указана в --refresh.
+
+Перед графом JSON паука травм из injuries/ переносится в хранилище травм (utils/injury_store.py):
+readiness исключает травмированных и снижает готовность недавно вернувшихся.
+
+Примеры:
+    python orchestrator.py                          # все матчи из competitions
+    python orchestrator.py --leagues https://soccer365.ru/competitions/17/
+    python orchestrator.py --match "Арсенал - Эвертон" --refresh analysis
+    python orchestrator.py --skip crawl --summary   # без парсинга Transfermarkt
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional
+
+from scraper import crawl_stats
+from utils import http_replay, metrics
+from utils.catalog import record_stage
+from utils.injury_index import INJURIES_DIR, import_injury_files, store_meta_path
+from utils.injury_store import InjuryStore
+from utils.logger import setup_logger
+
+# =============================================================================
+# КОНСТАНТЫ
+# =============================================================================
+STATE_FILE = "pipeline_state.json"    # Хэши входов собранных артефактов
+COMPETITIONS_DIR = "competitions"      # Файлы upcoming_matches_*.json
+COMMANDS_DIR = "commands"              # Папки матчей
+ANALYZER_DIR = "football_analyzer"     # Модули прогноза
+
+STAGES = ("analysis", "crawl", "readiness", "forecast")
+
+# Стадии, которые ходят на сайты: уже существующий артефакт без записи в состоянии
+# принимается как есть (первый запуск на готовой папке commands не парсит все заново)
+ADOPT_STAGES = ("analysis", "crawl")
+
+# Сколько задач каждой стадии может выполняться одновременно
+STAGE_LIMITS = {
+    "analysis": 4,    # HTTP-запросы к soccer365
+    "crawl": 1,       # Selenium + Scrapy, общий output.json
+    "readiness": 4,
+    "forecast": 4,
+}
+
+# Код, от которого зависит результат стадии (изменение кода - повод пересобрать)
+STAGE_CODE = {
+    "readiness": ["test.py", os.path.join("utils", "injury_index.py")],
+    "forecast": [os.path.join(ANALYZER_DIR, name) for name in
+                 ("main.py", "team_utils.py", "analysis_utils.py", "probability_utils.py", "markets.py")],
+}
+
+# =============================================================================
+# СОСТОЯНИЕ И ХЭШИ
+# =============================================================================
+
+def hash_inputs(paths: List[str], extra: str = "") -> str:
+    """sha1 по содержимому файлов (отсутствующий файл тоже учитывается) и доп. строке"""
+    digest = hashlib.sha1(extra.encode('utf-8'))
+    for path in paths:
+        digest.update(path.encode('utf-8'))
+        try:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        except FileNotFoundError:
+            digest.update(b'<missing>')
+    return digest.hexdigest()
+
+def injury_date() -> str:
+    """Статус травм зависит от даты: с хранилищем травм готовность пересчитывается раз в день"""
+    return date.today().isoformat() if os.path.exists(store_meta_path()) else ""
+
+class PipelineState:
+    """Хэши входов артефактов, сохраняются в JSON после каждой собранной задачи"""
+
+    def __init__(self, path: str = STATE_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.artifacts = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.artifacts = json.load(f).get("artifacts", {})
+            except (json.JSONDecodeError, OSError) as e:
+                logging.warning(f"Не удалось прочитать {path}, состояние сброшено: {e}")
+
+    def is_fresh(self, output: str, inputs_hash: str) -> bool:
+        with self.lock:
+            record = self.artifacts.get(output)
+        return bool(record) and record.get("inputs") == inputs_hash and os.path.exists(output)
+
+    def is_known(self, output: str) -> bool:
+        with self.lock:
+            return output in self.artifacts
+
+    def record(self, output: str, stage: str, inputs_hash: str) -> None:
+        with self.lock:
+            self.artifacts[output] = {
+                "stage": stage,
+                "inputs": inputs_hash,
+                "built_at": datetime.now().isoformat()
+            }
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"artifacts": self.artifacts}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+
+# =============================================================================
+# ГРАФ ЗАДАЧ
+# =============================================================================
+
+class Task:
+    """
+    Задача графа: собирает один артефакт.
+
+    inputs - функция, возвращающая хэш входов; вызывается непосредственно перед
+    запуском, когда зависимости уже собраны.
+    """
+
+    def __init__(self, task_id: str, stage: str, output: str, action: Callable[[], None],
+                 inputs: Callable[[], str], deps: Optional[List[str]] = None):
+        self.task_id = task_id
+        self.stage = stage
+        self.output = output
+        self.action = action
+        self.inputs = inputs
+        self.deps = deps or []
+
+class Orchestrator:
+    """Выполняет граф задач с учетом зависимостей, лимитов стадий и состояния"""
+
+    def __init__(self, state: PipelineState, workers: int = 4,
+                 refresh: Optional[List[str]] = None, skip: Optional[List[str]] = None):
+        self.state = state
+        self.workers = workers
+        self.refresh = set(refresh or [])
+        self.skip = set(skip or [])
+        self.limits = dict(STAGE_LIMITS)
+        self.results = {}  # task_id -> собран / актуален / пропущен / ошибка
+
+    def _run_task(self, task: Task) -> str:
+        if task.stage in self.skip:
+            if os.path.exists(task.output):
+                return "актуален"
+            raise RuntimeError(f"стадия {task.stage} отключена, а артефакта нет: {task.output}")
+
+        inputs_hash = task.inputs()
+        if task.stage not in self.refresh:
+            if self.state.is_fresh(task.output, inputs_hash):
+                return "актуален"
+            if task.stage in ADOPT_STAGES and os.path.exists(task.output) and not self.state.is_known(task.output):
+                self.state.record(task.output, task.stage, inputs_hash)
+                return "актуален"
+
+        started = time.time()
+        logging.info(f"▶️ {task.task_id}")
+        task.action()
+
+        if not os.path.exists(task.output) or os.path.getmtime(task.output) < started - 1:
+            raise RuntimeError(f"стадия не создала артефакт {task.output}")
+
+        # Хэш входов пересчитывается: сама стадия могла их дополнить
+        self.state.record(task.output, task.stage, task.inputs())
+        return "собран"
+
+    def _finish(self, task: Task, result: str) -> None:
+        """Итог задачи - в результаты и в каталог артефактов"""
+        self.results[task.task_id] = result
+        record_stage(task.output, task.stage, result)
+
+    def _submit_ready(self, executor: ThreadPoolExecutor, ready: Dict[str, deque],
+                      active: Dict[str, int], running: Dict) -> None:
+        """
+        Отдает в пул задачи из очередей стадий, пока у стадии и у пула есть свободные места.
+        Поздние стадии идут первыми: матч, дошедший до расчета, не ждет чужих парсингов.
+        """
+        for stage in reversed(STAGES):
+            queue = ready[stage]
+            while queue and active[stage] < self.limits.get(stage, self.workers) and len(running) < self.workers:
+                task = queue.popleft()
+                active[stage] += 1
+                running[executor.submit(self._run_task, task)] = task
+
+    def run(self, tasks: List[Task]) -> Dict[str, str]:
+        """Выполняет задачи; задачи с упавшими зависимостями пропускаются"""
+        pending = {task.task_id: task for task in tasks}
+        ready = {stage: deque() for stage in STAGES}
+        active = {stage: 0 for stage in STAGES}
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while pending or running or any(ready.values()):
+                # Задачи, чьи зависимости завершены, - в очередь их стадии
+                for task_id, task in list(pending.items()):
+                    dep_results = [self.results.get(dep) for dep in task.deps]
+                    if any(result is None for result in dep_results):
+                        continue
+                    del pending[task_id]
+                    if any(result in ("ошибка", "пропущен") for result in dep_results):
+                        self._finish(task, "пропущен")
+                        logging.warning(f"⏭️ {task_id}: зависимость не выполнена")
+                        continue
+                    ready[task.stage].append(task)
+
+                self._submit_ready(executor, ready, active, running)
+
+                if not running:
+                    if pending:
+                        # Зависимость на несуществующую задачу
+                        for task in pending.values():
+                            self._finish(task, "пропущен")
+                        pending.clear()
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    active[task.stage] -= 1
+                    try:
+                        self._finish(task, future.result())
+                        logging.info(f"✅ {task.task_id}: {self.results[task.task_id]}")
+                    except Exception as e:
+                        self._finish(task, "ошибка")
+                        logging.error(f"❌ {task.task_id}: {e}")
+
+        return self.results
+
+# =============================================================================
+# СТАДИИ КОНВЕЙЕРА
+# =============================================================================
+
+def load_module(name: str, path: str):
+    """Загрузка модуля по пути (test.py и football_analyzer/main.py конфликтуют по именам)"""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+class PipelineStages:
+    """Действия стадий; общие для всех матчей объекты создаются один раз"""
+
+    def __init__(self):
+        import team_parser
+        from utils.results_store import ResultsStore
+
+        self.team_parser = team_parser
+        # Хранилище результатов дописывается под блокировкой, запросы страниц - параллельно
+        self.results_store = _LockedStore(ResultsStore(team_parser.RESULTS_STORE_DIR), threading.Lock())
+        self.team_cache = {}  # team_id -> данные soccer365 за этот запуск
+        self.team_lock = threading.Lock()
+
+        self.player_analyzer = load_module("player_analyzer", "test.py").PlayerAnalyzer()
+
+        sys.path.insert(0, os.path.abspath(ANALYZER_DIR))
+        self.analyzer = load_module("football_analyzer_main", os.path.join(ANALYZER_DIR, "main.py"))
+
+    def _team_data(self, team_id: str, team_name: str, league_data: Dict) -> Optional[Dict]:
+        with self.team_lock:
+            if team_id in self.team_cache:
+                return self.team_cache[team_id]
+
+        team_data = self.team_parser.get_team_data_by_id(team_id, team_name, league_data.get('league_id'), self.results_store,
+                                                         league_data.get('league'))
+        if team_data:
+            team_data['league'] = league_data.get('league', 'Неизвестная лига')
+            team_data['league_id'] = league_data.get('league_id', 'unknown')
+            team_data['scraped_at'] = datetime.now().isoformat()
+
+        with self.team_lock:
+            self.team_cache[team_id] = team_data
+        return team_data
+
+    def analysis(self, match: Dict, league_data: Dict) -> None:
+        home_data = self._team_data(str(match['home_team_id']), match['home_team'], league_data)
+        away_data = self._team_data(str(match['away_team_id']), match['away_team'], league_data)
+        if not home_data or not away_data:
+            raise RuntimeError("нет данных soccer365 для одной из команд")
+        self.team_parser.save_match_analysis(
+            self.team_parser.build_match_analysis(match['match'], league_data, home_data, away_data),
+            COMMANDS_DIR
+        )
+
+    @staticmethod
+    def crawl(match: Dict, team_name: str, match_folder: str) -> None:
+        # Scrapy/Twisted-реактор нельзя перезапустить в процессе - каждый парсинг в подпроцессе
+        subprocess.run([
+            sys.executable, "parser_main.py",
+            "--match", f"{match['home_team'].strip()} - {match['away_team'].strip()}",
+            "--team", team_name,
+            "--match-folder", match_folder
+        ], check=True)
+
+    def readiness(self, team_file: str, res_file: str) -> None:
+        self.player_analyzer.analyze_team(team_file, res_file)
+
+    def forecast(self, match_folder: str) -> None:
+        result = self.analyzer.forecast_match_folder(match_folder)
+        if not result or result["forecast"] is None:
+            raise RuntimeError("нет данных для прогноза")
+        self.analyzer.save_match_forecast(result, match_folder)
+
+class _LockedStore:
+    """Обертка ResultsStore: append из нескольких потоков по очереди"""
+
+    def __init__(self, store, lock: threading.Lock):
+        self.store = store
+        self.lock = lock
+
+    def append(self, matches) -> int:
+        with self.lock:
+            return self.store.append(matches)
+
+# =============================================================================
+# ПОСТРОЕНИЕ ГРАФА
+# =============================================================================
+
+def collect_matches(match_filter: Optional[str] = None) -> List[Dict]:
+    """Матчи из всех upcoming_matches_*.json вместе с данными лиги"""
+    import team_parser
+
+    matches = []
+    for file_path in team_parser.find_all_upcoming_matches_files():
+        with open(file_path, 'r', encoding='utf-8') as f:
+            league_data = json.load(f)
+        for match in league_data.get('matches', []):
+            match.setdefault('match', f"{match.get('home_team', '')} - {match.get('away_team', '')}")
+            if match_filter and match['match'] != match_filter:
+                continue
+            if not match.get('home_team_id') or not match.get('away_team_id'):
+                logging.warning(f"Пропущен матч без ID команд: {match['match']}")
+                continue
+            matches.append({"match": match, "league_data": league_data})
+    return matches
+
+def build_match_tasks(match: Dict, league_data: Dict, stages: PipelineStages) -> List[Task]:
+    """Задачи одного матча"""
+    folder_name = stages.team_parser.match_folder_name(match['match'])
+    match_folder = os.path.join(COMMANDS_DIR, folder_name)
+    analysis_file = os.path.join(match_folder, f"{folder_name}_analysis.json")
+    match_record = json.dumps(match, sort_keys=True, ensure_ascii=False)
+
+    tasks = [Task(
+        f"analysis:{match['match']}", "analysis", analysis_file,
+        action=lambda: stages.analysis(match, league_data),
+        inputs=lambda: hash_inputs([], match_record)
+    )]
+
+    readiness_ids = []
+    for side in ("home_team", "away_team"):
+        team_name = match[side].strip()
+        team_file = os.path.join(match_folder, f"{team_name}.json")
+        res_file = os.path.join(match_folder, f"{team_name}_res.json")
+        crawl_id = f"crawl:{match['match']}:{team_name}"
+        readiness_id = f"readiness:{match['match']}:{team_name}"
+
+        tasks.append(Task(
+            crawl_id, "crawl", team_file,
+            action=lambda team_name=team_name: stages.crawl(match, team_name, match_folder),
+            inputs=lambda team_name=team_name: hash_inputs([], team_name),
+            deps=[tasks[0].task_id]
+        ))
+        tasks.append(Task(
+            readiness_id, "readiness", res_file,
+            action=lambda team_file=team_file, res_file=res_file: stages.readiness(team_file, res_file),
+            inputs=lambda team_file=team_file: hash_inputs([team_file, store_meta_path()] + STAGE_CODE["readiness"],
+                                                           injury_date()),
+            deps=[crawl_id]
+        ))
+        readiness_ids.append(readiness_id)
+
+    res_files = [os.path.join(match_folder, f"{match[side].strip()}_res.json") for side in ("home_team", "away_team")]
+    tasks.append(Task(
+        f"forecast:{match['match']}", "forecast",
+        os.path.join(match_folder, f"{folder_name}_forecast.json"),
+        action=lambda: stages.forecast(match_folder),
+        inputs=lambda: hash_inputs([analysis_file] + res_files + STAGE_CODE["forecast"]),
+        deps=[tasks[0].task_id] + readiness_ids
+    ))
+    return tasks
+
+# =============================================================================
+# ТОЧКА ВХОДА
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Оркестратор конвейера прогнозов")
+    parser.add_argument("--leagues", nargs="*", help="URL лиг soccer365: сначала обновить competitions")
+    parser.add_argument("--match", help='только матч "Хозяева - Гости"')
+    parser.add_argument("--workers", type=int, default=4, help="потоков в пуле")
+    parser.add_argument("--refresh", nargs="*", default=[], choices=STAGES,
+                        help="пересобрать стадии независимо от хэшей (данные с сайтов устаревают)")
+    parser.add_argument("--skip", nargs="*", default=[], choices=STAGES,
+                        help="не запускать стадии, использовать существующие артефакты")
+    parser.add_argument("--summary", action="store_true",
+                        help="после графа собрать сводный TXT/JSON football_analyzer")
+    args = parser.parse_args()
+
+    if sys.platform.startswith('win'):
+        sys.stdout.reconfigure(encoding='utf-8')
+    setup_logger()
+    http_replay.install()
+    metrics.serve()
+
+    if args.leagues:
+        from parsingComands import get_upcoming_matches_with_team_ids
+        for url in args.leagues:
+            logging.info(f"Обновление матчей лиги: {url}")
+            get_upcoming_matches_with_team_ids(url)
+
+    if os.path.isdir(INJURIES_DIR):
+        added = import_injury_files(InjuryStore(), INJURIES_DIR)
+        logging.info(f"Травмы из {INJURIES_DIR}: новых записей в хранилище {added}")
+
+    matches = collect_matches(args.match)
+    if not matches:
+        logging.error(f"Нет матчей для обработки. Проверьте папку {COMPETITIONS_DIR}.")
+        return
+
+    stages = PipelineStages()
+    tasks = []
+    for item in matches:
+        tasks.extend(build_match_tasks(item["match"], item["league_data"], stages))
+    logging.info(f"📋 Матчей: {len(matches)}, задач: {len(tasks)}")
+
+    start_time = time.time()
+    crawl_since = datetime.now().isoformat(timespec="seconds")
+    orchestrator = Orchestrator(PipelineState(), args.workers, args.refresh, args.skip)
+    results = orchestrator.run(tasks)
+
+    print("\n" + "=" * 60)
+    print("ИТОГ КОНВЕЙЕРА")
+    print("=" * 60)
+    for stage in STAGES:
+        stage_results = [result for task_id, result in results.items() if task_id.startswith(f"{stage}:")]
+        counts = {status: stage_results.count(status) for status in ("собран", "актуален", "пропущен", "ошибка")}
+        print(f"{stage:<10} " + ", ".join(f"{status}: {count}" for status, count in counts.items()))
+    print(f"⏱️ Время: {time.time() - start_time:.1f} сек")
+
+    crawls = crawl_stats.load_crawl_stats(since=crawl_since)
+    if crawls:
+        print(f"🕷️ Transfermarkt: {crawl_stats.format_aggregate(crawl_stats.aggregate(crawls))}")
+        suggestion = crawl_stats.suggest_throttle(crawls)
+        print(f"⚙️ Рекомендация: DOWNLOAD_DELAY={suggestion['download_delay']}, "
+              f"CONCURRENT_REQUESTS={suggestion['concurrent_requests']} ({suggestion['reason']})")
+
+    if args.summary:
+        stages.analyzer.process_all_matches(COMMANDS_DIR)
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 import requests
 from bs4 import BeautifulSoup
+from utils import http_replay
 import json
 import re
 
@@ -474,6 +475,8 @@ def get_team_data_from_soccer365(url):
         return None
 
 def main():
+    http_replay.install()
+    
     # Пример использования для Арсенала
     url = "https://soccer365.ru/clubs/149/"
     
@@ -1,5 +1,6 @@
 import requests
 from bs4 import BeautifulSoup
+from utils import http_replay
 import re
 
 def parse_last_5_matches(team_id=6974):
@@ -125,5 +126,6 @@ def print_matches(matches):
 
 # Пример использования
 if __name__ == "__main__":
+    http_replay.install()
     matches = parse_last_5_matches()
     print_matches(matches)
\ No newline at end of file
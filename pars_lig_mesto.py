@@ -4,6 +4,8 @@ import json
 import logging
 from typing import List, Dict
 
+from utils import http_replay
+
 class UniversalLeagueParser:
     """Универсальный парсер таблиц лиг с Transfermarkt"""
     
@@ -113,6 +115,7 @@ class UniversalLeagueParser:
 
 # Пример использования
 def main():
+    http_replay.install()
     parser = UniversalLeagueParser()
     
     # Список лиг для парсинга
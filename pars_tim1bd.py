@@ -1,6 +1,23 @@
+"""
+Сбор URL команд Transfermarkt в БД.
+
+    python pars_tim1bd.py                    # одна команда, название вводится вручную
+    python pars_tim1bd.py --batch            # все команды из competitions/, которых нет в БД
+
+В пакетном режиме команды, уже известные индексу названий (utils/team_resolver.py) или
+таблице Teams, пропускаются; остальные ищутся страницей поиска Transfermarkt по HTTP
+в --workers потоков, не найденные так - одним сеансом браузера; результаты записываются
+в БД одной транзакцией.
+"""
+
+import argparse
 import logging
+import time
 from database import Database
+from utils import http_replay
 from utils.logger import setup_logger
+from utils.team_resolver import (AUTO_METHODS, SEARCH_WORKERS, competition_teams, find_team_urls,
+                                 get_resolver, save_found_teams)
 from scraper.base_scraper import BaseScraper
 from scraper.team_scraper import TeamScraper
 
@@ -58,6 +75,62 @@ def parse_team_url_only(team_name):
         scraper.close_driver()
         db.close()
 
+def get_db_team_urls(team_names):
+    """URL команд, которые уже есть в БД, одним запросом: {название: URL}"""
+    if not team_names:
+        return {}
+    db = Database()
+    try:
+        with db.conn.cursor() as cursor:
+            placeholders = ", ".join(["%s"] * len(team_names))
+            cursor.execute(
+                f"SELECT team_name, team_url FROM Teams WHERE team_name IN ({placeholders})",
+                list(team_names)
+            )
+            return {row[0]: row[1] for row in cursor.fetchall()}
+    except Exception as e:
+        logging.error(f"Ошибка проверки команд в БД: {str(e)}")
+        return {}
+    finally:
+        db.close()
+
+def parse_team_urls_batch(competitions_dir="competitions", workers=SEARCH_WORKERS, browser=True):
+    """
+    Находит и сохраняет URL всех команд из матчей competitions/, которых еще нет в БД.
+    Возвращает (найдено, искали).
+    """
+    started = time.time()
+    teams = competition_teams(competitions_dir)
+    resolver = get_resolver()
+    # Известными считаются только точные совпадения и ID - похожее название может быть другим клубом
+    pending = []
+    for name, team_id in sorted(teams.items()):
+        found = resolver.resolve(name, team_id)
+        if not found or found["method"] not in AUTO_METHODS:
+            pending.append(name)
+    logging.info(f"Команд в матчах: {len(teams)}, нет в индексе названий: {len(pending)}")
+
+    # Точные совпадения в БД - в индекс, без поиска
+    in_db = get_db_team_urls(pending)
+    for name, url in in_db.items():
+        resolver.add_team(name, url, teams.get(name))
+    if resolver.changed:
+        resolver.save()
+    pending = [name for name in pending if name not in in_db]
+    if not pending:
+        logging.info("Все команды уже есть в БД")
+        return 0, 0
+
+    logging.info(f"Поиск на Transfermarkt: {len(pending)} команд")
+    found = find_team_urls(pending, workers, browser)
+    save_found_teams(resolver, found, teams)
+
+    for name in pending:
+        if name not in found:
+            logging.error(f"Не удалось найти URL для команды {name}")
+    logging.info(f"Найдено {len(found)} из {len(pending)} за {time.time() - started:.0f} сек")
+    return len(found), len(pending)
+
 def main():
     """Основная функция для сбора URL команды"""
     setup_logger()
@@ -80,5 +153,20 @@ def main():
         logging.error(f"Не удалось сохранить URL команды '{team_name}'")
 
 if __name__ == '__main__':
-    print("Парсинг URL команды и сохранение в БД (без игроков)")
-    main()
+    arg_parser = argparse.ArgumentParser(description="Парсинг URL команд и сохранение в БД (без игроков)")
+    arg_parser.add_argument("--batch", action="store_true",
+                            help="все команды из competitions/, которых нет в БД")
+    arg_parser.add_argument("--competitions", default="competitions", help="папка соревнований")
+    arg_parser.add_argument("--workers", type=int, default=SEARCH_WORKERS,
+                            help=f"одновременных запросов поиска (по умолчанию {SEARCH_WORKERS})")
+    arg_parser.add_argument("--no-browser", action="store_true",
+                            help="не искать в браузере команды, не найденные по HTTP")
+    args = arg_parser.parse_args()
+
+    if args.batch:
+        setup_logger()
+        http_replay.install()
+        parse_team_urls_batch(args.competitions, args.workers, not args.no_browser)
+    else:
+        print("Парсинг URL команды и сохранение в БД (без игроков)")
+        main()
@@ -11,6 +11,7 @@
 7. Отслеживает ошибки и позволяет повторно обработать упавшие команды
 """
 
+import argparse
 import json
 import logging
 import os
@@ -23,6 +24,9 @@ from twisted.internet import reactor, defer
 from scrapy.crawler import CrawlerRunner
 from scrapy.utils.log import configure_logging
 from database import Database
+from utils.catalog import KIND_UPCOMING, find_artifacts
+from utils import profiling
+from utils.team_resolver import find_team_urls, get_resolver, save_found_teams
 from utils.logger import setup_logger
 from scraper.transfermarkt_spider import TransfermarktSpider
 from scraper.base_scraper import BaseScraper
@@ -40,21 +44,26 @@ OUTPUT_JSON = "output.json"            # Временный файл для URL
 # ФУНКЦИИ ДЛЯ РАБОТЫ С БАЗОЙ ДАННЫХ
 # =============================================================================
 
-def get_team_url_from_db(team_name):
+def get_team_url_from_db(team_name, team_id=None):
     """
     Получает URL команды из базы данных по её названию.
     
     Аргументы:
         team_name (str): Название команды для поиска
+        team_id (str): ID команды soccer365 (если известен)
         
     Возвращает:
         str или None: URL команды на Transfermarkt или None если не найдена
         
     Логика:
-        1. Подключается к базе данных
-        2. Выполняет SQL запрос для поиска команды
+        1. Выполняет SQL запрос точного названия; найденная команда запоминается
+           в индексе названий (utils/team_resolver.py) вместе с ID soccer365
+        2. Если в БД такого названия нет - ищет в индексе только точные совпадения:
+           нормализованное название, подтвержденные псевдонимы, ID soccer365
         3. Возвращает URL или None с соответствующим логированием
     """
+    resolver = get_resolver()
+    team_url = None
     db = Database()
     try:
         with db.conn.cursor() as cursor:
@@ -63,19 +72,55 @@ def get_team_url_from_db(team_name):
                 (team_name,)
             )
             team = cursor.fetchone()
-            
-            if not team:
-                logging.error(f"Команда '{team_name}' не найдена в базе данных")
-                return None
-            
-            logging.info(f"Найден URL команды: {team[0]}")
-            return team[0]
-            
+            if team:
+                team_url = team[0]
     except Exception as e:
         logging.error(f"Ошибка получения URL команды: {str(e)}")
-        return None
     finally:
         db.close()  # Важно всегда закрывать соединение
+    
+    if team_url:
+        logging.info(f"Найден URL команды: {team_url}")
+        if resolver.teams.get(team_name) != team_url or (team_id and resolver.ids.get(str(team_id)) != team_name):
+            resolver.add_team(team_name, team_url, team_id)
+            resolver.save()
+        return team_url
+    
+    # Запасной путь: только точные совпадения индекса, похожие названия не принимаются
+    found = resolver.resolve(team_name, team_id)
+    if not found:
+        logging.error(f"Команда '{team_name}' не найдена в базе данных")
+        return None
+    if resolver.changed:
+        resolver.save()
+    logging.info(f"Найден URL команды: {found['url']} (индекс названий: '{found['name']}', {found['method']})")
+    return found['url']
+
+def resolve_missing_teams(matches, team_filter=None):
+    """
+    Находит на Transfermarkt команды, которых нет ни в индексе названий, ни в БД -
+    пачкой до начала парсинга (вместо ошибки на каждой команде): поиск по HTTP,
+    оставшиеся - одним сеансом браузера. Найденные URL сохраняются в БД и индекс.
+    
+    Возвращает:
+        int: сколько команд найдено
+    """
+    teams = {}
+    for match in matches:
+        for side in ('home', 'away'):
+            name = match.get(f'{side}_team', '').strip()
+            if name and team_filter in (None, name):
+                teams[name] = match.get(f'{side}_team_id')
+    
+    missing = [name for name, team_id in teams.items() if not get_team_url_from_db(name, team_id)]
+    if not missing:
+        return 0
+    
+    logging.info(f"🔎 Поиск на Transfermarkt команд, которых нет в БД: {', '.join(missing)}")
+    found = find_team_urls(missing)
+    save_found_teams(get_resolver(), found, teams)
+    logging.info(f"Найдено команд: {len(found)} из {len(missing)}")
+    return len(found)
 
 # =============================================================================
 # ФУНКЦИИ ДЛЯ РАБОТЫ С ФАЙЛАМИ
@@ -115,10 +160,10 @@ def get_all_matches_from_competitions():
               Каждый словарь содержит 'home_team' и 'away_team'
     
     Логика работы:
-        1. Рекурсивно обходит все папки внутри competitions
-        2. Ищет файлы, содержащие 'upcoming_matches' в имени
-        3. Из каждого файла извлекает список матчей
-        4. Добавляет все матчи в общий список
+        1. Берет из каталога артефактов файлы upcoming_matches_*.json
+           внутри competitions (при первом обращении папка индексируется)
+        2. Из каждого файла извлекает список матчей
+        3. Добавляет все матчи в общий список
     """
     all_matches = []
     
@@ -126,22 +171,19 @@ def get_all_matches_from_competitions():
         logging.error(f"Папка {COMPETITIONS_DIR} не существует")
         return all_matches
     
-    # os.walk рекурсивно обходит все подпапки
-    for root, dirs, files in os.walk(COMPETITIONS_DIR):
-        for filename in files:
-            if filename.endswith('.json') and 'upcoming_matches' in filename:
-                file_path = os.path.join(root, filename)
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
+    # Файлы берутся из каталога (utils/catalog.py), без каталога - обходом подпапок
+    for file_path in find_artifacts(COMPETITIONS_DIR, KIND_UPCOMING):
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            
+            # Извлекаем матчи из поля 'matches' (если оно есть)
+            for match in data.get('matches', []):
+                all_matches.append(match)
+                logging.info(f"Матч: {match['home_team']} vs {match['away_team']}")
                     
-                    # Извлекаем матчи из поля 'matches' (если оно есть)
-                    for match in data.get('matches', []):
-                        all_matches.append(match)
-                        logging.info(f"Матч: {match['home_team']} vs {match['away_team']}")
-                            
-                except Exception as e:
-                    logging.error(f"Ошибка чтения {filename}: {str(e)}")
+        except Exception as e:
+            logging.error(f"Ошибка чтения {os.path.basename(file_path)}: {str(e)}")
     
     logging.info(f"Всего матчей: {len(all_matches)}")
     return all_matches
@@ -273,7 +315,7 @@ def print_final_summary(successful_matches, total_matches):
 # =============================================================================
 
 @defer.inlineCallbacks
-def process_team(team_name, match_folder, runner, retry_count=0):
+def process_team(team_name, match_folder, runner, retry_count=0, team_id=None):
     """
     Асинхронно обрабатывает одну команду.
     
@@ -282,6 +324,7 @@ def process_team(team_name, match_folder, runner, retry_count=0):
         match_folder (str): Путь к папке матча для сохранения результатов
         runner (CrawlerRunner): Экземпляр Scrapy runner
         retry_count (int): Номер текущей попытки (для логирования)
+        team_id (str): ID команды soccer365 для поиска URL
         
     Возвращает:
         bool: True если обработка успешна, False при ошибке
@@ -310,7 +353,7 @@ def process_team(team_name, match_folder, runner, retry_count=0):
             time.sleep(delay)
             
             # ШАГ 1: Получаем URL команды из базы данных
-            team_url = get_team_url_from_db(team_name)
+            team_url = get_team_url_from_db(team_name, team_id)
             if not team_url:
                 error_msg = "URL команды не найден в базе данных"
                 log_failed_team(team_name, error_msg)
@@ -384,7 +427,7 @@ def process_team(team_name, match_folder, runner, retry_count=0):
     defer.returnValue(False)
 
 @defer.inlineCallbacks
-def process_match(match, match_index, runner):
+def process_match(match, match_index, runner, team_filter=None, match_folder=None):
     """
     Асинхронно обрабатывает один матч (обе команды).
     
@@ -392,9 +435,11 @@ def process_match(match, match_index, runner):
         match (dict): Словарь с информацией о матче (home_team, away_team)
         match_index (int): Номер матча в общем списке
         runner (CrawlerRunner): Экземпляр Scrapy runner
+        team_filter (str): Обработать только эту команду матча (None - обе)
+        match_folder (str): Папка матча вместо создаваемой по названиям команд
         
     Возвращает:
-        bool: True если обе команды обработаны успешно, иначе False
+        bool: True если обе команды (или выбранная) обработаны успешно, иначе False
     
     Логика:
         1. Создает папку для матча
@@ -416,19 +461,27 @@ def process_match(match, match_index, runner):
     logging.info(f"{'#'*60}")
     
     # Создаем папку для хранения результатов этого матча
-    match_folder = create_match_folder(home_team, away_team)
+    if match_folder:
+        os.makedirs(match_folder, exist_ok=True)
+    else:
+        match_folder = create_match_folder(home_team, away_team)
     
-    # Обрабатываем домашнюю команду
-    logging.info(f"\n🏠 ДОМАШНЯЯ КОМАНДА: {home_team}")
-    success_home = yield process_team(home_team, match_folder, runner)
+    # Команда, не попавшая под фильтр, считается обработанной
+    success_home = success_away = True
     
-    # Небольшая пауза между обработкой команд
-    if success_home:
-        time.sleep(random.uniform(2, 5))
+    # Обрабатываем домашнюю команду
+    if team_filter in (None, home_team):
+        logging.info(f"\n🏠 ДОМАШНЯЯ КОМАНДА: {home_team}")
+        success_home = yield process_team(home_team, match_folder, runner, team_id=match.get('home_team_id'))
+        
+        # Небольшая пауза между обработкой команд
+        if success_home and team_filter is None:
+            time.sleep(random.uniform(2, 5))
     
     # Обрабатываем гостевую команду
-    logging.info(f"\n✈️ ГОСТЕВАЯ КОМАНДА: {away_team}")
-    success_away = yield process_team(away_team, match_folder, runner)
+    if team_filter in (None, away_team):
+        logging.info(f"\n✈️ ГОСТЕВАЯ КОМАНДА: {away_team}")
+        success_away = yield process_team(away_team, match_folder, runner, team_id=match.get('away_team_id'))
     
     # Итог по матчу
     if success_home and success_away:
@@ -486,11 +539,16 @@ def retry_failed_teams_only():
 # =============================================================================
 
 @defer.inlineCallbacks
-def main():
+def main(match_filter=None, team_filter=None, match_folder=None):
     """
     ГЛАВНАЯ ФУНКЦИЯ ПРОГРАММЫ
     =========================
     
+    Аргументы (для запуска по одному матчу, например из orchestrator.py):
+        match_filter (str): Обработать только матч "Хозяева - Гости"
+        team_filter (str): Обработать только одну команду этого матча
+        match_folder (str): Папка для результатов вместо commands/{матч}
+    
     Полный цикл работы:
         1. Настройка логирования и окружения
         2. Получение списка всех матчей из competitions
@@ -512,8 +570,9 @@ def main():
     setup_logger()
     configure_logging()
     
-    # Очищаем лог ошибок при новом запуске
-    if os.path.exists(ERROR_LOG_FILE):
+    # Очищаем лог ошибок при новом полном запуске
+    # (запуск по одному матчу дописывает в общий лог)
+    if match_filter is None and os.path.exists(ERROR_LOG_FILE):
         os.remove(ERROR_LOG_FILE)
         logging.info(f"Очищен файл лога ошибок: {ERROR_LOG_FILE}")
     
@@ -526,6 +585,10 @@ def main():
     
     # Получаем все матчи из папки competitions
     all_matches = get_all_matches_from_competitions()
+    if match_filter:
+        all_matches = [m for m in all_matches
+                       if f"{m.get('home_team', '').strip()} - {m.get('away_team', '').strip()}" == match_filter]
+        logging.info(f"Фильтр матча '{match_filter}': найдено {len(all_matches)}")
     if not all_matches:
         logging.error("Нет матчей для обработки. Проверьте папку competitions.")
         reactor.stop()
@@ -533,13 +596,20 @@ def main():
     
     logging.info(f"\n📋 Найдено матчей для обработки: {len(all_matches)}")
     
+    # Команды без URL - одним сеансом браузера до основного цикла
+    try:
+        resolve_missing_teams(all_matches, team_filter)
+    except Exception as e:
+        logging.error(f"Ошибка поиска недостающих команд: {str(e)}")
+    
     # Основной цикл обработки матчей
     successful_matches = 0
     start_time = datetime.now()
     
     for i, match in enumerate(all_matches, 1):
         try:
-            success = yield process_match(match, i, runner)
+            with profiling.section(f"{match.get('home_team', '').strip()} - {match.get('away_team', '').strip()}"):
+                success = yield process_match(match, i, runner, team_filter, match_folder)
             if success:
                 successful_matches += 1
             
@@ -582,9 +652,17 @@ if __name__ == '__main__':
     Точка входа в программу.
     Запускает главную функцию и реактор Twisted.
     """
+    arg_parser = argparse.ArgumentParser(description="Парсер игроков Transfermarkt")
+    arg_parser.add_argument("--match", help='обработать только матч "Хозяева - Гости"')
+    arg_parser.add_argument("--team", help="обработать только одну команду матча (вместе с --match)")
+    arg_parser.add_argument("--match-folder", help="папка для результатов матча")
+    profiling.add_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    
     try:
-        main()
-        reactor.run()  # Запускаем асинхронный реактор
+        with profiling.session("parser_main", args):
+            main(args.match, args.team, args.match_folder)
+            reactor.run()  # Запускаем асинхронный реактор
     except KeyboardInterrupt:
         logging.info("\n⚠️ Программа остановлена пользователем")
         reactor.stop()
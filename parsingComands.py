@@ -6,6 +6,9 @@ import re
 from datetime import datetime
 import time
 
+from utils import http_replay
+from utils.catalog import record_artifact
+
 def get_upcoming_matches_with_team_ids(url):
     """
     Получение предстоящих матчей с ID команд из ссылок /clubs/
@@ -204,6 +207,7 @@ def save_upcoming_matches(data):
         
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
+        record_artifact(filename)
         
         print(f"✅ Данные сохранены в: {filename}")
         
@@ -215,6 +219,8 @@ def save_upcoming_matches(data):
         print(f"Ошибка сохранения файла: {e}")
 
 def main():
+    http_replay.install()
+    
     # Массив URL лиг
     league_urls = [
         # "https://soccer365.ru/competitions/723/",  
@@ -7,6 +7,8 @@ from webdriver_manager.chrome import ChromeDriverManager
 import time
 import logging
 
+from utils import metrics
+
 class BaseScraper:
     def __init__(self):
         self.driver = self.init_driver()
@@ -16,7 +18,8 @@ class BaseScraper:
         options = Options()
         options.add_argument('--headless=new')
         options.add_argument('--disable-blink-features=AutomationControlled')
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+        with metrics.timer("scraper_driver_start_seconds"):
+            driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
         return driver
 
     def close_driver(self):
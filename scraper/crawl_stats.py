@@ -0,0 +1,257 @@
+# scraper/crawl_stats.py
+"""
+Статистика обходов Transfermarkt: расширение Scrapy + чтение сводки.
+
+Расширение CrawlStatsExtension (EXTENSIONS в custom_settings пауков) считает по каждому
+обходу (один запуск паука = одна команда): время загрузки страниц, коды ответов (в том числе
+ответы, ушедшие на повтор), долю блокировок (403/429/503), 404, повторы, ошибки загрузки,
+объем данных, фактическую скорость. При закрытии паука сводка дописывается строкой
+в CRAWL_STATS_FILE (JSON Lines, путь от корня проекта) - ее читают оркестратор и настройка
+задержек (suggest_throttle).
+
+Просмотр:
+    python -m scraper.crawl_stats                    # последние обходы по командам
+    python -m scraper.crawl_stats --spider transfermarkt_injury_spider --last 50
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+try:
+    from config import CRAWL_STATS_FILE
+except ImportError:
+    CRAWL_STATS_FILE = "crawl_stats.jsonl"
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BLOCK_STATUSES = (403, 429, 503)  # Ответы, означающие, что сайт режет частоту запросов
+
+# Подбор задержки по статистике (suggest_throttle)
+BLOCK_RATE_HIGH = 0.05   # Доля блокировок, при которой задержку нужно увеличить
+BLOCK_RATE_LOW = 0.01    # Доля, при которой можно ускоряться
+MIN_DOWNLOAD_DELAY = 2.0
+MAX_DOWNLOAD_DELAY = 60.0
+
+
+def stats_path(path: Optional[str] = None) -> str:
+    path = path or CRAWL_STATS_FILE
+    return path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+
+class CrawlStatsExtension:
+    """Сводка по обходу: сигналы Scrapy + счетчики его stats collector"""
+
+    def __init__(self, crawler, path: str):
+        self.crawler = crawler
+        self.path = path
+        self.latencies: List[float] = []
+        self.status_counts: Dict[int, int] = {}
+        self.bytes = 0
+        self.started = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        from scrapy import signals
+        from scrapy.exceptions import NotConfigured
+
+        if not crawler.settings.getbool('CRAWL_STATS_ENABLED', True):
+            raise NotConfigured
+        extension = cls(crawler, stats_path(crawler.settings.get('CRAWL_STATS_FILE')))
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.response_downloaded, signal=signals.response_downloaded)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        return extension
+
+    def spider_opened(self, spider):
+        self.started = time.time()
+
+    def response_downloaded(self, response, request, spider):
+        # Каждый скачанный ответ, включая те, что RetryMiddleware отправит на повтор
+        self.status_counts[response.status] = self.status_counts.get(response.status, 0) + 1
+        self.bytes += len(response.body)
+        latency = request.meta.get('download_latency')
+        if latency is not None:
+            self.latencies.append(latency)
+
+    def summary(self, spider, reason: str) -> Dict:
+        stats = self.crawler.stats.get_stats()
+        settings = self.crawler.settings
+        finished = time.time()
+        duration = finished - (self.started or finished)
+        responses = sum(self.status_counts.values())
+        blocked = sum(self.status_counts.get(status, 0) for status in BLOCK_STATUSES)
+        return {
+            "spider": spider.name,
+            "team": getattr(spider, 'team_name', None),
+            "started_at": datetime.fromtimestamp(self.started or finished).isoformat(timespec="seconds"),
+            "finished_at": datetime.fromtimestamp(finished).isoformat(timespec="seconds"),
+            "finish_reason": reason,
+            "duration": round(duration, 2),
+            "requests": stats.get('downloader/request_count', 0),
+            "responses": responses,
+            "status_counts": {str(status): count for status, count in sorted(self.status_counts.items())},
+            "blocked": blocked,
+            "block_rate": round(blocked / responses, 4) if responses else 0.0,
+            "not_found": self.status_counts.get(404, 0),
+            "retries": stats.get('retry/count', 0),
+            "retry_max_reached": stats.get('retry/max_reached', 0),
+            "exceptions": stats.get('downloader/exception_count', 0),
+            "bytes": self.bytes,
+            "latency": {
+                "mean": round(statistics.mean(self.latencies), 3) if self.latencies else None,
+                "p50": percentile(self.latencies, 0.5),
+                "p95": percentile(self.latencies, 0.95),
+                "max": round(max(self.latencies), 3) if self.latencies else None,
+            },
+            "pages_per_minute": round(responses / duration * 60, 2) if duration > 0 else None,
+            "download_delay": settings.getfloat('DOWNLOAD_DELAY'),
+            "concurrent_requests": settings.getint('CONCURRENT_REQUESTS'),
+        }
+
+    def spider_closed(self, spider, reason):
+        record = self.summary(spider, reason)
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # Одна строка на обход: дописывание из нескольких процессов не портит файл
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logging.warning(f"Не удалось записать статистику обхода в {self.path}: {e}")
+            return
+        spider.logger.info(
+            f"Статистика обхода: {record['responses']} ответов, блокировок {record['block_rate']:.1%}, "
+            f"повторов {record['retries']}, {record['bytes'] / 1024:.0f} КБ за {record['duration']:.0f} с"
+        )
+
+
+# ---------------------------------------------------------------------------
+# Чтение сводки
+# ---------------------------------------------------------------------------
+
+def load_crawl_stats(path: Optional[str] = None, spider: Optional[str] = None,
+                     since: Optional[str] = None) -> List[Dict]:
+    """Записи обходов (since - ISO-время начала, не раньше которого брать обходы)"""
+    path = stats_path(path)
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if spider and record.get("spider") != spider:
+                continue
+            if since and record.get("started_at", "") < since:
+                continue
+            records.append(record)
+    return records
+
+
+def latest_by_team(records: List[Dict]) -> Dict[str, Dict]:
+    """Последний обход каждой команды"""
+    teams = {}
+    for record in records:
+        teams[record.get("team") or "—"] = record
+    return teams
+
+
+def aggregate(records: List[Dict]) -> Dict:
+    """Сумма по набору обходов"""
+    responses = sum(r["responses"] for r in records)
+    blocked = sum(r["blocked"] for r in records)
+    duration = sum(r["duration"] for r in records)
+    latencies = [r["latency"]["mean"] for r in records if r["latency"]["mean"] is not None]
+    return {
+        "crawls": len(records),
+        "responses": responses,
+        "blocked": blocked,
+        "block_rate": blocked / responses if responses else 0.0,
+        "not_found": sum(r["not_found"] for r in records),
+        "retries": sum(r["retries"] for r in records),
+        "exceptions": sum(r["exceptions"] for r in records),
+        "bytes": sum(r["bytes"] for r in records),
+        "duration": duration,
+        "mean_latency": statistics.mean(latencies) if latencies else None,
+        "pages_per_minute": responses / duration * 60 if duration > 0 else None,
+    }
+
+
+def suggest_throttle(records: List[Dict]) -> Optional[Dict]:
+    """
+    Задержка и параллельность для следующих обходов по последним обходам:
+    блокировок больше BLOCK_RATE_HIGH - задержка в 1.5 раза больше и один запрос за раз,
+    меньше BLOCK_RATE_LOW без исчерпанных повторов - задержка на 20% меньше.
+    """
+    if not records:
+        return None
+    total = aggregate(records)
+    current_delay = records[-1].get("download_delay") or MIN_DOWNLOAD_DELAY
+    concurrency = records[-1].get("concurrent_requests") or 1
+    exhausted = sum(r["retry_max_reached"] for r in records)
+
+    if total["block_rate"] > BLOCK_RATE_HIGH or exhausted:
+        delay = min(MAX_DOWNLOAD_DELAY, current_delay * 1.5)
+        concurrency = 1
+        reason = f"блокировок {total['block_rate']:.1%}, исчерпано повторов {exhausted}"
+    elif total["block_rate"] < BLOCK_RATE_LOW:
+        delay = max(MIN_DOWNLOAD_DELAY, current_delay * 0.8)
+        reason = f"блокировок {total['block_rate']:.1%} - можно быстрее"
+    else:
+        delay = current_delay
+        reason = f"блокировок {total['block_rate']:.1%} - без изменений"
+    return {"download_delay": round(delay, 1), "concurrent_requests": concurrency, "reason": reason}
+
+
+def format_aggregate(total: Dict) -> str:
+    latency = f"{total['mean_latency']:.2f} с" if total["mean_latency"] is not None else "—"
+    speed = f"{total['pages_per_minute']:.1f} стр/мин" if total["pages_per_minute"] is not None else "—"
+    return (f"обходов {total['crawls']}, ответов {total['responses']}, блокировок {total['block_rate']:.1%}, "
+            f"404: {total['not_found']}, повторов {total['retries']}, ошибок {total['exceptions']}, "
+            f"{total['bytes'] / 1024 / 1024:.1f} МБ, загрузка {latency}, {speed}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Статистика обходов Transfermarkt")
+    parser.add_argument("--file", default=None, help=f"файл статистики (по умолчанию {CRAWL_STATS_FILE})")
+    parser.add_argument("--spider", help="только этот паук")
+    parser.add_argument("--last", type=int, default=20, help="последних обходов для подбора задержки")
+    args = parser.parse_args()
+
+    if sys.platform.startswith('win'):
+        sys.stdout.reconfigure(encoding='utf-8')
+
+    records = load_crawl_stats(args.file, args.spider)
+    if not records:
+        print("❌ Статистики обходов нет")
+        return
+
+    print(f"📊 {format_aggregate(aggregate(records))}")
+    for team, record in sorted(latest_by_team(records).items()):
+        latency = record["latency"]
+        p95 = f"{latency['p95']:.2f} с" if latency["p95"] is not None else "—"
+        print(f"  {team:<25} {record['finished_at']}  ответов {record['responses']:>3}, "
+              f"блок. {record['block_rate']:.0%}, 404: {record['not_found']}, повторов {record['retries']}, p95 {p95}")
+
+    suggestion = suggest_throttle(records[-args.last:])
+    print(f"⚙️ Рекомендация: DOWNLOAD_DELAY={suggestion['download_delay']}, "
+          f"CONCURRENT_REQUESTS={suggestion['concurrent_requests']} ({suggestion['reason']})")
+
+
+if __name__ == '__main__':
+    main()
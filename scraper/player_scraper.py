@@ -6,10 +6,13 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import logging
 
+from utils import metrics
+
 class PlayerScraper:
     def __init__(self, driver):
         self.driver = driver
 
+    @metrics.timed("player_urls_seconds")
     def find_all_urls(self, url):
         """Найти все URL игроков на странице команды."""
         try:
@@ -22,11 +25,14 @@ class PlayerScraper:
                 By.XPATH, '//table[contains(@class, "items")]//a[contains(@href, "/profil/spieler/")]'
             )
             
-            return [
+            urls = [
                 f"https://www.transfermarkt.world/-/leistungsdaten/spieler/{link.get_attribute('href').split('/')[-1]}/plus/1#gesamt"
                 for link in player_links if link.get_attribute('href')
             ]
+            metrics.inc("player_urls_total", len(urls))
+            return urls
         except Exception as e:
+            metrics.inc("player_urls_errors_total")
             logging.error(f"Ошибка парсинга {url}: {str(e)}")
             return []
 
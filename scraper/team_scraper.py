@@ -5,6 +5,44 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import logging
 import time
+from urllib.parse import urljoin
+
+import requests
+from bs4 import BeautifulSoup
+
+SEARCH_URL = "https://www.transfermarkt.com/schnellsuche/ergebnis/schnellsuche"
+SEARCH_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+SEARCH_TIMEOUT = 20
+
+
+def search_team_url(team_name, session=None):
+    """
+    Найти URL команды через страницу поиска Transfermarkt без браузера.
+    Возвращает URL первого клуба в результатах или None (не найдена, отказ сайта, ошибка сети).
+    """
+    http = session or requests
+    try:
+        response = http.get(SEARCH_URL, params={'query': team_name}, headers=SEARCH_HEADERS,
+                            timeout=SEARCH_TIMEOUT)
+    except requests.RequestException as e:
+        logging.warning(f"Ошибка поиска команды '{team_name}': {e}")
+        return None
+    if response.status_code != 200:
+        logging.warning(f"Поиск команды '{team_name}': ответ {response.status_code}")
+        return None
+
+    soup = BeautifulSoup(response.content, 'html.parser')
+    for link in soup.select('table.items td.hauptlink a'):
+        href = link.get('href') or ''
+        if '/startseite/verein/' in href:
+            team_url = urljoin(SEARCH_URL, href)
+            logging.info(f"Найдена команда: {link.get_text(strip=True)} ({team_url})")
+            return team_url
+    return None
+
 
 class TeamScraper:
     def __init__(self, driver):
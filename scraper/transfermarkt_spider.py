@@ -6,6 +6,9 @@ from scrapy.exceptions import CloseSpider
 from fake_useragent import UserAgent
 from scrapy import Request
 
+from utils import metrics
+from utils.artifacts import load_artifact, save_artifact
+
 class TransfermarktSpider(scrapy.Spider):
     """Парсер статистики игроков с Transfermarkt"""
     
@@ -33,11 +36,16 @@ class TransfermarktSpider(scrapy.Spider):
         'USER_AGENT': UserAgent().random,
         'COOKIES_ENABLED': True,
         'COOKIES_DEBUG': False,
+        # Запись/воспроизведение ответов (HTTP_REPLAY_MODE, см. utils/http_replay.py)
+        'DOWNLOADER_MIDDLEWARES': {'utils.http_replay.ReplayDownloaderMiddleware': 950},
+        # Задержки, коды ответов и повторы по командам (см. scraper/crawl_stats.py)
+        'EXTENSIONS': {'scraper.crawl_stats.CrawlStatsExtension': 500},
     }
     def __init__(self, team_name=None, match_folder=None, *args, **kwargs):
         super(TransfermarktSpider, self).__init__(*args, **kwargs)
         self.team_name = team_name 
         self.match_folder = match_folder
+        self.players = {}  # url -> данные игрока; файл состава пишется один раз в closed()
         self.ua = UserAgent()
         self.logger.info(f"Паук инициализирован для команды: {team_name}")
         self.logger.info(f"Папка для сохранения: {match_folder}")
@@ -69,8 +77,12 @@ class TransfermarktSpider(scrapy.Spider):
             self.logger.error(f"Ошибка загрузки URL: {str(e)}")
             raise CloseSpider('Ошибка в стартовых URL')
 
+    @metrics.timed("spider_parse_seconds", spider="transfermarkt_spider")
     def parse(self, response):
         """Обработка страницы игрока"""
+        metrics.inc("spider_responses_total", spider=self.name, status=response.status)
+        if response.meta.get('download_latency') is not None:
+            metrics.observe("spider_download_seconds", response.meta['download_latency'], spider=self.name)
         if response.status != 200:
             self.logger.error(f"Ошибка {response.status}: {response.url}")
             return
@@ -97,34 +109,34 @@ class TransfermarktSpider(scrapy.Spider):
             self.logger.error(f"Ошибка парсинга {response.url}: {str(e)}")
 
     def save_player_data(self, player_data):
-        """Сохранение данных игрока в папку матча"""
+        """Игрок копится в памяти; состав сохраняется целиком при закрытии паука"""
+        self.players[player_data['url']] = player_data
+
+    def closed(self, reason):
+        """
+        Запись состава в папку матча одним файлом: игроки из существующего файла
+        обновляются по url, новые добавляются в конец. Недописанный состав на диске
+        не появляется - потоковый анализ (watch.py) видит только готовый файл.
+        """
+        if not self.players:
+            return
         file_name = os.path.join(self.match_folder, f"{self.team_name}.json")
-        
+
         try:
-            # Читаем существующие данные
             try:
-                with open(file_name, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
+                existing_data = load_artifact(file_name)
             except FileNotFoundError:
                 existing_data = []
 
-            # Проверяем, есть ли уже такой игрок
-            player_exists = False
-            for i, existing_player in enumerate(existing_data):
-                if existing_player.get('url') == player_data['url']:
-                    existing_data[i] = player_data
-                    player_exists = True
-                    break
-
-            # Если игрок не существует, добавляем его
-            if not player_exists:
-                existing_data.append(player_data)
+            squad = []
+            for existing_player in existing_data:
+                squad.append(self.players.pop(existing_player.get('url'), existing_player))
+            squad.extend(self.players.values())
 
-            # Сохраняем данные
-            with open(file_name, 'w', encoding='utf-8') as f:
-                json.dump(existing_data, f, ensure_ascii=False, indent=4)
+            with metrics.timer("spider_save_seconds", spider=self.name):
+                save_artifact(file_name, squad, indent=4)
 
-            self.logger.info(f"Сохранено в: {file_name}")
+            self.logger.info(f"Сохранено игроков: {len(squad)} в {file_name} ({reason})")
 
         except Exception as e:
             self.logger.error(f"Ошибка сохранения в {file_name}: {str(e)}")
@@ -1,3 +1,4 @@
+import argparse
 import requests
 from bs4 import BeautifulSoup
 import json
@@ -5,7 +6,13 @@ import re
 import os
 from pathlib import Path
 import time
-from datetime import datetime
+from datetime import datetime, date
+from utils import http_replay, profiling
+from utils.artifacts import save_artifact
+from utils.catalog import KIND_UPCOMING, find_artifacts
+from utils.results_store import ResultsStore
+
+RESULTS_STORE_DIR = "results_store"  # Колоночное хранилище всех сыгранных матчей
 
 
 def find_all_upcoming_matches_files():
@@ -20,18 +27,17 @@ def find_all_upcoming_matches_files():
         print(f"Папка {competitions_dir} не найдена!")
         return matches_files
     
-    # Рекурсивно обходим все папки внутри competitions
-    for root, dirs, files in os.walk(competitions_dir):
-        for file in files:
-            if file.startswith('upcoming_matches_') and file.endswith('.json'):
-                full_path = os.path.join(root, file)
-                matches_files.append(full_path)
-                print(f"Найден файл: {full_path}")
+    # Файлы из каталога артефактов (без каталога - рекурсивный обход competitions)
+    for full_path in find_artifacts(competitions_dir, KIND_UPCOMING):
+        matches_files.append(full_path)
+        print(f"Найден файл: {full_path}")
     
     return matches_files
-def get_team_data_by_id(team_id, team_name):
+def get_team_data_by_id(team_id, team_name, league_id=None, results_store=None, league_name=None):
     """
     Получает расширенные данные команды по её ID с soccer365.ru
+    Если передан results_store, все сыгранные матчи из расписания сохраняются в него
+    (league_id/league_name - лига файла матчей, см. extract_played_matches).
     """
     try:
         url = f"https://soccer365.ru/clubs/{team_id}/"
@@ -48,47 +54,10 @@ def get_team_data_by_id(team_id, team_name):
             return None
         
         soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # 1. Позиция в лиге
-        position = None
-        standings_table = soup.find('table', class_='stngs')
-        if standings_table:
-            for row in standings_table.find_all('tr'):
-                team_link = row.find('a', href=f"/clubs/{team_id}/")
-                if team_link:
-                    first_cell = row.find('td')
-                    if first_cell:
-                        match = re.search(r'(\d+)', first_cell.text.strip())
-                        if match:
-                            position = int(match.group(1))
-                            break
-        
-        # 2. Последние результаты
-        last_results = get_team_last_results(soup, team_id, team_name)
-        
-        # 3. Статистика голов (НОВАЯ ФУНКЦИЯ)
-        scoring_stats = calculate_team_scoring_stats(soup, team_id, team_name)
-        
-        # 4. Формируем статистику
-        form_stats = {
-            'total_matches': len(last_results),
-            'wins': last_results.count(1),
-            'draws': last_results.count(0.5),
-            'losses': last_results.count(0),
-            'points': last_results.count(1) * 3 + last_results.count(0.5),
-            'form': ''.join(['W' if r == 1 else 'D' if r == 0.5 else 'L' for r in last_results])
-        }
-        
-        # 5. Собираем все данные о команде
-        team_data = {
-            'team_id': team_id,
-            'team_name': team_name,
-            'team_url': url,
-            'position_in_league': position,
-            'last_results': last_results,
-            'form_stats': form_stats,
-            'scoring_stats': scoring_stats  # Добавляем новую статистику
-        }
+        team_data = parse_team_page(soup, team_id, team_name, url, league_id, results_store, league_name)
+        position = team_data['position_in_league']
+        form_stats = team_data['form_stats']
+        scoring_stats = team_data['scoring_stats']
         
         print(f"✓ Данные получены: {team_name}")
         print(f"  Позиция: {position}, Форма: {form_stats['form']}")
@@ -102,6 +71,56 @@ def get_team_data_by_id(team_id, team_name):
         print(f"Ошибка для команды {team_name}: {str(e)[:100]}")
         return None
 
+def parse_team_page(soup, team_id, team_name, url=None, league_id=None, results_store=None, league_name=None):
+    """
+    Разбор страницы клуба soccer365.ru (без запроса - для сохраненных страниц и бенчмарков).
+    Если передан results_store, все сыгранные матчи из расписания сохраняются в него.
+    """
+    # 1. Позиция в лиге
+    position = None
+    standings_table = soup.find('table', class_='stngs')
+    if standings_table:
+        for row in standings_table.find_all('tr'):
+            team_link = row.find('a', href=f"/clubs/{team_id}/")
+            if team_link:
+                first_cell = row.find('td')
+                if first_cell:
+                    match = re.search(r'(\d+)', first_cell.text.strip())
+                    if match:
+                        position = int(match.group(1))
+                        break
+    
+    # 2. Последние результаты
+    last_results = get_team_last_results(soup, team_id, team_name)
+    
+    # 3. Статистика голов (НОВАЯ ФУНКЦИЯ)
+    scoring_stats = calculate_team_scoring_stats(soup, team_id, team_name)
+    
+    # 3.1 Все сыгранные матчи - в историческое хранилище
+    if results_store is not None:
+        results_store.append(extract_played_matches(soup, league_id, league_name))
+    
+    # 4. Формируем статистику
+    form_stats = {
+        'total_matches': len(last_results),
+        'wins': last_results.count(1),
+        'draws': last_results.count(0.5),
+        'losses': last_results.count(0),
+        'points': last_results.count(1) * 3 + last_results.count(0.5),
+        'form': ''.join(['W' if r == 1 else 'D' if r == 0.5 else 'L' for r in last_results])
+    }
+    
+    # 5. Собираем все данные о команде
+    return {
+        'team_id': team_id,
+        'team_name': team_name,
+        'team_url': url or f"https://soccer365.ru/clubs/{team_id}/",
+        'position_in_league': position,
+        'last_results': last_results,
+        'form_stats': form_stats,
+        'scoring_stats': scoring_stats  # Добавляем новую статистику
+    }
+
 def get_team_last_results(soup, team_id, team_name):
     """
     Извлекает последние результаты команды из расписания.
@@ -287,7 +306,133 @@ def calculate_team_scoring_stats(soup, team_id, team_name):
     
     return scoring_stats
 
-def process_teams_from_file(file_path):
+def parse_schedule_date(text, today=None):
+    """
+    Извлекает дату матча из блока расписания: '14.03.2026' или '14.03, 20:30'.
+    Если год не указан, берется последний год, в котором дата еще не наступила.
+    """
+    match = re.search(r'(\d{1,2})\.(\d{1,2})(?:\.(\d{2,4}))?', text)
+    if not match:
+        return None
+    
+    today = today or date.today()
+    day, month = int(match.group(1)), int(match.group(2))
+    try:
+        if match.group(3):
+            year = int(match.group(3))
+            return date(year + 2000 if year < 100 else year, month, day)
+        
+        # Сыгранный матч не может быть в будущем
+        played = date(today.year, month, day)
+        return played if played <= today else date(today.year - 1, month, day)
+    except ValueError:
+        return None
+
+def schedule_competition_id(block, league_id=None, league_name=None):
+    """
+    ID турнира матча из расписания клуба: ссылка /competitions/N/ в блоке матча,
+    иначе league_id, если турнир в блоке (div.cmp: 'Бундеслига, 1 тур') - это лига
+    league_name ('Чемпионат Германии по футболу 2025/2026, Бундеслига').
+    Кубки и еврокубки в расписании клуба идут вперемешку с лигой - неизвестный турнир 0.
+    """
+    competition_link = block.find('a', href=re.compile(r'/competitions/\d+/'))
+    if competition_link:
+        return int(re.search(r'/competitions/(\d+)/', competition_link['href']).group(1))
+    
+    cmp_div = block.find('div', class_='cmp')
+    if not cmp_div or not league_name or not str(league_id or '').isdigit():
+        return 0
+    tournament = cmp_div.text.strip().split(',')[0].strip().lower()
+    league_short = league_name.split(',')[-1].strip().lower()
+    return int(league_id) if tournament and tournament in (league_short, league_name.strip().lower()) else 0
+
+def extract_played_matches(soup, league_id=None, league_name=None):
+    """
+    Извлекает все сыгранные матчи из расписания клуба (club_schedule)
+    для исторического хранилища результатов. Турнир берется из самого матча
+    (schedule_competition_id), а не из лиги, для которой парсится команда.
+    
+    Возвращает:
+        list: словари с полями date, league_id, home_id, away_id, home_goals, away_goals
+    """
+    matches = []
+    schedule_div = soup.find('div', id='club_schedule')
+    if not schedule_div:
+        return matches
+    
+    for block in schedule_div.find_all('div', class_='game_block'):
+        score_divs = block.find_all('div', class_='gls')
+        if len(score_divs) < 2:
+            continue
+        
+        home_score_text = score_divs[0].text.strip()
+        away_score_text = score_divs[1].text.strip()
+        if not re.match(r'^\d+$', home_score_text) or not re.match(r'^\d+$', away_score_text):
+            continue
+        
+        home_div = block.find('div', class_='ht')
+        away_div = block.find('div', class_='at')
+        if not home_div or not away_div:
+            continue
+        
+        home_link = home_div.find('a', href=re.compile(r'/clubs/\d+/'))
+        away_link = away_div.find('a', href=re.compile(r'/clubs/\d+/'))
+        if not home_link or not away_link:
+            continue
+        
+        status_div = block.find('div', class_='status')
+        match_date = parse_schedule_date(status_div.text if status_div else '')
+        if not match_date:
+            continue
+        
+        matches.append({
+            'date': match_date,
+            'league_id': schedule_competition_id(block, league_id, league_name),
+            'home_id': re.search(r'/clubs/(\d+)/', home_link['href']).group(1),
+            'away_id': re.search(r'/clubs/(\d+)/', away_link['href']).group(1),
+            'home_goals': int(home_score_text),
+            'away_goals': int(away_score_text)
+        })
+    
+    return matches
+
+def match_folder_name(match_name):
+    """Безопасное имя папки матча в commands"""
+    return re.sub(r'[<>:"/\\|?*]', '_', match_name)
+
+def build_match_analysis(match_name, data, home_data, away_data):
+    """
+    Формирует аналитику матча по данным обеих команд.
+    data - содержимое файла upcoming_matches_*.json, из которого взят матч.
+    """
+    return {
+        'match': match_name,
+        'match_url': data.get('league_url', ''),
+        'date_time': next((m.get('date_time', '') for m in data.get('matches', []) if m.get('match') == match_name), ''),
+        'league': data.get('league', ''),
+        'analysis_date': datetime.now().isoformat(),
+        'home_team': home_data,
+        'away_team': away_data,
+        # Простая сравнительная аналитика на основе новых данных
+        'comparison': {
+            'position_difference': (home_data.get('position_in_league') or 20) - (away_data.get('position_in_league') or 20),
+            'home_team_form': home_data.get('form_stats', {}).get('form', ''),
+            'away_team_form': away_data.get('form_stats', {}).get('form', ''),
+            'scoring_insight': f"В среднем {home_data['team_name']} забивает дома {home_data.get('scoring_stats', {}).get('home', {}).get('avg_scored', 0):.2f} мяча, "
+                               f"а {away_data['team_name']} в гостях пропускает {away_data.get('scoring_stats', {}).get('away', {}).get('avg_conceded', 0):.2f} мяча."
+        }
+    }
+
+def save_match_analysis(match_analysis, commands_dir="commands"):
+    """Сохраняет анализ матча в commands/{матч}/{матч}_analysis.json и возвращает путь"""
+    safe_match_name = match_folder_name(match_analysis['match'])
+    match_folder = os.path.join(commands_dir, safe_match_name)
+    os.makedirs(match_folder, exist_ok=True)
+    
+    match_file = os.path.join(match_folder, f"{safe_match_name}_analysis.json")
+    return save_artifact(match_file, match_analysis)
+
+def process_teams_from_file(file_path, results_store=None):
     """
     Обрабатывает файл с матчами и парсит данные команд.
     Теперь также создает папки для каждого матча.
@@ -342,7 +487,9 @@ def process_teams_from_file(file_path):
             
             time.sleep(0.5)  # Задержка между запросами
             
-            team_data = get_team_data_by_id(team['id'], team['name'])
+            with profiling.section(team['name']):
+                team_data = get_team_data_by_id(team['id'], team['name'], data.get('league_id'), results_store,
+                                                data.get('league'))
             
             if team_data:
                 team_data['league'] = data.get('league', 'Неизвестная лига')
@@ -371,34 +518,7 @@ def process_teams_from_file(file_path):
                 print(f"  Пропускаем матч '{match_name}': отсутствуют данные одной из команд.")
                 continue
             
-            # Создаем безопасное имя для папки
-            safe_match_name = re.sub(r'[<>:"/\\|?*]', '_', match_name)
-            match_folder = os.path.join("commands", safe_match_name)
-            os.makedirs(match_folder, exist_ok=True)
-            
-            # Формируем аналитику матча
-            match_analysis = {
-                'match': match_name,
-                'match_url': data.get('league_url', ''),
-                'date_time': next((m.get('date_time', '') for m in data.get('matches', []) if m.get('match') == match_name), ''),
-                'league': data.get('league', ''),
-                'analysis_date': datetime.now().isoformat(),
-                'home_team': home_data,
-                'away_team': away_data,
-                # Простая сравнительная аналитика на основе новых данных
-                'comparison': {
-                    'position_difference': (home_data.get('position_in_league') or 20) - (away_data.get('position_in_league') or 20),
-                    'home_team_form': home_data.get('form_stats', {}).get('form', ''),
-                    'away_team_form': away_data.get('form_stats', {}).get('form', ''),
-                    'scoring_insight': f"В среднем {home_data['team_name']} забивает дома {home_data.get('scoring_stats', {}).get('home', {}).get('avg_scored', 0):.2f} мяча, "
-                                       f"а {away_data['team_name']} в гостях пропускает {away_data.get('scoring_stats', {}).get('away', {}).get('avg_conceded', 0):.2f} мяча."
-                }
-            }
-            
-            # Сохраняем анализ матча в папку
-            match_file = os.path.join(match_folder, f"{safe_match_name}_analysis.json")
-            with open(match_file, 'w', encoding='utf-8') as f:
-                json.dump(match_analysis, f, ensure_ascii=False, indent=2)
+            save_match_analysis(build_match_analysis(match_name, data, home_data, away_data))
             
             print(f"  ✓ Создана папка и файл анализа для матча: {match_name}")
         
@@ -411,6 +531,7 @@ def process_teams_from_file(file_path):
         return []
 
 def main():
+    http_replay.install()
     print("="*60)
     print("РАСШИРЕННЫЙ ПАРСЕР РЕЗУЛЬТАТОВ И СТАТИСТИКИ КОМАНД")
     print("="*60)
@@ -426,13 +547,14 @@ def main():
     
     # Обрабатываем каждый найденный файл
     all_teams_data = []
+    results_store = ResultsStore(RESULTS_STORE_DIR)
     
     for file_path in matches_files:
         print(f"\n{'='*60}")
         print(f"ОБРАБОТКА ФАЙЛА: {file_path}")
         print(f"{'='*60}")
         
-        teams_data = process_teams_from_file(file_path)
+        teams_data = process_teams_from_file(file_path, results_store)
         if teams_data:
             all_teams_data.extend(teams_data)
     
@@ -452,9 +574,14 @@ def main():
         # Итоговая статистика
         teams_with_stats = sum(1 for t in all_teams_data if t.get('scoring_stats'))
         print(f"✓ Команд со статистикой голов: {teams_with_stats}")
+        print(f"✓ Матчей в хранилище результатов ({RESULTS_STORE_DIR}): {results_store.rows}")
     else:
         print("\n✗ Не удалось получить данные ни по одной команде.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Парсер результатов и статистики команд soccer365")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    with profiling.session("team_parser", args):
+        main()
 
@@ -1,8 +1,14 @@
+import argparse
 import json
 import logging
 import os
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
+
+from utils import metrics, profiling
+from utils.artifacts import load_artifact, save_artifact
+from utils.catalog import KIND_SQUAD, find_artifacts
+from utils.injury_index import InjuryIndex, get_index
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -32,7 +38,9 @@ class PlayerAnalyzer:
         'forward': 0.45
     }
     
-    def __init__(self):
+    def __init__(self, injury_index: Optional[InjuryIndex] = None):
+        # None - индекс хранилища травм INJURY_STORE_DIR (перечитывается после записи в него)
+        self.injury_index = injury_index
         self.position_weights = {
             'goalkeeper': {'conceded': 0.25, 'clean_sheets': 0.25, 'minutes': 0.2, 'discipline': 0.15, 'stability': 0.15},
             'defender': {'attack': 0.25, 'minutes': 0.25, 'discipline': 0.2, 'stability': 0.15, 'experience': 0.15},
@@ -271,25 +279,36 @@ class PlayerAnalyzer:
             logger.error(f"Error calculating player readiness: {e}", exc_info=True)
             return 0.45
 
+    @metrics.timed("readiness_team_seconds")
     def analyze_team(self, input_file: str, output_file: str = None) -> None:
         """Анализ одной команды с сохранением результатов"""
         try:
-            with open(input_file, 'r', encoding='utf-8') as f:
-                players = json.load(f)
+            players = load_artifact(input_file)
                 
             if not isinstance(players, list):
                 logger.error(f"Input file {input_file} should contain a list of players")
                 return
                 
+            injury_index = self.injury_index if self.injury_index is not None else get_index()
+            # Статусы травм всего состава - одним запросом к индексу
+            injuries = injury_index.statuses([player.get('url') for player in players])
             results = []
-            for player in players:
+            for player, injury in zip(players, injuries):
                 try:
                     readiness = self.calculate_player_readiness(player)
-                    results.append({
+                    result = {
                         'name': player.get('name'),
                         'position': player.get('position'),
                         'readiness': readiness
-                    })
+                    }
+                    # Травмированный не учитывается в силе команды, недавно вернувшийся - с пониженной готовностью
+                    if injury:
+                        result['injury'] = injury
+                        if injury['status'] == 'injured':
+                            result['available'] = False
+                        else:
+                            result['readiness'] = readiness * injury['factor']
+                    results.append(result)
                 except Exception as e:
                     logger.error(f"Error processing player {player.get('name')}: {e}")
                     continue
@@ -300,8 +319,9 @@ class PlayerAnalyzer:
                 output_dir = Path(input_file).parent  # Директория файла
                 output_file = str(output_dir / f"{base_name}_res.json")
                 
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(results, f, indent=4, ensure_ascii=False)
+            # Запись через временный файл: потоковый анализатор не увидит недописанный файл
+            save_artifact(output_file, results, indent=4)
+            metrics.inc("readiness_players_total", len(results))
                 
             logger.info(f"Результаты сохранены в {output_file}")
             
@@ -322,11 +342,8 @@ class PlayerAnalyzer:
         
         logger.info(f"Начинаю анализ всех команд в папке: {root_folder}")
         
-        # Ищем все JSON файлы (кроме уже созданных _res.json)
-        json_files = list(root_path.rglob("*.json"))
-        
-        # Фильтруем файлы, которые не являются результатами (_res.json)
-        team_files = [f for f in json_files if not f.name.endswith("_res.json")]
+        # Файлы составов команд из каталога артефактов (без _res.json, анализа и прогнозов)
+        team_files = [Path(path) for path in find_artifacts(root_folder, KIND_SQUAD)]
         
         logger.info(f"Найдено {len(team_files)} файлов для анализа")
         
@@ -338,7 +355,8 @@ class PlayerAnalyzer:
                 output_file = team_file.with_name(f"{team_file.stem}_res.json")
                 
                 # Анализируем команду
-                self.analyze_team(str(team_file), str(output_file))
+                with profiling.section(f"{team_file.parent.name}_{team_file.stem}"):
+                    self.analyze_team(str(team_file), str(output_file))
                 
                 logger.info(f"Готово: {team_file.name} -> {output_file.name}")
                 
@@ -348,10 +366,14 @@ class PlayerAnalyzer:
         logger.info(f"Анализ завершен. Обработано файлов: {len(team_files)}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Готовность игроков по составам команд")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
     analyzer = PlayerAnalyzer()
     
     # Вариант 1: Анализ всех команд в папке commands
-    analyzer.analyze_all_teams_in_folder("commands")
+    with profiling.session("test", args):
+        analyzer.analyze_all_teams_in_folder("commands")
     
     # Вариант 2: Анализ конкретной команды (старый вариант)
     # analyzer.analyze_team("commands/24-tk/Генчлербирлиги.json", "result.json")
@@ -0,0 +1,63 @@
+"""Каталог артефактов: сверка с диском без ручного rebuild"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.catalog import KIND_ANALYSIS, KIND_SQUAD, Catalog, artifact_kind
+
+
+def write_json(path: str, data) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+class CatalogSyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.catalog = Catalog(os.path.join(self.tmp, "catalog.sqlite"))
+        self.addCleanup(self.catalog.close)
+        self.root = os.path.join(self.tmp, "commands")
+        self._match("Байер - Бавария")
+
+    def _match(self, name: str) -> str:
+        folder = os.path.join(self.root, name)
+        home, away = name.split(" - ")
+        write_json(os.path.join(folder, f"{name}_analysis.json"),
+                   {"match": name, "home_team": {"team_name": home}, "away_team": {"team_name": away}})
+        write_json(os.path.join(folder, f"{home}.json"), [])
+        return folder
+
+    def _find(self, kind: str):
+        self.catalog.sync(self.root)
+        return [os.path.relpath(path, self.root) for path in self.catalog.find(self.root, kind)]
+
+    def test_files_written_outside_save_artifact_are_found(self):
+        self.assertEqual(len(self._find(KIND_ANALYSIS)), 1)
+
+        folder = self._match("Арсенал - Эвертон")
+        write_json(os.path.join(self.root, "Байер - Бавария", "Бавария.json"), [])
+        self.assertEqual(len(self._find(KIND_ANALYSIS)), 2)
+        self.assertIn(os.path.join("Байер - Бавария", "Бавария.json"), self._find(KIND_SQUAD))
+        self.assertEqual(self.catalog.missing(self.root, KIND_SQUAD)[0]["match"], "Арсенал - Эвертон")
+
+        shutil.rmtree(folder)
+        self.assertEqual(self._find(KIND_ANALYSIS), [os.path.join("Байер - Бавария", "Байер - Бавария_analysis.json")])
+
+    def test_squad_kind_requires_team_of_match_folder(self):
+        folder = os.path.join(self.root, "Байер - Бавария")
+        self.assertEqual(artifact_kind(os.path.join(folder, "Байер.json")), KIND_SQUAD)
+        self.assertIsNone(artifact_kind(os.path.join(folder, "output.json")))
+        self.assertIsNone(artifact_kind(os.path.join(self.tmp, "forecasts", "all_forecasts_1.json")))
+
+
+if __name__ == "__main__":
+    unittest.main()
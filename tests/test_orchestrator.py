@@ -0,0 +1,79 @@
+"""Планирование задач оркестратора: лимиты стадий не блокируют потоки пула"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orchestrator
+from orchestrator import Orchestrator, PipelineState, Task
+
+CRAWL_SECONDS = 0.3
+MATCHES = 6
+
+
+class StageSchedulingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = mock.patch.object(orchestrator, "record_stage", lambda *args: None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.events = []
+        self.lock = threading.Lock()
+
+    def _action(self, name: str, output: str, seconds: float):
+        def action():
+            with self.lock:
+                self.events.append(("start", name, time.monotonic()))
+            time.sleep(seconds)
+            with open(output, "w", encoding="utf-8") as f:
+                f.write(name)
+            with self.lock:
+                self.events.append(("end", name, time.monotonic()))
+        return action
+
+    def _tasks(self):
+        tasks = []
+        for i in range(MATCHES):
+            crawl_id, readiness_id = f"crawl:{i}", f"readiness:{i}"
+            for task_id, stage, seconds, deps in ((crawl_id, "crawl", CRAWL_SECONDS, []),
+                                                  (readiness_id, "readiness", 0.01, [crawl_id])):
+                output = os.path.join(self.tmp.name, task_id.replace(":", "_"))
+                tasks.append(Task(task_id, stage, output, self._action(task_id, output, seconds),
+                                  inputs=lambda task_id=task_id: task_id, deps=deps))
+        return tasks
+
+    def test_readiness_starts_while_crawls_are_queued(self):
+        state = PipelineState(os.path.join(self.tmp.name, "state.json"))
+        results = Orchestrator(state, workers=4).run(self._tasks())
+
+        self.assertEqual(set(results.values()), {"собран"})
+        # Прежде семафор держал поток пула на каждую ждущую парсинга задачу, и readiness
+        # стояла в очереди пула за всеми парсингами
+        first_readiness = min(at for event, name, at in self.events
+                              if event == "start" and name.startswith("readiness"))
+        crawl_ends = sorted(at for event, name, at in self.events
+                            if event == "end" and name.startswith("crawl"))
+        self.assertLess(first_readiness, crawl_ends[1])
+
+    def test_crawl_limit_is_respected(self):
+        state = PipelineState(os.path.join(self.tmp.name, "state.json"))
+        Orchestrator(state, workers=4).run(self._tasks())
+
+        crawls, peak = 0, 0
+        for event, name, _ in sorted(self.events, key=lambda event: (event[2], event[0] == "start")):
+            if name.startswith("crawl"):
+                crawls += 1 if event == "start" else -1
+                peak = max(peak, crawls)
+        self.assertEqual(peak, orchestrator.STAGE_LIMITS["crawl"])
+
+
+if __name__ == "__main__":
+    unittest.main()
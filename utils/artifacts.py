@@ -0,0 +1,266 @@
+# utils/artifacts.py
+"""
+Чтение и запись артефактов папок матчей (commands/).
+
+Все стадии читают и пишут файлы команд, *_res.json, *_analysis.json и *_forecast.json
+только через load_artifact / save_artifact. Формат записи задается в config.ARTIFACT_FORMAT:
+    json     - текстовый JSON с отступами, как раньше писала каждая стадия
+               (составы и *_res.json - 4 пробела, остальные - 2, см. JSON_INDENTS)
+    orjson   - компактный JSON (библиотека orjson)
+    msgpack  - MessagePack (библиотека msgpack)
+
+Двоичные форматы можно дополнительно сжимать zlib (config.ARTIFACT_COMPRESS_LEVEL).
+
+Двоичный файл начинается с заголовка: MAGIC, версия схемы, код кодека, флаги. Имена файлов
+не меняются - формат определяется по первым байтам, поэтому старые JSON-файлы и новые
+двоичные читаются одинаково, а смена формата не требует пересборки папок.
+
+Выгрузка в JSON для просмотра и перевод папок в другой формат:
+    python -m utils.artifacts export commands --out commands_json
+    python -m utils.artifacts convert commands --format msgpack --compress 1
+    python -m utils.artifacts stats commands
+"""
+
+import argparse
+import json
+import logging
+import os
+import struct
+import sys
+import time
+import zlib
+from typing import Any, Dict, Iterator, Optional
+
+from utils.catalog import KIND_READINESS, KIND_SQUAD, artifact_kind, record_artifact
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    from config import ARTIFACT_COMPRESS_LEVEL, ARTIFACT_FORMAT
+except ImportError:
+    ARTIFACT_FORMAT = "json"
+    ARTIFACT_COMPRESS_LEVEL = 0
+
+ARTIFACT_SCHEMA_VERSION = 1
+
+MAGIC = b"NSA\x01"
+HEADER = struct.Struct('<4sBBB')  # magic, версия схемы, кодек, флаги
+
+CODEC_ORJSON = 1
+CODEC_MSGPACK = 2
+CODECS = {"orjson": CODEC_ORJSON, "msgpack": CODEC_MSGPACK}
+FORMATS = ("json", "orjson", "msgpack")
+
+FLAG_ZLIB = 0x01
+
+# Отступы JSON по виду артефакта - как писали стадии до общего формата
+JSON_INDENTS = {KIND_SQUAD: 4, KIND_READINESS: 4}
+DEFAULT_JSON_INDENT = 2
+
+_warned_formats = set()
+
+
+def resolve_format(fmt: Optional[str] = None) -> str:
+    """Формат записи с учетом установленных библиотек: msgpack -> orjson -> json"""
+    fmt = (fmt or ARTIFACT_FORMAT).lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат артефактов: {fmt} (доступны: {', '.join(FORMATS)})")
+
+    resolved = fmt
+    if resolved == "msgpack" and msgpack is None:
+        resolved = "orjson"
+    if resolved == "orjson" and orjson is None:
+        resolved = "json"
+    if resolved != fmt and fmt not in _warned_formats:
+        _warned_formats.add(fmt)
+        logging.warning(f"Библиотека для формата {fmt} не установлена, артефакты пишутся в {resolved}")
+    return resolved
+
+
+def encode_artifact(data: Any, fmt: Optional[str] = None, compress_level: Optional[int] = None,
+                    indent: int = DEFAULT_JSON_INDENT) -> bytes:
+    """Сериализация данных в байты выбранного формата (JSON не сжимается, indent - только для JSON)"""
+    fmt = resolve_format(fmt)
+    if fmt == "json":
+        return json.dumps(data, ensure_ascii=False, indent=indent).encode('utf-8')
+
+    if fmt == "orjson":
+        payload = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    else:
+        payload = msgpack.packb(data, use_bin_type=True)
+
+    level = ARTIFACT_COMPRESS_LEVEL if compress_level is None else compress_level
+    flags = 0
+    if level:
+        payload = zlib.compress(payload, level)
+        flags |= FLAG_ZLIB
+    return HEADER.pack(MAGIC, ARTIFACT_SCHEMA_VERSION, CODECS[fmt], flags) + payload
+
+
+def decode_artifact(raw: bytes) -> Any:
+    """Десериализация: двоичный формат по заголовку, иначе JSON"""
+    if raw[:len(MAGIC)] != MAGIC:
+        if orjson is not None:
+            try:
+                return orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                pass  # NaN, BOM и прочее, что принимает только стандартный json
+        return json.loads(raw)
+
+    _, version, codec, flags = HEADER.unpack_from(raw)
+    if version > ARTIFACT_SCHEMA_VERSION:
+        raise ValueError(f"Версия схемы артефакта {version} новее поддерживаемой ({ARTIFACT_SCHEMA_VERSION})")
+
+    payload = memoryview(raw)[HEADER.size:]
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+    if codec == CODEC_ORJSON:
+        if orjson is None:
+            return json.loads(bytes(payload))
+        return orjson.loads(payload)
+    if codec == CODEC_MSGPACK:
+        if msgpack is None:
+            raise RuntimeError("Артефакт записан в msgpack, но библиотека msgpack не установлена")
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+    raise ValueError(f"Неизвестный кодек артефакта: {codec}")
+
+
+def load_artifact(path: str) -> Any:
+    """Чтение артефакта любого формата"""
+    with open(path, 'rb') as f:
+        return decode_artifact(f.read())
+
+
+def save_artifact(path: str, data: Any, fmt: Optional[str] = None, compress_level: Optional[int] = None,
+                  indent: Optional[int] = None) -> str:
+    """
+    Запись артефакта через временный файл: читатели не увидят недописанный файл.
+    Сохраненный файл сразу попадает в каталог (utils/catalog.py).
+    indent - отступ JSON (по умолчанию прежний для вида файла, JSON_INDENTS).
+
+    Returns:
+        Путь к сохраненному файлу
+    """
+    if indent is None:
+        indent = JSON_INDENTS.get(artifact_kind(path), DEFAULT_JSON_INDENT)
+    raw = encode_artifact(data, fmt, compress_level, indent)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(raw)
+    os.replace(tmp_path, path)
+    record_artifact(path, raw, data)
+    return path
+
+
+def artifact_format(path: str) -> str:
+    """Формат, в котором записан файл ("+zlib" - если сжат)"""
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+        return "json"
+    _, _, codec, flags = HEADER.unpack(header)
+    name = next((name for name, code in CODECS.items() if code == codec), "unknown")
+    return f"{name}+zlib" if flags & FLAG_ZLIB else name
+
+
+def iter_artifacts(commands_dir: str) -> Iterator[str]:
+    """Все артефакты в папках матчей"""
+    for root, dirs, files in os.walk(commands_dir):
+        for filename in files:
+            if filename.endswith(".json"):
+                yield os.path.join(root, filename)
+
+
+def export_json(commands_dir: str, out_dir: Optional[str] = None) -> int:
+    """
+    Выгрузка артефактов в читаемый JSON.
+    out_dir=None - файлы переписываются на месте, иначе дерево копируется в out_dir.
+    """
+    exported = 0
+    for path in iter_artifacts(commands_dir):
+        target = path if out_dir is None else os.path.join(out_dir, os.path.relpath(path, commands_dir))
+        try:
+            data = load_artifact(path)
+        except (ValueError, RuntimeError) as e:
+            logging.error(f"Не удалось прочитать {path}: {e}")
+            continue
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        save_artifact(target, data, "json")
+        exported += 1
+    return exported
+
+
+def convert(commands_dir: str, fmt: Optional[str] = None, compress_level: Optional[int] = None) -> int:
+    """Перевод всех артефактов в указанный формат (на месте)"""
+    fmt = resolve_format(fmt)
+    level = ARTIFACT_COMPRESS_LEVEL if compress_level is None else compress_level
+    target = f"{fmt}+zlib" if level and fmt != "json" else fmt
+    converted = 0
+    for path in iter_artifacts(commands_dir):
+        if artifact_format(path) == target:
+            continue
+        try:
+            save_artifact(path, load_artifact(path), fmt, level)
+            converted += 1
+        except (ValueError, RuntimeError) as e:
+            logging.error(f"Не удалось перевести {path}: {e}")
+    return converted
+
+
+def collect_stats(commands_dir: str) -> Dict[str, Dict]:
+    """Размер на диске и время чтения артефактов по форматам"""
+    stats = {}
+    for path in iter_artifacts(commands_dir):
+        fmt = artifact_format(path)
+        start = time.perf_counter()
+        load_artifact(path)
+        elapsed = time.perf_counter() - start
+        entry = stats.setdefault(fmt, {"files": 0, "bytes": 0, "load_seconds": 0.0})
+        entry["files"] += 1
+        entry["bytes"] += os.path.getsize(path)
+        entry["load_seconds"] += elapsed
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Артефакты папок матчей: выгрузка в JSON и смена формата")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="выгрузить артефакты в читаемый JSON")
+    export_parser.add_argument("commands", nargs="?", default="commands", help="папка с матчами")
+    export_parser.add_argument("--out", help="папка для копии (по умолчанию - на месте)")
+
+    convert_parser = subparsers.add_parser("convert", help="перевести артефакты в другой формат")
+    convert_parser.add_argument("commands", nargs="?", default="commands", help="папка с матчами")
+    convert_parser.add_argument("--format", choices=FORMATS, default=None,
+                                help=f"формат (по умолчанию config.ARTIFACT_FORMAT = {ARTIFACT_FORMAT})")
+    convert_parser.add_argument("--compress", type=int, default=None, metavar="LEVEL",
+                                help="уровень сжатия zlib 0-9 (по умолчанию config.ARTIFACT_COMPRESS_LEVEL)")
+
+    stats_parser = subparsers.add_parser("stats", help="размер и время чтения по форматам")
+    stats_parser.add_argument("commands", nargs="?", default="commands", help="папка с матчами")
+    args = parser.parse_args()
+
+    if sys.platform.startswith('win'):
+        sys.stdout.reconfigure(encoding='utf-8')
+
+    if args.command == "export":
+        print(f"✅ Выгружено в JSON: {export_json(args.commands, args.out)}")
+    elif args.command == "convert":
+        print(f"✅ Переведено в {resolve_format(args.format)}: {convert(args.commands, args.format, args.compress)}")
+    else:
+        for fmt, entry in collect_stats(args.commands).items():
+            print(f"📁 {fmt}: {entry['files']} файлов, {entry['bytes'] / 1024:.1f} КБ, "
+                  f"чтение {entry['load_seconds'] * 1000:.1f} мс")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,533 @@
+# utils/catalog.py
+"""
+Каталог артефактов конвейера в SQLite.
+
+Вместо обхода competitions/ и commands/ (os.walk + чтение каждого JSON) стадии
+спрашивают каталог: где файлы upcoming_matches, какие папки матчей есть, у каких
+матчей еще нет составов. Записи добавляются при сохранении артефакта
+(utils.artifacts.save_artifact) и по результатам задач оркестратора.
+
+Таблицы:
+    artifacts    - путь, вид, папка матча, команда, sha1, размер, mtime
+    matches      - папка матча, название, хозяева, гости, лига, дата (из *_analysis.json)
+    stages       - статус задачи оркестратора по собираемому артефакту
+    roots        - проиндексированные корни
+    directories  - mtime проиндексированных папок
+
+Перед каждым запросом каталог сверяется с диском (Catalog.sync): папки, чей mtime
+изменился (файл добавлен, удален или переименован - скопирован руками, пришел с git pull,
+записан другим парсером), просматриваются заново, остальные стоят одного stat.
+Полное перестроение:
+    python -m utils.catalog rebuild commands competitions
+    python -m utils.catalog missing squad
+    python -m utils.catalog status "commands/Байер - Бавария"
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    from config import CATALOG_FILE
+except ImportError:
+    CATALOG_FILE = "catalog.sqlite"
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Вид артефакта по имени файла
+KIND_UPCOMING = "upcoming"      # competitions/{лига}/upcoming_matches_*.json
+KIND_ANALYSIS = "analysis"      # {матч}_analysis.json
+KIND_READINESS = "readiness"    # {команда}_res.json
+KIND_FORECAST = "forecast"      # {матч}_forecast.json
+KIND_SQUAD = "squad"            # {хозяева} - {гости}/{команда}.json
+KINDS = (KIND_UPCOMING, KIND_ANALYSIS, KIND_READINESS, KIND_FORECAST, KIND_SQUAD)
+TEAM_KINDS = (KIND_SQUAD, KIND_READINESS)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    match_folder TEXT NOT NULL,
+    team TEXT,
+    sha1 TEXT,
+    size INTEGER,
+    mtime REAL,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_artifacts_kind ON artifacts(kind, match_folder);
+CREATE INDEX IF NOT EXISTS idx_artifacts_folder ON artifacts(match_folder);
+
+CREATE TABLE IF NOT EXISTS matches (
+    match_folder TEXT PRIMARY KEY,
+    match_name TEXT,
+    home_team TEXT,
+    away_team TEXT,
+    league TEXT,
+    date_time TEXT
+);
+
+CREATE TABLE IF NOT EXISTS stages (
+    output TEXT PRIMARY KEY,
+    match_folder TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_stages_folder ON stages(match_folder);
+
+CREATE TABLE IF NOT EXISTS roots (
+    root TEXT PRIMARY KEY,
+    indexed_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime REAL
+);
+CREATE INDEX IF NOT EXISTS idx_directories_parent ON directories(parent);
+"""
+
+# mtime папки моложе этого не запоминается: файл, добавленный в ту же секунду после
+# просмотра, не изменил бы mtime, и папка больше не просматривалась бы
+RACY_MTIME_SECONDS = 2.0
+
+
+def artifact_kind(path: str) -> Optional[str]:
+    """Вид артефакта по имени файла (None - не артефакт)"""
+    filename = os.path.basename(path)
+    if not filename.endswith(".json"):
+        return None
+    if filename.startswith("upcoming_matches_"):
+        return KIND_UPCOMING
+    if filename.endswith("_analysis.json"):
+        return KIND_ANALYSIS
+    if filename.endswith("_res.json"):
+        return KIND_READINESS
+    if filename.endswith("_forecast.json"):
+        return KIND_FORECAST
+    # Состав - файл команды в папке ее матча "{хозяева} - {гости}"
+    team = filename[:-len(".json")]
+    folder = os.path.basename(os.path.dirname(os.path.abspath(path)))
+    if folder.startswith(team + " - ") or folder.endswith(" - " + team):
+        return KIND_SQUAD
+    return None
+
+
+def _team_name(path: str, kind: str) -> Optional[str]:
+    stem = os.path.basename(path)[:-len(".json")]
+    if kind == KIND_SQUAD:
+        return stem
+    if kind == KIND_READINESS:
+        return stem[:-len("_res")]
+    return None
+
+
+def _path_range(root: str) -> Tuple[str, str]:
+    """Границы путей внутри папки для запроса по индексу ('0' идет сразу за '/')"""
+    return root + os.sep, root + chr(ord(os.sep) + 1)
+
+
+def _relative_to(path: str, abs_root: str, root: str) -> str:
+    """Путь в той же форме, в которой передан корень (относительной или абсолютной)"""
+    return os.path.join(root, os.path.relpath(path, abs_root))
+
+
+class Catalog:
+    """Подключение к каталогу; безопасно для потоков одного процесса"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        # WAL: подпроцессы оркестратора (parser_main) пишут в каталог одновременно с ним
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+    # -------------------------------------------------------------------------
+    # Запись
+    # -------------------------------------------------------------------------
+
+    def record_artifact(self, path: str, raw: Optional[bytes] = None, data=None) -> None:
+        """
+        Добавляет или обновляет артефакт.
+        raw - содержимое файла (если уже в памяти), data - разобранные данные
+        (для *_analysis.json из них заполняется таблица matches).
+        """
+        kind = artifact_kind(path)
+        if kind is None:
+            return
+        path = os.path.abspath(path)
+        if raw is None:
+            with open(path, 'rb') as f:
+                raw = f.read()
+        stat = os.stat(path)
+        match_folder = os.path.dirname(path)
+
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO artifacts (path, kind, match_folder, team, sha1, size, mtime, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, kind, match_folder, _team_name(path, kind), hashlib.sha1(raw).hexdigest(),
+                 stat.st_size, stat.st_mtime, datetime.now().isoformat())
+            )
+            if kind == KIND_ANALYSIS and isinstance(data, dict):
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO matches (match_folder, match_name, home_team, away_team, league, date_time) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (match_folder, data.get("match"),
+                     (data.get("home_team") or {}).get("team_name"),
+                     (data.get("away_team") or {}).get("team_name"),
+                     data.get("league"), data.get("date_time"))
+                )
+
+    def record_stage(self, output: str, stage: str, status: str) -> None:
+        output = os.path.abspath(output)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO stages (output, match_folder, stage, status, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (output, os.path.dirname(output), stage, status, datetime.now().isoformat())
+            )
+
+    def forget(self, paths: List[str]) -> None:
+        """Удаляет записи об исчезнувших файлах"""
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM artifacts WHERE path = ?", [(path,) for path in paths])
+            self.conn.executemany(
+                "DELETE FROM matches WHERE match_folder = ? AND NOT EXISTS "
+                "(SELECT 1 FROM artifacts WHERE kind = ? AND artifacts.match_folder = matches.match_folder)",
+                [(os.path.dirname(path), KIND_ANALYSIS) for path in paths]
+            )
+
+    def rebuild(self, root: str) -> int:
+        """Полная переиндексация папки: обход и чтение всех артефактов"""
+        abs_root = os.path.abspath(root)
+        low, high = _path_range(abs_root)
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM artifacts WHERE path >= ? AND path < ?", (low, high))
+            self.conn.execute("DELETE FROM matches WHERE match_folder = ? OR (match_folder >= ? AND match_folder < ?)",
+                              (abs_root, low, high))
+            self.conn.execute("DELETE FROM directories WHERE path = ? OR (path >= ? AND path < ?)",
+                              (abs_root, low, high))
+
+        count = 0
+        for path in walk_artifacts(abs_root):
+            if self._index_file(path):
+                count += 1
+
+        self._remember_root(abs_root)
+        return count
+
+    def _index_file(self, path: str) -> bool:
+        """Чтение и запись одного артефакта; False - файл не прочитан"""
+        from utils.artifacts import decode_artifact
+
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            data = decode_artifact(raw) if artifact_kind(path) == KIND_ANALYSIS else None
+            self.record_artifact(path, raw, data)
+            return True
+        except (OSError, ValueError) as e:
+            logging.warning(f"Каталог: не удалось прочитать {path}: {e}")
+            return False
+
+    def _remember_root(self, abs_root: str) -> None:
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO roots (root, indexed_at) VALUES (?, ?)",
+                              (abs_root, datetime.now().isoformat()))
+
+    def sync(self, root: str) -> int:
+        """
+        Сверка каталога с диском: просматриваются только папки с изменившимся mtime
+        (и новые), в них заново читаются новые и изменившиеся по mtime/размеру файлы,
+        исчезнувшие файлы и папки забываются. Возвращает число перечитанных файлов.
+        """
+        abs_root = os.path.abspath(root)
+        low, high = _path_range(abs_root)
+        with self.lock:
+            rows = self.conn.execute("SELECT path, parent, mtime FROM directories WHERE path = ? OR (path >= ? AND path < ?)",
+                                     (abs_root, low, high)).fetchall()
+        known = {path: mtime for path, _, mtime in rows}
+        children = {}
+        for path, parent, _ in rows:
+            children.setdefault(parent, []).append(path)
+
+        count = 0
+        stack = [abs_root]
+        while stack:
+            directory = stack.pop()
+            try:
+                mtime = os.stat(directory).st_mtime
+            except FileNotFoundError:
+                self._forget_directory(directory)
+                continue
+            if directory in known and known[directory] == mtime:
+                stack.extend(children.get(directory, []))
+                continue
+
+            count += self._sync_directory(directory)
+            subdirs = self._sync_subdirectories(directory, children.get(directory, []))
+            with self.lock, self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO directories (path, parent, mtime) VALUES (?, ?, ?)",
+                    (directory, os.path.dirname(directory),
+                     mtime if time.time() - mtime > RACY_MTIME_SECONDS else None)
+                )
+            stack.extend(subdirs)
+
+        self._remember_root(abs_root)
+        return count
+
+    def _sync_directory(self, directory: str) -> int:
+        """Файлы одной папки: новые и изменившиеся - в каталог, удаленные - из каталога"""
+        with self.lock:
+            rows = self.conn.execute("SELECT path, size, mtime FROM artifacts WHERE match_folder = ?",
+                                     (directory,)).fetchall()
+        recorded = {path: (size, mtime) for path, size, mtime in rows}
+
+        count = 0
+        on_disk = set()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or artifact_kind(entry.path) is None:
+                    continue
+                on_disk.add(entry.path)
+                stat = entry.stat()
+                if recorded.get(entry.path) != (stat.st_size, stat.st_mtime) and self._index_file(entry.path):
+                    count += 1
+
+        gone = [path for path in recorded if path not in on_disk]
+        if gone:
+            self.forget(gone)
+        return count
+
+    def _sync_subdirectories(self, directory: str, known_children: List[str]) -> List[str]:
+        """Подпапки папки; исчезнувшие забываются вместе с содержимым"""
+        with os.scandir(directory) as entries:
+            subdirs = sorted(entry.path for entry in entries if entry.is_dir())
+        for child in set(known_children) - set(subdirs):
+            self._forget_directory(child)
+        return subdirs
+
+    def _forget_directory(self, directory: str) -> None:
+        """Удаляет записи о папке и всем ее содержимом"""
+        low, high = _path_range(directory)
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM artifacts WHERE match_folder = ? OR (path >= ? AND path < ?)",
+                              (directory, low, high))
+            self.conn.execute("DELETE FROM matches WHERE match_folder = ? OR (match_folder >= ? AND match_folder < ?)",
+                              (directory, low, high))
+            self.conn.execute("DELETE FROM directories WHERE path = ? OR (path >= ? AND path < ?)",
+                              (directory, low, high))
+
+    # -------------------------------------------------------------------------
+    # Запросы
+    # -------------------------------------------------------------------------
+
+    def is_indexed(self, root: str) -> bool:
+        """Проиндексирована ли папка (или одна из родительских)"""
+        abs_root = os.path.abspath(root)
+        with self.lock:
+            rows = self.conn.execute("SELECT root FROM roots").fetchall()
+        return any(abs_root == indexed or abs_root.startswith(indexed + os.sep) for (indexed,) in rows)
+
+    def _existing(self, paths: List[str]) -> List[str]:
+        """Отбрасывает (и забывает) файлы, удаленные с диска"""
+        existing = [path for path in paths if os.path.exists(path)]
+        if len(existing) != len(paths):
+            kept = set(existing)
+            self.forget([path for path in paths if path not in kept])
+        return existing
+
+    def find(self, root: str, kind: str) -> List[str]:
+        """Артефакты вида kind внутри root, отсортированные по пути"""
+        abs_root = os.path.abspath(root)
+        low, high = _path_range(abs_root)
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path FROM artifacts WHERE kind = ? AND path >= ? AND path < ? ORDER BY path",
+                (kind, low, high)
+            ).fetchall()
+        return [_relative_to(path, abs_root, root) for path in self._existing([row[0] for row in rows])]
+
+    def missing(self, root: str, kind: str) -> List[Dict]:
+        """
+        Матчи внутри root, у которых нет артефакта вида kind
+        (для составов и готовности - хотя бы у одной из команд).
+        """
+        abs_root = os.path.abspath(root)
+        low, high = _path_range(abs_root)
+        if kind in TEAM_KINDS:
+            query = (
+                "SELECT m.match_folder, m.match_name, m.home_team, m.away_team FROM matches m "
+                "WHERE m.match_folder >= ? AND m.match_folder < ? AND ("
+                " NOT EXISTS (SELECT 1 FROM artifacts a WHERE a.kind = ? AND a.match_folder = m.match_folder AND a.team = m.home_team)"
+                " OR NOT EXISTS (SELECT 1 FROM artifacts a WHERE a.kind = ? AND a.match_folder = m.match_folder AND a.team = m.away_team)"
+                ") ORDER BY m.match_folder"
+            )
+            params = (low, high, kind, kind)
+        else:
+            query = (
+                "SELECT m.match_folder, m.match_name, m.home_team, m.away_team FROM matches m "
+                "WHERE m.match_folder >= ? AND m.match_folder < ? AND "
+                " NOT EXISTS (SELECT 1 FROM artifacts a WHERE a.kind = ? AND a.match_folder = m.match_folder) "
+                "ORDER BY m.match_folder"
+            )
+            params = (low, high, kind)
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [
+            {"match_folder": _relative_to(folder, abs_root, root), "match": name, "home_team": home, "away_team": away}
+            for folder, name, home, away in rows
+        ]
+
+    def stage_statuses(self, match_folder: str) -> List[Tuple[str, str, str]]:
+        """(стадия, артефакт, статус) задач оркестратора по папке матча"""
+        with self.lock:
+            rows = self.conn.execute("SELECT stage, output, status FROM stages WHERE match_folder = ? ORDER BY stage, output",
+                                     (os.path.abspath(match_folder),)).fetchall()
+        return rows
+
+
+# =============================================================================
+# ОБЩИЙ КАТАЛОГ ПРОЦЕССА
+# =============================================================================
+
+_catalog = None
+_catalog_pid = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> Optional[Catalog]:
+    """Каталог из config.CATALOG_FILE (None - каталог отключен или недоступен)"""
+    global _catalog, _catalog_pid
+    if not CATALOG_FILE:
+        return None
+    with _catalog_lock:
+        # После fork подключение родителя не используется
+        if _catalog is None or _catalog_pid != os.getpid():
+            path = CATALOG_FILE if os.path.isabs(CATALOG_FILE) else os.path.join(PROJECT_ROOT, CATALOG_FILE)
+            try:
+                _catalog = Catalog(path)
+                _catalog_pid = os.getpid()
+            except sqlite3.Error as e:
+                logging.warning(f"Каталог {path} недоступен, используется обход папок: {e}")
+                return None
+        return _catalog
+
+
+def record_artifact(path: str, raw: Optional[bytes] = None, data=None) -> None:
+    """Запись в каталог после сохранения файла; ошибки каталога не прерывают стадию"""
+    catalog = get_catalog()
+    if catalog is None:
+        return
+    try:
+        catalog.record_artifact(path, raw, data)
+    except (sqlite3.Error, OSError) as e:
+        logging.warning(f"Каталог: не удалось записать {path}: {e}")
+
+
+def record_stage(output: str, stage: str, status: str) -> None:
+    """Статус задачи оркестратора; ошибки каталога не прерывают конвейер"""
+    catalog = get_catalog()
+    if catalog is None:
+        return
+    try:
+        catalog.record_stage(output, stage, status)
+    except sqlite3.Error as e:
+        logging.warning(f"Каталог: не удалось записать статус {stage} для {output}: {e}")
+
+
+def walk_artifacts(root: str, kind: Optional[str] = None) -> Iterator[str]:
+    """Обход папки - запасной путь без каталога"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            file_kind = artifact_kind(path)
+            if file_kind is not None and (kind is None or file_kind == kind):
+                yield path
+
+
+def find_artifacts(root: str, kind: str) -> List[str]:
+    """
+    Артефакты вида kind внутри root: сверка каталога с диском (Catalog.sync)
+    и запрос к каталогу. Без каталога - обход папки.
+    """
+    if not os.path.exists(root):
+        return []
+    catalog = get_catalog()
+    if catalog is not None:
+        try:
+            catalog.sync(root)
+            return catalog.find(root, kind)
+        except sqlite3.Error as e:
+            logging.warning(f"Каталог недоступен, используется обход папок: {e}")
+    return list(walk_artifacts(root, kind))
+
+
+def find_match_folders(root: str) -> List[str]:
+    """Папки матчей с файлом *_analysis.json"""
+    folders = []
+    for path in find_artifacts(root, KIND_ANALYSIS):
+        folder = os.path.dirname(path)
+        if not folders or folders[-1] != folder:
+            folders.append(folder)
+    return folders
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Каталог артефактов конвейера")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild_parser = subparsers.add_parser("rebuild", help="переиндексировать папки")
+    rebuild_parser.add_argument("roots", nargs="*", default=["commands", "competitions"])
+
+    missing_parser = subparsers.add_parser("missing", help="матчи без артефакта указанного вида")
+    missing_parser.add_argument("kind", choices=[KIND_SQUAD, KIND_READINESS, KIND_FORECAST])
+    missing_parser.add_argument("--commands", default="commands", help="папка с матчами")
+
+    status_parser = subparsers.add_parser("status", help="статусы задач оркестратора по папке матча")
+    status_parser.add_argument("match_folder")
+    args = parser.parse_args()
+
+    if sys.platform.startswith('win'):
+        sys.stdout.reconfigure(encoding='utf-8')
+
+    catalog = get_catalog()
+    if catalog is None:
+        print("❌ Каталог отключен (config.CATALOG_FILE)")
+        return
+
+    if args.command == "rebuild":
+        for root in args.roots:
+            if os.path.exists(root):
+                print(f"✅ {root}: {catalog.rebuild(root)} артефактов")
+            else:
+                print(f"⚠️ Папка {root} не найдена")
+    elif args.command == "status":
+        for stage, output, status in catalog.stage_statuses(args.match_folder):
+            print(f"{stage:<10} {status:<9} {os.path.basename(output)}")
+    else:
+        catalog.sync(args.commands)
+        rows = catalog.missing(args.commands, args.kind)
+        for row in rows:
+            print(f"{row['match']}: {row['home_team']} - {row['away_team']} ({row['match_folder']})")
+        print(f"📊 Матчей без {args.kind}: {len(rows)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+# utils/fs_watch.py
+"""
+Наблюдение за изменениями файлов в дереве папок.
+
+На Linux используется inotify (через ctypes, без сторонних библиотек): ядро само
+сообщает о записанных и перемещенных файлах, новые подпапки берутся под наблюдение
+автоматически. На других системах (или если inotify недоступен) - опрос mtime/размера
+файлов с заданным интервалом.
+
+Использование:
+    watcher = create_watcher("commands")
+    while True:
+        for path in watcher.changes(timeout=None):
+            ...
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from typing import Dict, Optional, Set, Tuple
+
+# Флаги inotify (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_ISDIR = 0x40000000
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+DEFAULT_POLL_INTERVAL = 1.0  # Секунд между опросами в режиме без inotify
+
+
+class PollingWatcher:
+    """Опрос дерева папок: изменившимся считается файл с новым mtime или размером"""
+
+    def __init__(self, root: str, interval: float = DEFAULT_POLL_INTERVAL):
+        self.root = root
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[float, int]]:
+        snapshot = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                snapshot[path] = (stat.st_mtime, stat.st_size)
+        return snapshot
+
+    def changes(self, timeout: Optional[float] = None) -> Set[str]:
+        """
+        Пути новых и изменившихся файлов.
+        timeout=None - ждать первого изменения, 0 - только проверить.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            snapshot = self._scan()
+            changed = {path for path, signature in snapshot.items() if self._snapshot.get(path) != signature}
+            self._snapshot = snapshot
+            if changed or (deadline is not None and time.time() >= deadline):
+                return changed
+            wait = self.interval if deadline is None else min(self.interval, max(0.0, deadline - time.time()))
+            time.sleep(wait)
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Рекурсивное наблюдение через inotify"""
+
+    def __init__(self, root: str):
+        libc_name = ctypes.util.find_library('c')
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 не удался")
+
+        self.root = root
+        self._paths = {}  # wd -> папка
+        for dirpath, dirnames, filenames in os.walk(root):
+            self._add_watch(dirpath)
+
+    def _add_watch(self, path: str) -> None:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            logging.warning(f"Не удалось наблюдать за {path}: errno {ctypes.get_errno()}")
+            return
+        self._paths[wd] = path
+
+    def _read_events(self) -> Set[str]:
+        changed = set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                logging.warning("Очередь inotify переполнена, часть событий потеряна")
+                continue
+            directory = self._paths.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_DELETE_SELF:
+                self._paths.pop(wd, None)
+                continue
+
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # Новая папка матча: наблюдаем и за ней, файлы в ней могли появиться раньше
+                    for dirpath, dirnames, filenames in os.walk(path):
+                        self._add_watch(dirpath)
+                        changed.update(os.path.join(dirpath, filename) for filename in filenames)
+                continue
+            if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                changed.add(path)
+        return changed
+
+    def changes(self, timeout: Optional[float] = None) -> Set[str]:
+        """
+        Пути записанных и перемещенных в дерево файлов.
+        timeout=None - ждать первого изменения, 0 - только проверить.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.time())
+            ready, _, _ = select.select([self.fd], [], [], remaining)
+            if not ready:
+                return set()
+            changed = self._read_events()
+            if changed:
+                return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def create_watcher(root: str, poll_interval: float = DEFAULT_POLL_INTERVAL, force_polling: bool = False):
+    """inotify, если доступен, иначе опрос файлов"""
+    if not force_polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError, TypeError) as e:
+            logging.warning(f"inotify недоступен ({e}), используется опрос файлов")
+    return PollingWatcher(root, poll_interval)
@@ -0,0 +1,294 @@
+# utils/http_replay.py
+"""
+Запись и воспроизведение HTTP-ответов для парсеров (без сети).
+
+Режим задается переменными окружения:
+    HTTP_REPLAY_MODE     off (по умолчанию) | record | replay
+    HTTP_REPLAY_DIR      папка записей (по умолчанию http_fixtures в корне проекта)
+    HTTP_REPLAY_LATENCY  задержка ответа при воспроизведении: секунды (0.3),
+                         диапазон (0.2-0.8, равномерно) или recorded - как при записи
+
+record - запросы идут в сеть, ответы (статус, заголовки, тело, время ответа) сохраняются;
+replay - ответы отдаются с диска, сеть не используется; запроса без записи нет -
+ошибка соединения (requests) или IgnoreRequest (Scrapy).
+
+Подключение:
+    requests - install() в точке входа скрипта (подменяет requests.Session.send,
+               под нее попадают и requests.get, и сессии);
+    Scrapy   - ReplayDownloaderMiddleware в DOWNLOADER_MIDDLEWARES; задержка выдерживается
+               через реактор, поэтому CONCURRENT_REQUESTS и DOWNLOAD_DELAY работают как в сети.
+
+Запись - JSON-файл на запрос: {папка}/{хост}/{sha1 метода, URL и тела}.json
+
+Пример:
+    HTTP_REPLAY_MODE=record python team_parser.py
+    HTTP_REPLAY_MODE=replay HTTP_REPLAY_LATENCY=0.3 python orchestrator.py
+"""
+
+import base64
+import hashlib
+import io
+import json
+import logging
+import os
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = ("off", "record", "replay")
+DEFAULT_REPLAY_DIR = "http_fixtures"
+
+# Заголовки, которые не сохраняются (requests уже распаковал тело)
+SKIPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "set-cookie"}
+
+_original_send = None
+_install_lock = threading.Lock()
+_write_lock = threading.Lock()
+
+stats = {"recorded": 0, "replayed": 0, "missing": 0}
+
+
+def replay_mode() -> str:
+    mode = os.environ.get("HTTP_REPLAY_MODE", "off").strip().lower() or "off"
+    if mode not in MODES:
+        raise ValueError(f"Неизвестный HTTP_REPLAY_MODE: {mode} (доступны: {', '.join(MODES)})")
+    return mode
+
+
+def replay_dir() -> str:
+    path = os.environ.get("HTTP_REPLAY_DIR") or DEFAULT_REPLAY_DIR
+    return path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+
+
+def replay_latency(entry: Dict) -> float:
+    """Задержка ответа при воспроизведении (HTTP_REPLAY_LATENCY)"""
+    value = os.environ.get("HTTP_REPLAY_LATENCY", "0").strip().lower()
+    if value == "recorded":
+        return float(entry.get("elapsed") or 0.0)
+    if "-" in value:
+        low, high = (float(part) for part in value.split("-", 1))
+        return random.uniform(low, high)
+    return float(value or 0)
+
+
+def normalize_url(url: str) -> str:
+    """URL без фрагмента и с отсортированными параметрами: ключ не зависит от их порядка"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", query, ""))
+
+
+def entry_path(method: str, url: str, body: Optional[bytes] = None) -> str:
+    """Путь файла записи для запроса"""
+    digest = hashlib.sha1()
+    digest.update(method.upper().encode('ascii'))
+    digest.update(b"\0" + normalize_url(url).encode('utf-8'))
+    if body:
+        digest.update(b"\0" + body)
+    host = urlsplit(url).netloc.lower().replace(":", "_") or "_"
+    return os.path.join(replay_dir(), host, f"{digest.hexdigest()}.json")
+
+
+def save_entry(method: str, url: str, request_body: Optional[bytes], status: int, reason: str,
+               headers: List[Tuple[str, str]], body: bytes, elapsed: float) -> str:
+    """Сохранение ответа (через временный файл - параллельные парсеры не увидят недописанную запись)"""
+    path = entry_path(method, url, request_body)
+    entry = {
+        "method": method.upper(),
+        "url": url,
+        "status": status,
+        "reason": reason,
+        "headers": headers,
+        "body": base64.b64encode(body).decode('ascii'),
+        "elapsed": round(elapsed, 4),
+        "recorded_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _write_lock:
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        stats["recorded"] += 1
+    return path
+
+
+def load_entry(method: str, url: str, body: Optional[bytes] = None) -> Optional[Dict]:
+    path = entry_path(method, url, body)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except FileNotFoundError:
+        stats["missing"] += 1
+        return None
+    entry["body"] = base64.b64decode(entry["body"])
+    stats["replayed"] += 1
+    return entry
+
+
+def _decoded_body(entry: Dict) -> bytes:
+    """Тело без Content-Encoding (записи Scrapy хранятся в сжатом виде)"""
+    encoding = next((value.lower() for name, value in entry["headers"] if name.lower() == "content-encoding"), "")
+    if encoding == "gzip":
+        return zlib.decompress(entry["body"], 16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return zlib.decompress(entry["body"])
+    return entry["body"]
+
+
+# ---------------------------------------------------------------------------
+# requests
+# ---------------------------------------------------------------------------
+
+def _request_body(request) -> Optional[bytes]:
+    body = request.body
+    if isinstance(body, str):
+        return body.encode('utf-8')
+    return body if isinstance(body, bytes) else None
+
+
+def _replayed_response(request, entry: Dict, latency: float):
+    import requests
+    from requests.structures import CaseInsensitiveDict
+    from requests.utils import get_encoding_from_headers
+
+    body = _decoded_body(entry)
+    response = requests.Response()
+    response.status_code = entry["status"]
+    response.reason = entry.get("reason") or ""
+    response.headers = CaseInsensitiveDict(
+        (name, value) for name, value in entry["headers"] if name.lower() not in SKIPPED_HEADERS
+    )
+    response._content = body
+    response.raw = io.BytesIO(body)
+    response.url = request.url
+    response.request = request
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.elapsed = timedelta(seconds=latency)
+    return response
+
+
+def _send(session, request, **kwargs):
+    """Замена requests.Session.send в режимах record/replay"""
+    import requests
+
+    mode = replay_mode()
+    if mode == "replay":
+        entry = load_entry(request.method, request.url, _request_body(request))
+        if entry is None:
+            raise requests.ConnectionError(f"Нет записи ответа для {request.method} {request.url}", request=request)
+        latency = replay_latency(entry)
+        if latency > 0:
+            time.sleep(latency)
+        return _replayed_response(request, entry, latency)
+
+    response = _original_send(session, request, **kwargs)
+    if mode == "record" and not kwargs.get("stream"):
+        headers = [(name, value) for name, value in response.headers.items() if name.lower() not in SKIPPED_HEADERS]
+        save_entry(request.method, request.url, _request_body(request), response.status_code,
+                   response.reason or "", headers, response.content, response.elapsed.total_seconds())
+    return response
+
+
+def install() -> bool:
+    """
+    Подмена requests.Session.send по HTTP_REPLAY_MODE. Вызывается из точки входа скрипта;
+    при HTTP_REPLAY_MODE=off ничего не меняет.
+
+    Returns:
+        True, если запросы идут через запись/воспроизведение
+    """
+    global _original_send
+    mode = replay_mode()
+    if mode == "off":
+        return False
+
+    import requests
+
+    with _install_lock:
+        if _original_send is None:
+            _original_send = requests.Session.send
+            requests.Session.send = _send
+    logging.info(f"HTTP {'запись' if mode == 'record' else 'воспроизведение'}: {replay_dir()}")
+    return True
+
+
+def uninstall() -> None:
+    global _original_send
+    import requests
+
+    with _install_lock:
+        if _original_send is not None:
+            requests.Session.send = _original_send
+            _original_send = None
+
+
+# ---------------------------------------------------------------------------
+# Scrapy
+# ---------------------------------------------------------------------------
+
+class ReplayDownloaderMiddleware:
+    """
+    Downloader middleware для Scrapy (позиция как у HttpCacheMiddleware - рядом с загрузчиком,
+    ответы хранятся до распаковки и редиректов).
+    """
+
+    def __init__(self, mode: str):
+        self.mode = mode
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        from scrapy.exceptions import NotConfigured
+
+        mode = replay_mode()
+        if mode == "off":
+            raise NotConfigured
+        logging.info(f"Scrapy HTTP {'запись' if mode == 'record' else 'воспроизведение'}: {replay_dir()}")
+        return cls(mode)
+
+    async def process_request(self, request, spider=None):
+        if self.mode == "record":
+            request.meta["http_replay_started"] = time.time()
+            return None
+
+        from scrapy.exceptions import IgnoreRequest
+        from scrapy.http import Headers
+        from scrapy.responsetypes import responsetypes
+
+        entry = load_entry(request.method, request.url, request.body)
+        if entry is None:
+            logging.warning(f"Нет записи ответа для {request.method} {request.url}")
+            raise IgnoreRequest(f"Нет записи ответа для {request.url}")
+
+        headers = Headers()
+        for name, value in entry["headers"]:
+            headers.appendlist(name, value)
+        response_class = responsetypes.from_args(headers=headers, url=request.url, body=entry["body"])
+        response = response_class(url=request.url, status=entry["status"], headers=headers,
+                                  body=entry["body"], request=request)
+
+        latency = replay_latency(entry)
+        if latency <= 0:
+            return response
+        # Задержка без блокировки реактора: другие запросы идут параллельно
+        from scrapy.utils.defer import maybe_deferred_to_future
+        from twisted.internet import reactor
+        from twisted.internet.task import deferLater
+        await maybe_deferred_to_future(deferLater(reactor, latency, lambda: None))
+        return response
+
+    def process_response(self, request, response, spider=None):
+        if self.mode == "record" and "http_replay_started" in request.meta:
+            elapsed = time.time() - request.meta.pop("http_replay_started")
+            headers = [(name.decode('latin-1'), value.decode('latin-1'))
+                       for name, values in response.headers.items() for value in values
+                       if name.decode('latin-1').lower() not in ("set-cookie", "content-length")]
+            save_entry(request.method, request.url, request.body, response.status, "",
+                       headers, response.body, elapsed)
+        return response
@@ -0,0 +1,155 @@
+# utils/injury_crawl_state.py
+"""
+Состояние парсинга травм для инкрементального режима (травмы/main_injury_parser.py --incremental).
+
+История травм почти не меняется, поэтому для каждого игрока хранится хэш последней
+полученной таблицы травм, дата получения, есть ли незакрытая травма и дата последнего
+возвращения. Страница травм загружается заново, только если:
+    - игрока нет в состоянии (новый в составе);
+    - есть незакрытая травма (дата окончания не указана или еще не наступила);
+    - игрок вернулся не больше REFRESH_RECENT_DAYS дней назад (таблицу еще правят);
+    - запись старше TTL (--ttl-days, по умолчанию REFRESH_TTL_DAYS).
+
+Состояние обновляет паук травм после каждой страницы (и в полном режиме тоже),
+файл записывается при закрытии паука.
+
+Просмотр:
+    python -m utils.injury_crawl_state                 # сколько игроков и почему к обновлению
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from utils.injury_store import OPEN_INJURY_MAX_DAYS, PROJECT_ROOT, parse_injury_date, player_key
+
+try:
+    from config import INJURY_CRAWL_STATE_FILE
+except ImportError:
+    INJURY_CRAWL_STATE_FILE = "injury_crawl_state.json"
+
+REFRESH_TTL_DAYS = 30        # Запись старше - загрузить заново в любом случае
+REFRESH_RECENT_DAYS = 30     # Сколько дней после возвращения игрока продолжать обновлять
+
+
+def injuries_hash(injuries: List[Dict]) -> str:
+    """Хэш таблицы травм (порядок ключей не важен)"""
+    return hashlib.sha1(json.dumps(injuries, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def summarize_injuries(injuries: List[Dict], today: date) -> Tuple[bool, Optional[str]]:
+    """(есть ли незакрытая травма, дата последнего возвращения ISO) по таблице травм паука"""
+    is_open = False
+    last_end = None
+    for injury in injuries:
+        start = parse_injury_date(injury.get('from_date'))
+        end = parse_injury_date(injury.get('to_date'))
+        if start is None or start > today:
+            continue
+        if end is None:
+            is_open = is_open or (today - start).days <= OPEN_INJURY_MAX_DAYS
+        elif end >= today:
+            is_open = True
+        elif last_end is None or end > last_end:
+            last_end = end
+    return is_open, last_end.isoformat() if last_end else None
+
+
+class InjuryCrawlState:
+    """ID игрока -> {hash, fetched, open, last_end, team}"""
+
+    def __init__(self, path: str = INJURY_CRAWL_STATE_FILE):
+        self.path = path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+        self.players: Dict[str, Dict] = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.players = json.load(f).get("players", {})
+
+    def save(self) -> None:
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"players": self.players}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def record(self, player_id: str, injuries: List[Dict], team: Optional[str] = None,
+               today: Optional[date] = None) -> bool:
+        """
+        Запись полученной таблицы травм.
+
+        Returns:
+            True, если таблица изменилась с прошлого раза (или игрок новый)
+        """
+        today = today or date.today()
+        digest = injuries_hash(injuries)
+        previous = self.players.get(player_id)
+        is_open, last_end = summarize_injuries(injuries, today)
+        self.players[player_id] = {
+            "hash": digest,
+            "fetched": today.isoformat(),
+            "open": is_open,
+            "last_end": last_end,
+            "team": team,
+        }
+        return previous is None or previous.get("hash") != digest
+
+    def refresh_reason(self, player_id: Optional[str], today: Optional[date] = None,
+                       ttl_days: int = REFRESH_TTL_DAYS) -> Optional[str]:
+        """Почему страницу игрока нужно загрузить (None - не нужно)"""
+        entry = self.players.get(player_id or "")
+        if entry is None:
+            return "new"
+        today = today or date.today()
+        if entry.get("open"):
+            return "open"
+        last_end = entry.get("last_end")
+        if last_end and (today - date.fromisoformat(last_end)).days <= REFRESH_RECENT_DAYS:
+            return "recent"
+        fetched = entry.get("fetched")
+        if not fetched or today - date.fromisoformat(fetched) > timedelta(days=ttl_days):
+            return "stale"
+        return None
+
+    def select(self, urls: List[str], today: Optional[date] = None,
+               ttl_days: int = REFRESH_TTL_DAYS) -> Tuple[List[str], Dict[str, int]]:
+        """
+        URL страниц травм, которые нужно загрузить, и счетчики причин
+        ("new", "open", "recent", "stale", "fresh" - пропущено).
+        """
+        selected = []
+        reasons = {"new": 0, "open": 0, "recent": 0, "stale": 0, "fresh": 0}
+        for url in urls:
+            reason = self.refresh_reason(player_key(url), today, ttl_days)
+            reasons[reason or "fresh"] += 1
+            if reason:
+                selected.append(url)
+        return selected, reasons
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Состояние инкрементального парсинга травм")
+    parser.add_argument("--file", default=INJURY_CRAWL_STATE_FILE)
+    parser.add_argument("--ttl-days", type=int, default=REFRESH_TTL_DAYS)
+    args = parser.parse_args()
+
+    if sys.platform.startswith('win'):
+        sys.stdout.reconfigure(encoding='utf-8')
+
+    state = InjuryCrawlState(args.file)
+    if not state.players:
+        print("❌ Состояние пустое - инкрементальный режим загрузит всех игроков")
+        return
+    reasons = {}
+    for player_id in state.players:
+        reason = state.refresh_reason(player_id, ttl_days=args.ttl_days) or "fresh"
+        reasons[reason] = reasons.get(reason, 0) + 1
+    print(f"📊 Игроков: {len(state.players)}, к обновлению: {len(state.players) - reasons.get('fresh', 0)}")
+    for reason, count in sorted(reasons.items()):
+        print(f"   {reason:<7} {count}")
+
+
+if __name__ == '__main__':
+    main()
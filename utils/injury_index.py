@@ -0,0 +1,196 @@
+# utils/injury_index.py
+"""
+Травмы в расчете готовности: статус игроков на дату по хранилищу травм.
+
+Паук травм (травмы/transfermarkt_injury_spider.py) дописывает травмы в колоночное
+хранилище (utils/injury_store.py) с разобранными датами; индекс интервалов строится
+один раз при загрузке хранилища, PlayerAnalyzer ищет игроков по URL из состава
+(ID из /spieler/{id}) - без чтения файлов на каждого игрока, весь состав - одним запросом.
+
+Статус игрока на дату:
+    injured  - травма не закончилась (конец позже даты или не указан) - игрок
+               исключается из силы команды (team_utils.calculate_team_strengths);
+    returned - вернулся не больше RECENT_RETURN_DAYS дней назад - готовность умножается
+               на factor: от RETURN_FACTOR сразу после возвращения до 1.0.
+
+Использование:
+    python -m utils.injury_index import                # JSON из injuries/ -> хранилище
+    python -m utils.injury_index status https://www.transfermarkt.world/-/profil/spieler/607720
+    python -m utils.injury_index out Бавария --date 2025-11-08
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from utils.injury_store import INJURY_STORE_DIR, PROJECT_ROOT, InjuryStore, IntervalIndex, player_key
+
+try:
+    from config import INJURIES_DIR
+except ImportError:
+    INJURIES_DIR = "injuries"
+
+RECENT_RETURN_DAYS = 21      # Сколько дней после травмы игрок считается "вернувшимся"
+RETURN_FACTOR = 0.8          # Множитель готовности в день возвращения
+
+
+def import_injury_files(store: InjuryStore, injuries_dir: str = INJURIES_DIR) -> int:
+    """
+    Перенос injuries/{матч}/{команда}_injuries.json в хранилище (дата получения - время
+    изменения файла); уже перенесенные травмы не дублируются.
+    """
+    injuries_dir = injuries_dir if os.path.isabs(injuries_dir) else os.path.join(PROJECT_ROOT, injuries_dir)
+    files = []
+    if os.path.isdir(injuries_dir):
+        for match_name in os.listdir(injuries_dir):
+            match_dir = os.path.join(injuries_dir, match_name)
+            if not os.path.isdir(match_dir):
+                continue
+            for filename in os.listdir(match_dir):
+                if filename.endswith("_injuries.json"):
+                    path = os.path.join(match_dir, filename)
+                    files.append((os.path.getmtime(path), path))
+
+    added = 0
+    for mtime, path in sorted(files):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Не удалось прочитать {path}: {e}", file=sys.stderr)
+            continue
+        added += store.append(records, seen=date.fromtimestamp(mtime))
+    return added
+
+
+class InjuryIndex:
+    """Статусы игроков по индексу интервалов хранилища травм"""
+
+    def __init__(self, intervals: Optional[IntervalIndex] = None):
+        self.intervals = intervals
+
+    def __len__(self) -> int:
+        return len(self.intervals) if self.intervals is not None else 0
+
+    @classmethod
+    def from_store(cls, store: InjuryStore) -> "InjuryIndex":
+        return cls(store.interval_index())
+
+    def statuses(self, player_urls: List[Optional[str]], as_of: Optional[date] = None) -> List[Optional[Dict]]:
+        """
+        Статусы набора игроков на дату as_of (по умолчанию сегодня) одним запросом к индексу.
+
+        Returns:
+            для каждого игрока None (травм нет или вернулся давно) или
+            {status, injury_type, from_date, to_date, days_since_return, factor}
+        """
+        if not self.intervals or not player_urls:
+            return [None] * len(player_urls)
+        as_of = as_of or date.today()
+        player_ids = [int(player_key(url) or -1) for url in player_urls]
+        injured, last_end, rows = self.intervals.lookup(player_ids, as_of)
+        day = (as_of - date(1970, 1, 1)).days
+
+        statuses = []
+        for is_injured, end, row in zip(injured.tolist(), last_end.tolist(), rows.tolist()):
+            if row < 0:
+                statuses.append(None)
+                continue
+            if is_injured:
+                statuses.append(self._status("injured", row, None, 0.0))
+                continue
+            days_since = day - end
+            if days_since > RECENT_RETURN_DAYS:
+                statuses.append(None)
+                continue
+            factor = RETURN_FACTOR + (1.0 - RETURN_FACTOR) * days_since / RECENT_RETURN_DAYS
+            statuses.append(self._status("returned", row, days_since, round(factor, 3)))
+        return statuses
+
+    def status(self, player_url: Optional[str], as_of: Optional[date] = None) -> Optional[Dict]:
+        return self.statuses([player_url], as_of)[0]
+
+    def out_on(self, team: str, as_of: Optional[date] = None) -> List[int]:
+        """ID игроков команды, травмированных на дату"""
+        if not self.intervals:
+            return []
+        return self.intervals.out_on(team, as_of or date.today())
+
+    def _status(self, status: str, row: int, days_since: Optional[int], factor: float) -> Dict:
+        injury = self.intervals.injury(row)
+        return {
+            "status": status,
+            "injury_type": injury["injury_type"],
+            "from_date": injury["from_date"],
+            "to_date": injury["to_date"],
+            "days_since_return": days_since,
+            "factor": factor,
+        }
+
+
+_cached: Dict[str, Tuple[float, InjuryIndex]] = {}
+
+
+def store_meta_path(store_dir: str = INJURY_STORE_DIR) -> str:
+    store_dir = store_dir if os.path.isabs(store_dir) else os.path.join(PROJECT_ROOT, store_dir)
+    return os.path.join(store_dir, 'meta.json')
+
+
+def get_index(store_dir: str = INJURY_STORE_DIR) -> InjuryIndex:
+    """
+    Индекс хранилища с кэшем до следующей записи в него; без хранилища - пустой
+    индекс (травмы не учитываются).
+    """
+    meta_path = store_meta_path(store_dir)
+    try:
+        mtime = os.path.getmtime(meta_path)
+    except OSError:
+        return InjuryIndex()
+    cached = _cached.get(meta_path)
+    if cached is None or cached[0] != mtime:
+        try:
+            cached = _cached[meta_path] = (mtime, InjuryIndex.from_store(InjuryStore(store_dir)))
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Не удалось прочитать хранилище травм {store_dir}: {e}", file=sys.stderr)
+            return InjuryIndex()
+    return cached[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Травмы игроков")
+    parser.add_argument("--store", default=INJURY_STORE_DIR, help=f"хранилище травм (по умолчанию {INJURY_STORE_DIR})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    import_parser = sub.add_parser("import", help="перенести JSON паука травм в хранилище")
+    import_parser.add_argument("--injuries", default=INJURIES_DIR, help=f"папка травм (по умолчанию {INJURIES_DIR})")
+    status_parser = sub.add_parser("status", help="статус игрока по URL")
+    status_parser.add_argument("url")
+    status_parser.add_argument("--date", help="дата ГГГГ-ММ-ДД (по умолчанию сегодня)")
+    out_parser = sub.add_parser("out", help="травмированные игроки команды на дату")
+    out_parser.add_argument("team")
+    out_parser.add_argument("--date", help="дата ГГГГ-ММ-ДД (по умолчанию сегодня)")
+    args = parser.parse_args()
+
+    if sys.platform.startswith('win'):
+        sys.stdout.reconfigure(encoding='utf-8')
+
+    if args.command == "import":
+        store = InjuryStore(args.store)
+        added = import_injury_files(store, args.injuries)
+        print(f"✅ Добавлено травм: {added}, всего строк: {store.rows}")
+        return
+
+    index = get_index(args.store)
+    as_of = date.fromisoformat(args.date) if args.date else None
+    if args.command == "status":
+        status = index.status(args.url, as_of)
+        print(json.dumps(status, ensure_ascii=False, indent=2) if status else "Травм нет")
+    else:
+        player_ids = index.out_on(args.team, as_of)
+        print(f"{args.team}: травмированы {len(player_ids)}" + (f" - {', '.join(map(str, player_ids))}" if player_ids else ""))
+
+
+if __name__ == '__main__':
+    main()
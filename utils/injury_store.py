@@ -0,0 +1,333 @@
+# utils/injury_store.py
+"""
+Хранилище травм игроков в колоночном формате (как results_store.py).
+
+Каждая колонка - отдельный бинарный файл (NumPy memmap), строки только дописываются.
+Даты разобраны в номера дней, строки (команда, тип травмы) - коды словарей из meta.json.
+Повторно спарсенная травма (игрок, начало, тип) дописывается новой версией, только если
+изменилась (например, появилась дата окончания); при чтении действует последняя версия.
+
+Структура папки:
+    injury_store/
+        meta.json             # версия, количество строк, словари team и injury_type
+        player_id.bin         # int32, ID игрока на Transfermarkt
+        team.bin              # int32, код команды
+        start.bin             # int32, начало травмы (дни от 1970-01-01)
+        end.bin               # int32, окончание; OPEN_END - не указано
+        days.bin              # int16, дней пропущено
+        matches_missed.bin    # int16
+        injury_type.bin       # int32, код типа травмы
+        seen.bin              # int32, день, когда строка получена парсером
+
+Запросы доступности - через IntervalIndex (interval_index()): травмы отсортированы
+по (игрок, начало) с накопленным максимумом окончания, статус набора игроков на дату -
+один векторный searchsorted; по команде - срез ее травм, отсортированных по началу.
+"""
+
+import json
+import logging
+import os
+import re
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.results_store import from_day_number, to_day_number
+
+try:
+    from config import INJURY_STORE_DIR
+except ImportError:
+    INJURY_STORE_DIR = "injury_store"
+
+STORE_VERSION = 1
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+OPEN_END = np.iinfo(np.int32).max   # Травма без даты окончания
+OPEN_INJURY_MAX_DAYS = 180          # Незакрытая травма старше этого считается закончившейся
+
+COLUMNS = {
+    'player_id': np.dtype('<i4'),
+    'team': np.dtype('<i4'),
+    'start': np.dtype('<i4'),
+    'end': np.dtype('<i4'),
+    'days': np.dtype('<i2'),
+    'matches_missed': np.dtype('<i2'),
+    'injury_type': np.dtype('<i4'),
+    'seen': np.dtype('<i4'),
+}
+DICTIONARIES = ('team', 'injury_type')
+
+DATE_FORMATS = ("%d.%m.%Y", "%d/%m/%Y", "%Y-%m-%d", "%b %d, %Y", "%d %b %Y", "%d.%m.%y")
+PLAYER_ID_PATTERN = re.compile(r"/spieler/(\d+)")
+
+
+def parse_injury_date(text: Optional[str]) -> Optional[date]:
+    """Дата из таблицы травм Transfermarkt; "?", "-" и пустое значение - None"""
+    if not text:
+        return None
+    text = text.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def player_key(url: Optional[str]) -> Optional[str]:
+    """ID игрока Transfermarkt из любого URL игрока (профиль, статистика, травмы)"""
+    if not url:
+        return None
+    match = PLAYER_ID_PATTERN.search(url)
+    return match.group(1) if match else None
+
+
+def _small_int(value) -> int:
+    try:
+        return max(0, min(int(value or 0), np.iinfo(np.int16).max))
+    except (TypeError, ValueError):
+        return 0
+
+
+class InjuryStore:
+    """Append-only колоночное хранилище травм"""
+
+    def __init__(self, store_dir: str = INJURY_STORE_DIR):
+        self.store_dir = store_dir if os.path.isabs(store_dir) else os.path.join(PROJECT_ROOT, store_dir)
+        os.makedirs(self.store_dir, exist_ok=True)
+        self.meta_path = os.path.join(self.store_dir, 'meta.json')
+        self.rows, self.dictionaries = self._read_meta()
+        self._codes = {kind: {value: code for code, value in enumerate(values)}
+                       for kind, values in self.dictionaries.items()}
+        self._versions = None  # (игрок, начало, тип) -> последняя версия, строится при первой записи
+        self._index = None
+
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.store_dir, f"{name}.bin")
+
+    def _read_meta(self) -> Tuple[int, Dict[str, List[str]]]:
+        """Количество строк и словари; недописанный хвост колонок игнорируется"""
+        if not os.path.exists(self.meta_path):
+            return 0, {kind: [] for kind in DICTIONARIES}
+        with open(self.meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_VERSION:
+            raise ValueError(f"Неподдерживаемая версия хранилища травм: {meta.get('version')}")
+        dictionaries = meta.get('dictionaries', {})
+        return meta.get('rows', 0), {kind: list(dictionaries.get(kind, [])) for kind in DICTIONARIES}
+
+    def _write_meta(self) -> None:
+        tmp_path = self.meta_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': STORE_VERSION, 'rows': self.rows,
+                       'columns': {name: dtype.str for name, dtype in COLUMNS.items()},
+                       'dictionaries': self.dictionaries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.meta_path)
+
+    def _truncate_tails(self) -> None:
+        """Обрезает колонки до количества строк из meta (после прерванной записи)"""
+        for name, dtype in COLUMNS.items():
+            path = self._column_path(name)
+            if os.path.exists(path) and os.path.getsize(path) > self.rows * dtype.itemsize:
+                with open(path, 'r+b') as f:
+                    f.truncate(self.rows * dtype.itemsize)
+
+    def code(self, kind: str, value: Optional[str]) -> int:
+        """Код строки в словаре (новая строка добавляется)"""
+        value = (value or "").strip()
+        codes = self._codes[kind]
+        if value not in codes:
+            codes[value] = len(self.dictionaries[kind])
+            self.dictionaries[kind].append(value)
+        return codes[value]
+
+    def decode(self, kind: str, code: int) -> str:
+        return self.dictionaries[kind][int(code)]
+
+    def _load_versions(self) -> Dict[Tuple[int, int, int], Tuple[int, int, int]]:
+        if self._versions is None:
+            columns = self.columns()
+            keys = zip(columns['player_id'].tolist(), columns['start'].tolist(), columns['injury_type'].tolist())
+            values = zip(columns['end'].tolist(), columns['days'].tolist(), columns['matches_missed'].tolist())
+            self._versions = dict(zip(keys, values))
+        return self._versions
+
+    def append(self, records: Iterable[Dict], seen=None) -> int:
+        """
+        Дописывает травмы игроков.
+
+        Аргументы:
+            records: записи паука травм - {player_id, player_url, team, injuries: [{injury_type,
+                     from_date, to_date, days, matches_missed}, ...]}
+            seen: дата получения данных (по умолчанию сегодня)
+
+        Возвращает:
+            int: количество новых или изменившихся травм
+        """
+        versions = self._load_versions()
+        seen_day = to_day_number(seen or date.today())
+        new_rows = {name: [] for name in COLUMNS}
+
+        for record in records:
+            key = player_key(record.get('player_url')) or str(record.get('player_id') or "")
+            if not key.isdigit():
+                logging.warning(f"Пропущена запись травм без ID игрока: {record.get('player_url')}")
+                continue
+            team = self.code('team', record.get('team'))
+            for injury in record.get('injuries', []):
+                start = parse_injury_date(injury.get('from_date'))
+                if start is None:
+                    continue
+                end = parse_injury_date(injury.get('to_date'))
+                row = {
+                    'player_id': int(key),
+                    'team': team,
+                    'start': to_day_number(start),
+                    'end': to_day_number(end) if end else OPEN_END,
+                    'days': _small_int(injury.get('days')),
+                    'matches_missed': _small_int(injury.get('matches_missed')),
+                    'injury_type': self.code('injury_type', injury.get('injury_type')),
+                    'seen': seen_day,
+                }
+                version_key = (row['player_id'], row['start'], row['injury_type'])
+                version = (row['end'], row['days'], row['matches_missed'])
+                if versions.get(version_key) == version:
+                    continue
+                versions[version_key] = version
+                for name in COLUMNS:
+                    new_rows[name].append(row[name])
+
+        added = len(new_rows['player_id'])
+        if not added:
+            return 0
+
+        self._truncate_tails()
+        for name, dtype in COLUMNS.items():
+            with open(self._column_path(name), 'ab') as f:
+                np.asarray(new_rows[name], dtype=dtype).tofile(f)
+        self.rows += added
+        self._write_meta()
+        self._index = None
+
+        logging.info(f"В хранилище травм добавлено записей: {added} (всего {self.rows})")
+        return added
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Все колонки как массивы только для чтения (memmap)"""
+        result = {}
+        for name, dtype in COLUMNS.items():
+            if self.rows == 0:
+                result[name] = np.empty(0, dtype=dtype)
+            else:
+                result[name] = np.memmap(self._column_path(name), dtype=dtype, mode='r', shape=(self.rows,))
+        return result
+
+    def interval_index(self) -> "IntervalIndex":
+        if self._index is None:
+            self._index = IntervalIndex(self.columns(), self.dictionaries)
+        return self._index
+
+
+class IntervalIndex:
+    """
+    Индекс интервалов травм (последние версии строк хранилища).
+
+    По игрокам: строки отсортированы по ключу (игрок << 32 | начало), для каждой строки -
+    максимальное окончание среди травм игрока, начавшихся не позже нее (и строка с ним).
+    По командам: строки команды - непрерывный срез, отсортированный по началу.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], dictionaries: Dict[str, List[str]]):
+        self.dictionaries = dictionaries
+        self.team_codes = {name: code for code, name in enumerate(dictionaries.get('team', []))}
+
+        player_id = np.asarray(columns['player_id'], dtype=np.int64)
+        start = np.asarray(columns['start'], dtype=np.int64)
+        injury_type = np.asarray(columns['injury_type'], dtype=np.int64)
+
+        # Последняя версия каждой травмы (игрок, начало, тип)
+        rows = np.arange(len(player_id))
+        if len(rows):
+            version_key = np.stack([player_id, start, injury_type], axis=1)
+            _, last_from_end = np.unique(version_key[::-1], axis=0, return_index=True)
+            rows = np.sort(len(rows) - 1 - last_from_end)
+        self.columns = {name: np.asarray(column)[rows] for name, column in columns.items()}
+
+        player_id = self.columns['player_id'].astype(np.int64)
+        start = self.columns['start'].astype(np.int64)
+        end = self.columns['end'].astype(np.int64)
+        # Незакрытые травмы действуют не дольше OPEN_INJURY_MAX_DAYS
+        end = np.where(end == OPEN_END, start + OPEN_INJURY_MAX_DAYS, end)
+
+        order = np.lexsort((start, player_id))
+        self.player_order = order
+        self.player_keys = (player_id[order] << 32) | (start[order] & 0xFFFFFFFF)
+        self.player_ids = player_id[order]
+        sorted_end = end[order]
+        # Накопленный максимум окончания внутри игрока: смещение по номеру игрока не дает
+        # максимуму перейти из предыдущего игрока в следующего
+        segment = np.cumsum(np.r_[0, np.diff(self.player_ids) != 0]) if len(order) else np.empty(0, np.int64)
+        shifted = sorted_end - sorted_end.min(initial=0) + segment * (1 << 33)
+        running = np.maximum.accumulate(shifted) if len(order) else shifted
+        self.max_end = running - segment * (1 << 33) + sorted_end.min(initial=0)
+        positions = np.arange(len(order))
+        self.max_end_row = np.maximum.accumulate(np.where(shifted == running, positions, 0)) if len(order) else positions
+
+        team = self.columns['team'].astype(np.int64)
+        team_order = np.lexsort((start, team))
+        self.team_order = team_order
+        self.team_start = start[team_order]
+        self.team_end = end[team_order]
+        self.team_player = player_id[team_order]
+        sorted_team = team[team_order]
+        self.team_bounds = {}
+        for code in np.unique(sorted_team):
+            self.team_bounds[int(code)] = (int(np.searchsorted(sorted_team, code, 'left')),
+                                           int(np.searchsorted(sorted_team, code, 'right')))
+
+    def __len__(self) -> int:
+        return len(self.player_keys)
+
+    def lookup(self, player_ids, day) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Векторный запрос на день day (номер дня или дата) для набора игроков.
+
+        Returns:
+            (injured, last_end, row): травмирован ли; последнее окончание травмы, начавшейся
+            не позже day (-1 - травм не было); строка self.columns с этой травмой (-1 - нет)
+        """
+        day = to_day_number(day)
+        player_ids = np.asarray(player_ids, dtype=np.int64)
+        if not len(self.player_keys):
+            missing = np.full(len(player_ids), -1, dtype=np.int64)
+            return np.zeros(len(player_ids), dtype=bool), missing, missing
+        queries = (player_ids << 32) | (day & 0xFFFFFFFF)
+        positions = np.searchsorted(self.player_keys, queries, side='right') - 1
+        clipped = np.maximum(positions, 0)
+        valid = (positions >= 0) & (self.player_ids[clipped] == player_ids)
+        last_end = np.where(valid, self.max_end[clipped], -1)
+        rows = np.where(valid, self.player_order[self.max_end_row[clipped]], -1)
+        return valid & (last_end >= day), last_end, rows
+
+    def out_on(self, team: str, day) -> List[int]:
+        """ID игроков команды, травмированных на день day"""
+        code = self.team_codes.get(team)
+        if code is None or code not in self.team_bounds:
+            return []
+        day = to_day_number(day)
+        low, high = self.team_bounds[code]
+        high = low + int(np.searchsorted(self.team_start[low:high], day, side='right'))
+        injured = self.team_end[low:high] >= day
+        return sorted(set(self.team_player[low:high][injured].tolist()))
+
+    def injury(self, row: int) -> Dict:
+        """Травма по строке self.columns (даты - ISO, окончание None - не указано)"""
+        end = int(self.columns['end'][row])
+        return {
+            "injury_type": self.dictionaries['injury_type'][int(self.columns['injury_type'][row])],
+            "from_date": from_day_number(self.columns['start'][row]).isoformat(),
+            "to_date": from_day_number(end).isoformat() if end != OPEN_END else None,
+            "days": int(self.columns['days'][row]),
+            "team": self.dictionaries['team'][int(self.columns['team'][row])],
+        }
@@ -0,0 +1,410 @@
+# utils/metrics.py
+"""
+Метрики стадий конвейера: счетчики, гистограммы и таймеры (гистограммы секунд).
+
+Включаются config.METRICS_FILE (или переменной окружения METRICS_FILE): снимки всех метрик
+процесса дописываются в JSON Lines раз в METRICS_FLUSH_INTERVAL секунд и при выходе.
+serve() отдает /metrics в текстовом формате Prometheus на config.METRICS_PORT (METRICS_PORT).
+
+Выключенные метрики ничего не считают: каждая функция сразу возвращается после проверки
+одной глобальной переменной, timer() отдает общий пустой контекст.
+
+Использование:
+    with metrics.timer("spider_parse_seconds", spider=self.name):
+        ...
+    metrics.inc("spider_responses_total", status=response.status)
+    metrics.observe("spider_download_seconds", latency, spider=self.name)
+
+    @metrics.timed("forecast_match_seconds")
+    def calculate_match_probabilities(...): ...
+
+Отчет по файлу снимков:
+    python -m utils.metrics report metrics.jsonl
+    python -m utils.metrics prometheus metrics.jsonl
+"""
+
+import argparse
+import atexit
+import bisect
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from config import METRICS_FILE, METRICS_FLUSH_INTERVAL, METRICS_PORT
+except ImportError:
+    METRICS_FILE = None
+    METRICS_PORT = None
+    METRICS_FLUSH_INTERVAL = 30
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Границы корзин гистограмм (секунды для таймеров)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelsKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Количество, сумма, min/max и корзины (последняя - +Inf)"""
+
+    __slots__ = ("buckets", "counts", "count", "sum", "min", "max")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+
+class Registry:
+    """Метрики одного процесса"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: Dict[Tuple[str, LabelsKey], float] = {}
+        self.histograms: Dict[Tuple[str, LabelsKey], Histogram] = {}
+        self.version = 0  # Растет при каждом изменении - пустые снимки не пишутся
+
+    def inc(self, name: str, value: float, labels: LabelsKey) -> None:
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+            self.version += 1
+
+    def observe(self, name: str, value: float, labels: LabelsKey) -> None:
+        key = (name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+            self.version += 1
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            return {
+                "counters": [{"name": name, "labels": dict(labels), "value": value}
+                             for (name, labels), value in self.counters.items()],
+                "histograms": [{"name": name, "labels": dict(labels), "count": h.count, "sum": h.sum,
+                                "min": h.min, "max": h.max, "buckets": list(h.buckets), "counts": list(h.counts)}
+                               for (name, labels), h in self.histograms.items()],
+            }
+
+
+_registry: Optional[Registry] = None
+_registry_pid = None
+_metrics_file = None
+_flushed_version = 0
+_flush_lock = threading.Lock()
+_flush_thread = None
+_server = None
+
+
+def _labels_key(labels: Dict) -> LabelsKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _get_registry() -> Registry:
+    """Реестр текущего процесса: после fork счет начинается заново"""
+    global _registry, _registry_pid, _flushed_version
+    if _registry_pid != os.getpid():
+        _registry = Registry()
+        _registry_pid = os.getpid()
+        _flushed_version = 0
+    return _registry
+
+
+def enabled() -> bool:
+    return _registry is not None
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    if _registry is None:
+        return
+    _get_registry().inc(name, value, _labels_key(labels))
+
+
+def observe(name: str, value: float, **labels) -> None:
+    if _registry is None:
+        return
+    _get_registry().observe(name, value, _labels_key(labels))
+
+
+class _Timer:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name: str, labels: Dict):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name: str, **labels):
+    """Контекст, замеряющий время блока в гистограмму name (секунды)"""
+    if _registry is None:
+        return _NULL_TIMER
+    return _Timer(name, labels)
+
+
+def timed(name: str, **labels):
+    """Декоратор: время каждого вызова функции в гистограмму name"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _registry is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - start, **labels)
+        return wrapper
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# Экспорт
+# ---------------------------------------------------------------------------
+
+def flush() -> None:
+    """Дописать снимок метрик процесса в файл (если с прошлого снимка что-то изменилось)"""
+    global _flushed_version
+    if _registry is None or _metrics_file is None:
+        return
+    registry = _get_registry()
+    with _flush_lock:
+        if registry.version == _flushed_version:
+            return
+        _flushed_version = registry.version
+        record = {
+            "ts": datetime.now().isoformat(timespec="seconds"),
+            "pid": os.getpid(),
+            "process": os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else "python",
+            **registry.snapshot()
+        }
+        try:
+            os.makedirs(os.path.dirname(_metrics_file) or ".", exist_ok=True)
+            with open(_metrics_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logging.warning(f"Не удалось записать метрики в {_metrics_file}: {e}")
+
+
+def _flush_loop(interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        flush()
+
+
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Dict, extra: Optional[Dict] = None) -> str:
+    items = {**labels, **(extra or {})}
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in items.items()) + "}"
+
+
+def render_prometheus(snapshot: Dict) -> str:
+    """Текстовый формат Prometheus для снимка"""
+    lines = []
+    typed = set()
+    for counter in sorted(snapshot["counters"], key=lambda c: c["name"]):
+        if counter["name"] not in typed:
+            typed.add(counter["name"])
+            lines.append(f"# TYPE {counter['name']} counter")
+        lines.append(f"{counter['name']}{_format_labels(counter['labels'])} {counter['value']}")
+    for histogram in sorted(snapshot["histograms"], key=lambda h: h["name"]):
+        name = histogram["name"]
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, count in zip(list(histogram["buckets"]) + ["+Inf"], histogram["counts"]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(histogram['labels'], {'le': bound})} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(histogram['labels'])} {histogram['sum']}")
+        lines.append(f"{name}_count{_format_labels(histogram['labels'])} {histogram['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus(_get_registry().snapshot()).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: Optional[int] = None, host: str = "127.0.0.1") -> bool:
+    """
+    /metrics для Prometheus в фоновом потоке (порт - config.METRICS_PORT / METRICS_PORT).
+    Вызывается из долгоживущих процессов (оркестратор, watch.py).
+
+    Returns:
+        True, если сервер запущен
+    """
+    global _server
+    port = port or os.environ.get("METRICS_PORT") or METRICS_PORT
+    if _registry is None or not port or _server is not None:
+        return False
+    try:
+        _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+    except OSError as e:
+        logging.warning(f"Порт метрик {port} недоступен: {e}")
+        return False
+    threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    logging.info(f"Метрики Prometheus: http://{host}:{port}/metrics")
+    return True
+
+
+def enable(path: Optional[str] = None, flush_interval: float = METRICS_FLUSH_INTERVAL) -> None:
+    """Включить метрики; path - файл снимков (None - только в памяти и для serve())"""
+    global _metrics_file, _flush_thread
+    _get_registry()
+    if path:
+        _metrics_file = path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+        if _flush_thread is None:
+            atexit.register(flush)
+            if flush_interval:
+                _flush_thread = threading.Thread(target=_flush_loop, args=(flush_interval,),
+                                                 name="metrics-flush", daemon=True)
+                _flush_thread.start()
+
+
+# Метрики включаются при импорте, если задан файл: отдельные стадии не требуют настройки
+_configured_file = os.environ.get("METRICS_FILE") or METRICS_FILE
+if _configured_file:
+    enable(_configured_file)
+
+
+# ---------------------------------------------------------------------------
+# Отчет по файлу снимков
+# ---------------------------------------------------------------------------
+
+def load_snapshots(path: str) -> List[Dict]:
+    """Последний снимок каждого процесса (снимки накопительные)"""
+    latest = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            latest[(record.get("process"), record.get("pid"))] = record
+    return list(latest.values())
+
+
+def merge_snapshots(snapshots: Iterable[Dict]) -> Dict:
+    """Сумма метрик всех процессов"""
+    counters, histograms = {}, {}
+    for snapshot in snapshots:
+        for counter in snapshot["counters"]:
+            key = (counter["name"], _labels_key(counter["labels"]))
+            counters[key] = counters.get(key, 0) + counter["value"]
+        for h in snapshot["histograms"]:
+            key = (h["name"], _labels_key(h["labels"]))
+            merged = histograms.get(key)
+            if merged is None:
+                histograms[key] = {**h, "counts": list(h["counts"])}
+                continue
+            merged["count"] += h["count"]
+            merged["sum"] += h["sum"]
+            merged["min"] = min(merged["min"], h["min"])
+            merged["max"] = max(merged["max"], h["max"])
+            merged["counts"] = [a + b for a, b in zip(merged["counts"], h["counts"])]
+    return {
+        "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in counters.items()],
+        "histograms": list(histograms.values())
+    }
+
+
+def histogram_quantile(histogram: Dict, q: float) -> float:
+    """Оценка квантиля по корзинам (верхняя граница корзины)"""
+    target = q * histogram["count"]
+    cumulative = 0
+    for bound, count in zip(histogram["buckets"], histogram["counts"]):
+        cumulative += count
+        if cumulative >= target:
+            return min(bound, histogram["max"])
+    return histogram["max"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Отчет по снимкам метрик")
+    parser.add_argument("command", choices=["report", "prometheus"])
+    parser.add_argument("file", nargs="?", default=os.environ.get("METRICS_FILE") or METRICS_FILE or "metrics.jsonl")
+    args = parser.parse_args()
+
+    if sys.platform.startswith('win'):
+        sys.stdout.reconfigure(encoding='utf-8')
+
+    snapshots = load_snapshots(args.file)
+    merged = merge_snapshots(snapshots)
+    if args.command == "prometheus":
+        print(render_prometheus(merged), end="")
+        return
+
+    print(f"📈 Метрики: {args.file} (процессов: {len(snapshots)})")
+    for h in sorted(merged["histograms"], key=lambda h: (h["name"], sorted(h["labels"].items()))):
+        labels = ", ".join(f"{k}={v}" for k, v in sorted(h["labels"].items()))
+        print(f"  {h['name']}{' [' + labels + ']' if labels else ''}: {h['count']} раз, всего {h['sum']:.3f} с, "
+              f"среднее {h['sum'] / max(h['count'], 1) * 1000:.2f} мс, p95 ≤ {histogram_quantile(h, 0.95) * 1000:.2f} мс, "
+              f"max {h['max'] * 1000:.2f} мс")
+    for counter in sorted(merged["counters"], key=lambda c: (c["name"], sorted(c["labels"].items()))):
+        labels = ", ".join(f"{k}={v}" for k, v in sorted(counter["labels"].items()))
+        print(f"  {counter['name']}{' [' + labels + ']' if labels else ''}: {counter['value']:g}")
+
+
+if __name__ == '__main__':
+    main()
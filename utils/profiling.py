@@ -0,0 +1,328 @@
+# utils/profiling.py
+"""
+Профилирование стадий конвейера флагом --profile (без правки кода).
+
+Режимы:
+    sample       (по умолчанию) - встроенный сэмплер по стенным часам: каждые --profile-interval
+                 секунд снимает стеки всех потоков; ожидание сети, sleep и блокировок тоже видно.
+                 Результат: стеки в collapsed-формате (flamegraph.pl, speedscope) и SVG-флеймграф.
+    cprofile     - детерминированный cProfile главного потока: .prof (snakeviz, pstats) и
+                 текстовая таблица по суммарному времени.
+    pyinstrument - если установлен (pip install pyinstrument): HTML и текстовое дерево;
+                 без библиотеки используется sample.
+
+Каждый запуск пишет в свою папку {--profile-dir}/{стадия}_{время}/: run.* - весь запуск,
+с --profile-per-match - отдельный профиль на каждый матч/команду ({имя}.*), а весь запуск
+не профилируется.
+
+Подключение в скрипте:
+    profiling.add_arguments(parser)
+    with profiling.session("test", args):
+        ...
+        with profiling.section(match_name):   # единица работы для --profile-per-match
+            ...
+
+Пример:
+    python test.py --profile
+    python team_parser.py --profile cprofile --profile-per-match
+"""
+
+import cProfile
+import html
+import io
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = ("sample", "cprofile", "pyinstrument")
+DEFAULT_PROFILE_DIR = "profiles"
+DEFAULT_INTERVAL = 0.005   # Секунд между снимками стеков в режиме sample
+PSTATS_LIMIT = 60          # Строк в текстовой таблице cProfile
+
+# SVG-флеймграф
+FLAME_WIDTH = 1200
+FLAME_FRAME_HEIGHT = 16
+FLAME_MIN_WIDTH = 0.3      # Узкие кадры (в пикселях) не рисуются
+
+_config: Optional[Dict] = None
+_run_profiler = None
+_section_names: Dict[str, int] = {}
+
+
+class SamplingProfiler:
+    """Сэмплер стеков всех потоков (sys._current_frames) в отдельном потоке"""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(thread_names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def save(self, base_path: str, title: str) -> List[str]:
+        collapsed_path = f"{base_path}.collapsed"
+        with open(collapsed_path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        svg_path = f"{base_path}.svg"
+        with open(svg_path, 'w', encoding='utf-8') as f:
+            f.write(render_flamegraph(self.stacks, f"{title}: {self.samples} снимков по {self.interval * 1000:g} мс"))
+        return [collapsed_path, svg_path]
+
+
+class CProfileProfiler:
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self) -> None:
+        self.profile.enable()
+
+    def stop(self) -> None:
+        self.profile.disable()
+
+    def save(self, base_path: str, title: str) -> List[str]:
+        prof_path = f"{base_path}.prof"
+        self.profile.dump_stats(prof_path)
+        report = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=report)
+        stats.sort_stats("cumulative").print_stats(PSTATS_LIMIT)
+        txt_path = f"{base_path}.txt"
+        with open(txt_path, 'w', encoding='utf-8') as f:
+            f.write(f"{title}\n{report.getvalue()}")
+        return [prof_path, txt_path]
+
+
+class PyinstrumentProfiler:
+    def __init__(self, interval: float):
+        self.profiler = pyinstrument.Profiler(interval=interval)
+
+    def start(self) -> None:
+        self.profiler.start()
+
+    def stop(self) -> None:
+        self.profiler.stop()
+
+    def save(self, base_path: str, title: str) -> List[str]:
+        html_path = f"{base_path}.html"
+        with open(html_path, 'w', encoding='utf-8') as f:
+            f.write(self.profiler.output_html())
+        txt_path = f"{base_path}.txt"
+        with open(txt_path, 'w', encoding='utf-8') as f:
+            f.write(f"{title}\n{self.profiler.output_text(unicode=True)}")
+        return [html_path, txt_path]
+
+
+def create_profiler(mode: str, interval: float = DEFAULT_INTERVAL):
+    if mode not in MODES:
+        raise ValueError(f"Неизвестный режим профилирования: {mode} (доступны: {', '.join(MODES)})")
+    if mode == "cprofile":
+        return CProfileProfiler()
+    if mode == "pyinstrument":
+        if pyinstrument is not None:
+            return PyinstrumentProfiler(interval)
+        logging.warning("pyinstrument не установлен (pip install pyinstrument) - используется режим sample")
+    return SamplingProfiler(interval)
+
+
+# ---------------------------------------------------------------------------
+# SVG-флеймграф из collapsed-стеков
+# ---------------------------------------------------------------------------
+
+def _flame_tree(stacks: Counter) -> Dict:
+    root = {"name": "all", "value": 0, "children": {}}
+    for stack, count in stacks.items():
+        root["value"] += count
+        node = root
+        for frame in stack.split(";"):
+            node = node["children"].setdefault(frame, {"name": frame, "value": 0, "children": {}})
+            node["value"] += count
+    return root
+
+
+def _flame_depth(node: Dict) -> int:
+    return 1 + max((_flame_depth(child) for child in node["children"].values()), default=0)
+
+
+def _flame_color(name: str) -> str:
+    # Теплая палитра, цвет стабилен для одной функции между запусками
+    value = zlib.crc32(name.encode('utf-8'))
+    return f"rgb({205 + value % 50},{(value >> 8) % 180},{(value >> 16) % 55})"
+
+
+def render_flamegraph(stacks: Counter, title: str) -> str:
+    """Статичный SVG (корень снизу), подсказки с числом снимков - в <title> кадров"""
+    root = _flame_tree(stacks)
+    total = root["value"] or 1
+    height = (_flame_depth(root) + 2) * FLAME_FRAME_HEIGHT
+    scale = FLAME_WIDTH / total
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{FLAME_WIDTH}" height="{height}" '
+        f'font-family="monospace" font-size="11">',
+        f'<rect width="100%" height="100%" fill="#f8f8f8"/>',
+        f'<text x="{FLAME_WIDTH / 2}" y="13" text-anchor="middle">{html.escape(title)}</text>',
+    ]
+
+    def draw(node: Dict, x: float, depth: int) -> None:
+        width = node["value"] * scale
+        if width < FLAME_MIN_WIDTH:
+            return
+        y = height - (depth + 1) * FLAME_FRAME_HEIGHT
+        name = html.escape(node["name"])
+        share = node["value"] / total * 100
+        parts.append(
+            f'<g><title>{name} ({node["value"]} снимков, {share:.1f}%)</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{width:.1f}" height="{FLAME_FRAME_HEIGHT - 1}" '
+            f'fill="{_flame_color(node["name"])}"/>'
+        )
+        chars = int(width / 7)
+        if chars >= 3:
+            label = node["name"] if len(node["name"]) <= chars else node["name"][:chars - 2] + ".."
+            parts.append(f'<text x="{x + 2:.1f}" y="{y + FLAME_FRAME_HEIGHT - 4}">{html.escape(label)}</text>')
+        parts.append('</g>')
+        child_x = x
+        for child in sorted(node["children"].values(), key=lambda item: item["name"]):
+            draw(child, child_x, depth + 1)
+            child_x += child["value"] * scale
+
+    draw(root, 0.0, 0)
+    parts.append('</svg>')
+    return "\n".join(parts)
+
+
+# ---------------------------------------------------------------------------
+# Запуск из скриптов стадий
+# ---------------------------------------------------------------------------
+
+def add_arguments(parser) -> None:
+    """Флаги --profile, --profile-per-match, --profile-dir, --profile-interval"""
+    parser.add_argument("--profile", nargs="?", const="sample", choices=MODES,
+                        help="профилировать запуск (по умолчанию sample; cprofile, pyinstrument)")
+    parser.add_argument("--profile-per-match", action="store_true",
+                        help="отдельный профиль на каждый матч/команду вместо всего запуска")
+    parser.add_argument("--profile-dir", default=DEFAULT_PROFILE_DIR,
+                        help=f"папка профилей (по умолчанию {DEFAULT_PROFILE_DIR} в корне проекта)")
+    parser.add_argument("--profile-interval", type=float, default=DEFAULT_INTERVAL,
+                        help="интервал снимков sample/pyinstrument, сек")
+
+
+def enabled() -> bool:
+    return _config is not None
+
+
+def _output_path(name: str) -> str:
+    """Путь файлов профиля без расширения; повторяющиеся имена получают номер"""
+    safe_name = re.sub(r'[\\/:*?"<>|\s]+', "_", name).strip("_")[:80] or "section"
+    count = _section_names.get(safe_name, 0)
+    _section_names[safe_name] = count + 1
+    if count:
+        safe_name = f"{safe_name}_{count + 1}"
+    return os.path.join(_config["dir"], safe_name)
+
+
+def start(stage: str, mode: str = "sample", out_dir: str = DEFAULT_PROFILE_DIR,
+          per_match: bool = False, interval: float = DEFAULT_INTERVAL) -> str:
+    """Начало профилирования стадии; возвращает папку профилей запуска"""
+    global _config, _run_profiler
+    out_dir = out_dir if os.path.isabs(out_dir) else os.path.join(PROJECT_ROOT, out_dir)
+    run_dir = os.path.join(out_dir, f"{stage}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    suffix = 1
+    while os.path.exists(run_dir):  # Несколько запусков в одну секунду
+        suffix += 1
+        run_dir = os.path.join(out_dir, f"{stage}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{suffix}")
+    os.makedirs(run_dir)
+    _config = {"stage": stage, "mode": mode, "dir": run_dir, "per_match": per_match,
+               "interval": interval, "started": time.time()}
+    _section_names.clear()
+    if not per_match:
+        _run_profiler = create_profiler(mode, interval)
+        _run_profiler.start()
+    logging.info(f"Профилирование {stage} ({mode}{', по матчам' if per_match else ''}): {run_dir}")
+    return run_dir
+
+
+def stop() -> List[str]:
+    """Конец профилирования стадии; возвращает записанные файлы"""
+    global _config, _run_profiler
+    if _config is None:
+        return []
+    paths = []
+    if _run_profiler is not None:
+        _run_profiler.stop()
+        title = f"{_config['stage']}: {time.time() - _config['started']:.1f} с"
+        paths = _run_profiler.save(_output_path("run"), title)
+        _run_profiler = None
+    print(f"🔬 Профили {_config['stage']}: {_config['dir']}", file=sys.stderr)
+    _config = None
+    return paths
+
+
+@contextmanager
+def session(stage: str, args):
+    """Профилирование всего блока, если в args задан --profile (add_arguments)"""
+    if not getattr(args, "profile", None):
+        yield
+        return
+    start(stage, args.profile, args.profile_dir, args.profile_per_match, args.profile_interval)
+    try:
+        yield
+    finally:
+        stop()
+
+
+@contextmanager
+def section(name: str):
+    """Единица работы (матч, команда) - свой профиль при --profile-per-match, иначе ничего"""
+    if _config is None or not _config["per_match"]:
+        yield
+        return
+    profiler = create_profiler(_config["mode"], _config["interval"])
+    started = time.time()
+    profiler.start()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        profiler.save(_output_path(name), f"{_config['stage']} / {name}: {time.time() - started:.1f} с")
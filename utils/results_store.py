@@ -0,0 +1,213 @@
+# utils/results_store.py
+"""
+Хранилище сыгранных матчей в колоночном формате.
+
+Каждая колонка - отдельный бинарный файл (NumPy memmap), строки только дописываются
+в конец. Повторно спарсенные матчи отбрасываются по ключу (дата, хозяева, гости).
+
+Структура папки:
+    results_store/
+        meta.json          # версия и количество строк
+        date.bin           # int32, дни от 1970-01-01
+        league_id.bin      # int32
+        home_id.bin        # int32, ID команды на soccer365
+        away_id.bin        # int32
+        home_goals.bin     # int16
+        away_goals.bin     # int16
+"""
+
+import json
+import logging
+import os
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+STORE_VERSION = 1
+EPOCH = date(1970, 1, 1)
+
+COLUMNS = {
+    'date': np.dtype('<i4'),
+    'league_id': np.dtype('<i4'),
+    'home_id': np.dtype('<i4'),
+    'away_id': np.dtype('<i4'),
+    'home_goals': np.dtype('<i2'),
+    'away_goals': np.dtype('<i2'),
+}
+
+
+def to_day_number(value) -> int:
+    """Преобразует date/datetime/'YYYY-MM-DD' в номер дня от 1970-01-01"""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.strptime(value[:10], '%Y-%m-%d').date()
+    if isinstance(value, datetime):
+        value = value.date()
+    return (value - EPOCH).days
+
+
+def from_day_number(day: int) -> date:
+    """Обратное преобразование номера дня в дату"""
+    return date.fromordinal(EPOCH.toordinal() + int(day))
+
+
+class ResultsStore:
+    """Append-only колоночное хранилище результатов матчей"""
+
+    def __init__(self, store_dir: str = "results_store"):
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+        self.meta_path = os.path.join(store_dir, 'meta.json')
+        self.rows = self._read_meta()
+        self._keys = None  # Ключи матчей строятся лениво при первой записи
+
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.store_dir, f"{name}.bin")
+
+    def _read_meta(self) -> int:
+        """Читает количество строк; недописанный хвост колонок игнорируется"""
+        if not os.path.exists(self.meta_path):
+            return 0
+        with open(self.meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_VERSION:
+            raise ValueError(f"Неподдерживаемая версия хранилища: {meta.get('version')}")
+        return meta.get('rows', 0)
+
+    def _write_meta(self) -> None:
+        tmp_path = self.meta_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': STORE_VERSION, 'rows': self.rows,
+                       'columns': {name: dtype.str for name, dtype in COLUMNS.items()}}, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def _truncate_tails(self) -> None:
+        """Обрезает колонки до количества строк из meta (после прерванной записи)"""
+        for name, dtype in COLUMNS.items():
+            path = self._column_path(name)
+            if os.path.exists(path) and os.path.getsize(path) > self.rows * dtype.itemsize:
+                with open(path, 'r+b') as f:
+                    f.truncate(self.rows * dtype.itemsize)
+
+    def _load_keys(self) -> set:
+        if self._keys is None:
+            columns = self.columns()
+            self._keys = set(zip(columns['date'].tolist(), columns['home_id'].tolist(), columns['away_id'].tolist()))
+        return self._keys
+
+    def append(self, matches: Iterable[Dict]) -> int:
+        """
+        Дописывает матчи в хранилище.
+
+        Аргументы:
+            matches: словари с ключами date, league_id, home_id, away_id, home_goals, away_goals
+
+        Возвращает:
+            int: количество новых (не дубликатов) строк
+        """
+        keys = self._load_keys()
+        new_rows = {name: [] for name in COLUMNS}
+
+        for match in matches:
+            try:
+                row = {
+                    'date': to_day_number(match['date']),
+                    'league_id': int(match.get('league_id') or 0),
+                    'home_id': int(match['home_id']),
+                    'away_id': int(match['away_id']),
+                    'home_goals': int(match['home_goals']),
+                    'away_goals': int(match['away_goals']),
+                }
+            except (KeyError, TypeError, ValueError) as e:
+                logging.warning(f"Пропущен матч без обязательных полей {match}: {e}")
+                continue
+
+            key = (row['date'], row['home_id'], row['away_id'])
+            if key in keys:
+                continue
+            keys.add(key)
+            for name in COLUMNS:
+                new_rows[name].append(row[name])
+
+        added = len(new_rows['date'])
+        if not added:
+            return 0
+
+        self._truncate_tails()
+        for name, dtype in COLUMNS.items():
+            with open(self._column_path(name), 'ab') as f:
+                np.asarray(new_rows[name], dtype=dtype).tofile(f)
+        self.rows += added
+        self._write_meta()
+
+        logging.info(f"В хранилище результатов добавлено матчей: {added} (всего {self.rows})")
+        return added
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Все колонки как массивы только для чтения (memmap)"""
+        result = {}
+        for name, dtype in COLUMNS.items():
+            if self.rows == 0:
+                result[name] = np.empty(0, dtype=dtype)
+            else:
+                result[name] = np.memmap(self._column_path(name), dtype=dtype, mode='r', shape=(self.rows,))
+        return result
+
+    def _select(self, mask: np.ndarray) -> Dict[str, np.ndarray]:
+        """Выборка строк по маске, отсортированная по дате"""
+        columns = self.columns()
+        order = np.argsort(columns['date'][mask], kind='stable')
+        return {name: np.asarray(column[mask])[order] for name, column in columns.items()}
+
+    def by_team(self, team_id, start=None, end=None) -> Dict[str, np.ndarray]:
+        """Матчи команды (дома и в гостях), опционально в диапазоне дат включительно"""
+        columns = self.columns()
+        team_id = int(team_id)
+        mask = (columns['home_id'] == team_id) | (columns['away_id'] == team_id)
+        if start is not None:
+            mask &= columns['date'] >= to_day_number(start)
+        if end is not None:
+            mask &= columns['date'] <= to_day_number(end)
+        return self._select(mask)
+
+    def by_date_range(self, start=None, end=None, league_id=None) -> Dict[str, np.ndarray]:
+        """Матчи в диапазоне дат включительно, опционально только одной лиги"""
+        columns = self.columns()
+        mask = np.ones(self.rows, dtype=bool)
+        if start is not None:
+            mask &= columns['date'] >= to_day_number(start)
+        if end is not None:
+            mask &= columns['date'] <= to_day_number(end)
+        if league_id is not None:
+            mask &= columns['league_id'] == int(league_id)
+        return self._select(mask)
+
+    def find_match(self, home_id, away_id, start=None, league_id=None) -> Optional[Dict]:
+        """Первый матч пары команд не раньше даты start, опционально только одной лиги"""
+        matches = self.by_team(home_id, start=start)
+        for i in np.nonzero(matches['away_id'] == int(away_id))[0]:
+            if league_id is not None and matches['league_id'][i] != int(league_id):
+                continue
+            if matches['home_id'][i] == int(home_id):
+                return {name: int(column[i]) for name, column in matches.items()}
+        return None
+
+    def team_form(self, team_id, n: int = 5, before=None) -> List[float]:
+        """
+        Последние n результатов команды в формате last_results (1 - победа, 0.5 - ничья, 0 - поражение),
+        от самого свежего матча к старому.
+        """
+        end = to_day_number(before) - 1 if before is not None else None
+        matches = self.by_team(team_id, end=end)
+        team_id = int(team_id)
+        results = []
+        for i in range(len(matches['date']) - 1, -1, -1):
+            if len(results) >= n:
+                break
+            is_home = matches['home_id'][i] == team_id
+            scored = matches['home_goals'][i] if is_home else matches['away_goals'][i]
+            conceded = matches['away_goals'][i] if is_home else matches['home_goals'][i]
+            results.append(1 if scored > conceded else 0.5 if scored == conceded else 0)
+        return results
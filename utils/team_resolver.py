@@ -0,0 +1,468 @@
+# utils/team_resolver.py
+"""
+Сопоставление названий команд soccer365 с URL Transfermarkt без точного совпадения.
+
+В таблице Teams команда записана под тем названием, под которым ее искали
+(pars_tim1bd.py), а в матчах soccer365 название может отличаться: "ФК Копенгаген" и
+"Копенгаген", "Кельн" и "Кёльн", "ПСЖ" и "Пари Сен-Жермен". Автоматически (method
+"exact" или "id") команда находится только по:
+    - нормализованному названию (регистр, ё, диакритика, пунктуация, ФК/FC и т.п.);
+    - псевдонимам (TEAM_ALIASES и подтвержденным командой alias);
+    - ID команды soccer365, запомненному после точного совпадения.
+Похожие названия - только подсказка (resolve(..., fuzzy=True), method "fuzzy"): набор
+слов должен совпадать, каждое слово - с различием не больше FUZZY_MIN_SIMILARITY
+("Галатасарай" ~ "Galatasaray"), а лучший кандидат - опережать второго. "Боруссия М",
+"Интер Майами", "Ливерпуль U21" не сопоставляются с "Боруссия Дортмунд", "Интер",
+"Ливерпуль". Подсказка не запоминается, пока ее не подтвердят:
+    python -m utils.team_resolver alias "Галатасарай" "Galatasaray"
+
+Индекс строится один раз из БД и хранится в TEAM_RESOLVER_FILE (путь от корня проекта).
+Команды, не найденные ни в индексе, ни в БД, ищутся на Transfermarkt пачкой
+(find_team_urls): страница поиска по HTTP в SEARCH_WORKERS потоков, оставшиеся - одним
+сеансом браузера на всех (find_urls_in_browser).
+
+Использование:
+    python -m utils.team_resolver build                 # команды из таблицы Teams
+    python -m utils.team_resolver resolve "Галатасарай"     # с подсказкой по похожему названию
+    python -m utils.team_resolver alias "ПСЖ" "Пари Сен-Жермен"
+    python -m utils.team_resolver missing [--search]    # ненайденные команды из competitions/
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from config import TEAM_RESOLVER_FILE
+except ImportError:
+    TEAM_RESOLVER_FILE = "team_resolver.json"
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FUZZY_MIN_SIMILARITY = 0.85   # Сходство триграмм названия и каждого его слова для подсказки
+MIN_MARGIN = 0.08             # Насколько лучший кандидат должен опережать второго
+AUTO_METHODS = ("exact", "id")  # Совпадения, которые принимаются без подтверждения
+
+SEARCH_WORKERS = 4             # Одновременных HTTP-запросов поиска на Transfermarkt
+SEARCH_DELAY = (0.5, 1.5)      # Пауза перед каждым запросом, секунд
+
+# Слова, не различающие команды
+CLUB_AFFIXES = {
+    'фк', 'пфк', 'фс', 'клуб', 'футбольный',
+    'fc', 'fk', 'cf', 'ac', 'as', 'sc', 'afc', 'sk', 'cd', 'ca', 'club', 'football',
+}
+
+# Устойчивые сокращения soccer365 -> название в БД (после нормализации)
+TEAM_ALIASES = {
+    'псж': 'пари сен жермен',
+    'ман юнайтед': 'манчестер юнайтед',
+    'ман сити': 'манчестер сити',
+    'рб лейпциг': 'лейпциг',
+    'интер милан': 'интер',
+}
+
+TRANSLIT = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ж': 'zh', 'з': 'z',
+    'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p',
+    'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch',
+    'ш': 'sh', 'щ': 'shch', 'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+}
+
+_NON_WORD = re.compile(r'[^\w]+')
+
+
+def _strip_accents(ch: str) -> str:
+    return ''.join(c for c in unicodedata.normalize('NFKD', ch) if not unicodedata.combining(c))
+
+
+def normalize_name(name: str) -> str:
+    """Ключ названия: нижний регистр, е вместо ё, без диакритики, пунктуации и ФК/FC"""
+    name = (name or '').casefold().replace('ё', 'е')
+    # Диакритика латиницы (ü, ç...) убирается, кириллица (й) не трогается
+    name = ''.join(_strip_accents(ch) if ch < '\u0400' else ch for ch in name)
+    words = [w for w in _NON_WORD.sub(' ', name.replace('_', ' ')).split() if w not in CLUB_AFFIXES]
+    return ' '.join(words)
+
+
+def transliterate(name: str) -> str:
+    """Латиница для нормализованного названия на кириллице"""
+    return ''.join(TRANSLIT.get(ch, ch) for ch in name)
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a: set, b: set) -> float:
+    """Коэффициент Дайса двух наборов триграмм"""
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def _same_words(query: List[str], candidate: List[str]) -> bool:
+    """
+    Одинаковые наборы слов (в латинице): у каждого слова запроса своя пара в кандидате,
+    совпадающая или отличающаяся опечаткой. Общее первое слово ("интер майами" и
+    "интер") совпадением не считается.
+    """
+    if len(query) != len(candidate):
+        return False
+    remaining = list(candidate)
+    for word in query:
+        pair = next((other for other in remaining if other == word or
+                     similarity(trigrams(word), trigrams(other)) >= FUZZY_MIN_SIMILARITY), None)
+        if pair is None:
+            return False
+        remaining.remove(pair)
+    return True
+
+
+class NameIndex:
+    """Нечеткий поиск по набору названий: ключ -> значение (URL, данные команды...)"""
+
+    def __init__(self):
+        self.values: Dict[str, object] = {}          # нормализованное название -> значение
+        self.grams: Dict[str, set] = {}              # нормализованное название -> триграммы латиницы
+        self.postings: Dict[str, set] = {}           # триграмма -> нормализованные названия
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def add(self, name: str, value) -> None:
+        key = normalize_name(name)
+        if not key:
+            return
+        self.values[key] = value
+        # Триграммы транслитерации: кириллица и латиница сравниваются в одном алфавите
+        grams = trigrams(transliterate(key))
+        self.grams[key] = grams
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(key)
+
+    def match(self, name: str) -> Optional[Tuple[object, float, str]]:
+        """
+        (значение, сходство 0..1, способ: exact/fuzzy) или None.
+        fuzzy - тот же набор слов с опечатками, сходство не ниже FUZZY_MIN_SIMILARITY
+        и отрыв от второго кандидата (или от нуля, если кандидат один) не меньше MIN_MARGIN.
+        """
+        key = normalize_name(name)
+        if not key:
+            return None
+        if key in self.values:
+            return self.values[key], 1.0, "exact"
+
+        query_key = transliterate(key)
+        query = trigrams(query_key)
+        candidates = set()
+        for gram in query:
+            candidates |= self.postings.get(gram, set())
+        scored = sorted(((similarity(query, self.grams[k]), k) for k in candidates), reverse=True)
+        best = {}
+        for score, k in scored:
+            best.setdefault(self._identity(k), (score, k))
+        ranked = sorted(best.values(), reverse=True)
+        if not ranked:
+            return None
+        score, k = ranked[0]
+        runner_up = ranked[1][0] if len(ranked) > 1 else 0.0
+        if score < FUZZY_MIN_SIMILARITY or score - runner_up < MIN_MARGIN:
+            return None
+        if not _same_words(query_key.split(), transliterate(k).split()):
+            return None
+        return self.values[k], round(score, 3), "fuzzy"
+
+    def _identity(self, key: str) -> str:
+        """Несколько названий одной команды (одно значение) - один кандидат"""
+        value = self.values[key]
+        return value if isinstance(value, str) else key
+
+
+class TeamResolver:
+    """Название/ID команды soccer365 -> URL Transfermarkt"""
+
+    def __init__(self, path: str = TEAM_RESOLVER_FILE):
+        self.path = path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+        self.teams: Dict[str, str] = {}      # название -> URL
+        self.aliases: Dict[str, str] = {}    # псевдоним -> название
+        self.ids: Dict[str, str] = {}        # ID soccer365 -> название
+        self.built_at = None
+        self.changed = False                 # Есть несохраненные изменения
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.teams = data.get("teams", {})
+            self.aliases = data.get("aliases", {})
+            self.ids = data.get("ids", {})
+            self.built_at = data.get("built_at")
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        self.index = NameIndex()
+        for name, url in self.teams.items():
+            self.index.add(name, url)
+        by_key = {normalize_name(name): url for name, url in self.teams.items()}
+        for alias, target in list(TEAM_ALIASES.items()) + list(self.aliases.items()):
+            url = self.teams.get(target) or by_key.get(normalize_name(target))
+            if url:
+                self.index.add(alias, url)
+
+    def save(self) -> None:
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"built_at": self.built_at, "teams": self.teams, "aliases": self.aliases,
+                       "ids": self.ids}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+        self.changed = False
+
+    def build(self, teams: Iterable[Tuple[str, str]]) -> int:
+        """Команды (название, URL) из БД; выученные псевдонимы и ID сохраняются"""
+        self.teams = {name: url for name, url in teams if name and url}
+        self.built_at = datetime.now().isoformat(timespec="seconds")
+        self.changed = True
+        self._rebuild()
+        return len(self.teams)
+
+    def add_team(self, name: str, url: str, team_id: Optional[str] = None) -> None:
+        """Команда, найденная в БД или браузером"""
+        self.teams[name] = url
+        self.index.add(name, url)
+        if team_id:
+            self.ids[str(team_id)] = name
+        self.changed = True
+
+    def add_alias(self, alias: str, name: str) -> bool:
+        url = self.teams.get(name)
+        if not url:
+            matched = self.index.match(name)
+            if not matched or matched[2] != "exact":
+                return False
+            url = matched[0]
+        self.aliases[alias] = name
+        self.index.add(alias, url)
+        self.changed = True
+        return True
+
+    def _name_for(self, url: str) -> Optional[str]:
+        return next((name for name, team_url in self.teams.items() if team_url == url), None)
+
+    def resolve(self, name: str, team_id: Optional[str] = None, fuzzy: bool = False) -> Optional[Dict]:
+        """
+        {name, url, score, method} или None. По умолчанию только точные совпадения
+        (AUTO_METHODS), они запоминаются по ID soccer365 (сохранить - save());
+        fuzzy=True - еще и подсказка по похожему названию, она не запоминается.
+        """
+        if team_id and str(team_id) in self.ids:
+            known = self.ids[str(team_id)]
+            if known in self.teams:
+                return {"name": known, "url": self.teams[known], "score": 1.0, "method": "id"}
+
+        matched = self.index.match(name)
+        if not matched:
+            return None
+        url, score, method = matched
+        found = self._name_for(url)
+        if method not in AUTO_METHODS:
+            if not fuzzy:
+                return None
+            logging.info(f"Команда '{name}' похожа на '{found}' ({score:.2f}) - не подтверждено")
+        elif team_id and found and self.ids.get(str(team_id)) != found:
+            self.ids[str(team_id)] = found
+            self.changed = True
+        return {"name": found or name, "url": url, "score": score, "method": method}
+
+
+_cached: Dict[str, Tuple[float, TeamResolver]] = {}
+
+
+def get_resolver(path: str = TEAM_RESOLVER_FILE) -> TeamResolver:
+    """Индекс с кэшем до следующей записи файла"""
+    full_path = path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+    try:
+        mtime = os.path.getmtime(full_path)
+    except OSError:
+        mtime = None
+    cached = _cached.get(full_path)
+    if cached is None or cached[0] != mtime:
+        cached = _cached[full_path] = (mtime, TeamResolver(path))
+    return cached[1]
+
+
+def load_db_teams() -> List[Tuple[str, str]]:
+    """Все команды таблицы Teams (название, URL)"""
+    from database import Database
+
+    db = Database()
+    try:
+        with db.conn.cursor() as cursor:
+            cursor.execute("SELECT team_name, team_url FROM Teams")
+            return [(row[0], row[1]) for row in cursor.fetchall()]
+    finally:
+        db.close()
+
+
+def find_urls_in_browser(names: List[str]) -> Dict[str, str]:
+    """
+    Поиск URL команд на Transfermarkt одним сеансом браузера на все команды
+    (запуск Chrome дороже самого поиска)
+    """
+    from scraper.base_scraper import BaseScraper
+    from scraper.team_scraper import TeamScraper
+
+    found = {}
+    if not names:
+        return found
+    scraper = BaseScraper()
+    try:
+        team_scraper = TeamScraper(scraper.driver)
+        for name in names:
+            _, url = team_scraper.find_team_url(name)
+            if url:
+                found[name] = url
+    finally:
+        scraper.close_driver()
+    return found
+
+
+def find_team_urls(names: List[str], workers: int = SEARCH_WORKERS, browser: bool = True) -> Dict[str, str]:
+    """
+    Поиск URL набора команд: страница поиска Transfermarkt по HTTP не больше чем
+    в workers потоков; не найденные так (отказ сайта, нет клуба в результатах) -
+    одним сеансом браузера (browser=False - без браузера)
+    """
+    import requests
+    from scraper.team_scraper import search_team_url
+
+    names = list(dict.fromkeys(names))
+    found = {}
+    if not names:
+        return found
+
+    local = threading.local()
+
+    def search(name):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()  # Сессия на поток: cookies и keep-alive
+        time.sleep(random.uniform(*SEARCH_DELAY))
+        return name, search_team_url(name, local.session)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for name, url in executor.map(search, names):
+            if url:
+                found[name] = url
+    logging.info(f"Найдено поиском по HTTP: {len(found)} из {len(names)}")
+
+    rest = [name for name in names if name not in found]
+    if rest and browser:
+        found.update(find_urls_in_browser(rest))
+    return found
+
+
+def save_found_teams(resolver: "TeamResolver", found: Dict[str, str],
+                     team_ids: Optional[Dict[str, Optional[str]]] = None) -> int:
+    """
+    Найденные команды - в таблицу Teams одной транзакцией и в индекс. Команда, чей URL
+    в БД уже записан под другим названием, в индекс не добавляется (конфликт в логе).
+    Возвращает число добавленных в БД.
+    """
+    from database import Database
+
+    if not found:
+        return 0
+    db = Database()
+    try:
+        saved, conflicts = db.save_teams(found.items())
+    finally:
+        db.close()
+    conflicting = {name for name, _, _ in conflicts}
+    for name, url in found.items():
+        if name not in conflicting:
+            resolver.add_team(name, url, (team_ids or {}).get(name))
+    resolver.save()
+    return saved
+
+
+def competition_teams(competitions_dir: str = "competitions") -> Dict[str, Optional[str]]:
+    """Команды из матчей competitions/: название -> ID soccer365"""
+    from utils.catalog import KIND_UPCOMING, find_artifacts
+
+    teams = {}
+    for path in find_artifacts(competitions_dir, KIND_UPCOMING):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                matches = json.load(f).get('matches', [])
+        except (OSError, ValueError):
+            continue
+        for match in matches:
+            for side in ('home', 'away'):
+                name = (match.get(f'{side}_team') or '').strip()
+                if name:
+                    teams[name] = match.get(f'{side}_team_id') or teams.get(name)
+    return teams
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сопоставление названий команд с URL Transfermarkt")
+    parser.add_argument("--file", default=TEAM_RESOLVER_FILE)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="построить индекс по таблице Teams")
+    resolve_parser = sub.add_parser("resolve", help="найти команду")
+    resolve_parser.add_argument("name")
+    resolve_parser.add_argument("--id", help="ID команды soccer365")
+    alias_parser = sub.add_parser("alias", help="добавить псевдоним")
+    alias_parser.add_argument("alias")
+    alias_parser.add_argument("name")
+    missing_parser = sub.add_parser("missing", help="команды из competitions/, которых нет в индексе")
+    missing_parser.add_argument("--competitions", default="competitions")
+    missing_parser.add_argument("--search", action="store_true",
+                                help="найти их на Transfermarkt (HTTP, затем браузер) и сохранить в БД")
+    missing_parser.add_argument("--workers", type=int, default=SEARCH_WORKERS,
+                                help=f"одновременных запросов поиска (по умолчанию {SEARCH_WORKERS})")
+    args = parser.parse_args()
+
+    if sys.platform.startswith('win'):
+        sys.stdout.reconfigure(encoding='utf-8')
+
+    resolver = TeamResolver(args.file)
+
+    if args.command == "build":
+        count = resolver.build(load_db_teams())
+        resolver.save()
+        print(f"✅ Команд в индексе: {count}, псевдонимов: {len(resolver.aliases)}, ID: {len(resolver.ids)}")
+    elif args.command == "resolve":
+        found = resolver.resolve(args.name, args.id, fuzzy=True)
+        print(json.dumps(found, ensure_ascii=False, indent=2) if found else "❌ Не найдена")
+        if found and found["method"] not in AUTO_METHODS:
+            print(f"⚠️ Только подсказка; подтвердить: python -m utils.team_resolver alias \"{args.name}\" \"{found['name']}\"")
+    elif args.command == "alias":
+        if not resolver.add_alias(args.alias, args.name):
+            print(f"❌ Команды '{args.name}' нет в индексе")
+            return
+        resolver.save()
+        print(f"✅ {args.alias} -> {args.name}")
+    else:
+        teams = competition_teams(args.competitions)
+        missing = [name for name, team_id in sorted(teams.items()) if not resolver.resolve(name, team_id)]
+        resolver.save()
+        print(f"📊 Команд в матчах: {len(teams)}, не найдено: {len(missing)}")
+        for name in missing:
+            print(f"   {name}")
+        if args.search and missing:
+            found = find_team_urls(missing, args.workers)
+            save_found_teams(resolver, found, teams)
+            print(f"✅ Найдено: {len(found)} из {len(missing)}")
+
+
+if __name__ == '__main__':
+    main()
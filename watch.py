@@ -0,0 +1,137 @@
+"""
+РЕЖИМ НАБЛЮДЕНИЯ ЗА commands/
+==============================
+Долгоживущий процесс: модули анализа загружаются один раз, дальше на каждое
+изменение пересчитывается только то, что от него зависит.
+
+    {команда}.json изменился   -> {команда}_res.json (test.py) -> прогноз матчей этой папки
+    {матч}_analysis.json изменился -> прогноз этого матча
+
+Прогноз сохраняется в {матч}_forecast.json (football_analyzer/main.py). Собственные
+файлы (_res.json, _forecast.json, .tmp) событий не порождают. Паук составов копит
+игроков в памяти и пишет {команда}.json один раз при закрытии (через .tmp и
+переименование), поэтому готовность не считается по недописанному составу.
+
+Пример:
+    python watch.py --commands commands
+    python watch.py --polling --interval 2     # без inotify
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from typing import Set, Tuple
+
+from orchestrator import ANALYZER_DIR, load_module
+from utils import metrics
+from utils.catalog import KIND_SQUAD, artifact_kind
+from utils.fs_watch import DEFAULT_POLL_INTERVAL, create_watcher
+from utils.logger import setup_logger
+
+COMMANDS_DIR = "commands"
+DEBOUNCE_SECONDS = 0.5  # Сбор пачки событий (оба состава матча, анализ и т.п.)
+
+# Файлы, которые пишет сам конвейер - на них не реагируем
+DERIVED_SUFFIXES = ("_res.json", "_forecast.json", ".tmp")
+
+
+def classify_changes(paths: Set[str]) -> Tuple[Set[str], Set[str]]:
+    """
+    Разделяет изменения на файлы команд (составы в папке своего матча, как в каталоге)
+    и папки матчей с новым анализом; прочие JSON пропускаются
+    """
+    team_files = set()
+    analysis_folders = set()
+    for path in paths:
+        if not path.endswith(".json") or path.endswith(DERIVED_SUFFIXES):
+            continue
+        if path.endswith("_analysis.json"):
+            analysis_folders.add(os.path.dirname(path))
+        elif artifact_kind(path) == KIND_SQUAD:
+            team_files.add(path)
+    return team_files, analysis_folders
+
+
+class PipelineWatcher:
+    """Теплый процесс: анализатор игроков и модуль прогноза загружены один раз"""
+
+    def __init__(self, commands_dir: str = COMMANDS_DIR):
+        self.commands_dir = commands_dir
+        self.player_analyzer = load_module("player_analyzer", "test.py").PlayerAnalyzer()
+        sys.path.insert(0, os.path.abspath(ANALYZER_DIR))
+        self.analyzer = load_module("football_analyzer_main", os.path.join(ANALYZER_DIR, "main.py"))
+
+    def update_team(self, team_file: str) -> None:
+        """Пересчет готовности игроков одной команды"""
+        res_file = f"{team_file[:-len('.json')]}_res.json"
+        start = time.perf_counter()
+        self.player_analyzer.analyze_team(team_file, res_file)
+        logging.info(f"♻️ {res_file} ({(time.perf_counter() - start) * 1000:.0f} мс)")
+
+    def update_forecast(self, match_folder: str) -> None:
+        """Пересчет прогноза одного матча"""
+        start = time.perf_counter()
+        result = self.analyzer.forecast_match_folder(match_folder)
+        if not result or result["forecast"] is None:
+            logging.warning(f"Нет данных для прогноза: {match_folder}")
+            return
+        forecast_file = self.analyzer.save_match_forecast(result, match_folder)
+        logging.info(f"📈 {forecast_file} ({(time.perf_counter() - start) * 1000:.0f} мс)")
+
+    def handle(self, paths: Set[str]) -> None:
+        team_files, match_folders = classify_changes(paths)
+        for team_file in sorted(team_files):
+            if not os.path.exists(team_file):
+                continue
+            try:
+                self.update_team(team_file)
+                # Профиль команды в прогнозе строится по файлу из той же папки матча
+                match_folder = os.path.dirname(team_file)
+                if any(f.endswith("_analysis.json") for f in os.listdir(match_folder)):
+                    match_folders.add(match_folder)
+            except Exception as e:
+                logging.error(f"Ошибка пересчета команды {team_file}: {e}")
+        for match_folder in sorted(match_folders):
+            try:
+                self.update_forecast(match_folder)
+            except Exception as e:
+                logging.error(f"Ошибка прогноза {match_folder}: {e}")
+
+    def run(self, poll_interval: float = DEFAULT_POLL_INTERVAL, force_polling: bool = False) -> None:
+        os.makedirs(self.commands_dir, exist_ok=True)
+        watcher = create_watcher(self.commands_dir, poll_interval, force_polling)
+        logging.info(f"👀 Наблюдение за {self.commands_dir} ({type(watcher).__name__})")
+        try:
+            while True:
+                changed = watcher.changes(timeout=None)
+                # Дожидаемся окончания пачки записей
+                while True:
+                    more = watcher.changes(timeout=DEBOUNCE_SECONDS)
+                    if not more:
+                        break
+                    changed |= more
+                self.handle(changed)
+        except KeyboardInterrupt:
+            logging.info("⏹️ Наблюдение остановлено")
+        finally:
+            watcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пересчет готовности и прогнозов при изменении файлов commands/")
+    parser.add_argument("--commands", default=COMMANDS_DIR, help="папка с матчами")
+    parser.add_argument("--polling", action="store_true", help="опрос файлов вместо inotify")
+    parser.add_argument("--interval", type=float, default=DEFAULT_POLL_INTERVAL, help="интервал опроса, сек")
+    args = parser.parse_args()
+
+    if sys.platform.startswith('win'):
+        sys.stdout.reconfigure(encoding='utf-8')
+    setup_logger()
+    metrics.serve()
+    PipelineWatcher(args.commands).run(args.interval, args.polling)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+# async_database.py
+"""
+Неблокирующий доступ к таблицам teams и injuries для Twisted/Scrapy.
+
+Database (database.py) выполняет запросы psycopg2 прямо в потоке реактора - пока идет
+запрос, паук не качает страницы. AsyncDatabase выполняет те же запросы в пуле соединений
+twisted.enterprise.adbapi (потоки пула, по соединению на поток) и возвращает Deferred.
+Методы те же, что у Database, плюс пакетные: get_team_urls, existing_teams, add_teams -
+один запрос на набор команд вместо запроса на каждую. Травмы: write_injuries (пакетная
+запись обхода, см. injury_db.py) и injured_players (кто травмирован в команде на дату).
+
+Ошибки, как и в Database, пишутся в лог, а результат - значение по умолчанию
+(None / [] / False).
+
+Использование:
+    db = AsyncDatabase()
+
+    # inlineCallbacks
+    team_url = yield db.get_team_url("Бавария")
+
+    # async def в Scrapy (asyncio-реактор) или корутина asyncio
+    from scrapy.utils.defer import maybe_deferred_to_future
+    urls = await maybe_deferred_to_future(db.get_team_urls(["Бавария", "Барселона"]))
+
+    db.close()
+"""
+
+import logging
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from twisted.enterprise import adbapi
+from twisted.internet import defer
+
+from database import PG_CONFIG
+from injury_db import BACKENDS, INJURED_ON_SQL, create_injury_tables, injured_on_params, write_injury_rows
+from utils import metrics
+
+POOL_MIN = 1             # Соединений, открываемых при старте пула
+POOL_MAX = 5             # Одновременных запросов (= потоков пула)
+BULK_CHUNK_SIZE = 500    # Команд в одном пакетном запросе
+
+
+class AsyncDatabase:
+    """Пул соединений PostgreSQL, методы возвращают Deferred"""
+
+    def __init__(self, dbapi_name: str = "psycopg2", pool_min: int = POOL_MIN,
+                 pool_max: int = POOL_MAX, **connect_kwargs):
+        """
+        Args:
+            dbapi_name: DB-API модуль драйвера
+            pool_min, pool_max: размер пула
+            connect_kwargs: параметры подключения (по умолчанию PG_CONFIG)
+        """
+        self.pool = adbapi.ConnectionPool(
+            dbapi_name,
+            cp_min=pool_min,
+            cp_max=pool_max,
+            cp_reconnect=True,   # Переподключение при обрыве соединения
+            cp_noisy=False,
+            **(connect_kwargs or PG_CONFIG)
+        )
+        # Запросы написаны с %s; для драйверов с "?" (sqlite3) плейсхолдеры заменяются
+        self._qmark = self.pool.dbapi.paramstyle == "qmark"
+        self.backend = BACKENDS.get(dbapi_name, "postgres")
+        self._injury_tables_ready = False
+
+    def close(self):
+        """Закрытие пула"""
+        self.pool.close()
+        logging.info("Пул соединений с БД закрыт")
+
+    # ------------------------------------------------------------------
+    # Выполнение
+    # ------------------------------------------------------------------
+
+    def _sql(self, query: str) -> str:
+        return query.replace("%s", "?") if self._qmark else query
+
+    def _run(self, call: str, interaction, *args, default=None, error: str = ""):
+        """
+        Выполнение interaction(cursor, *args) в потоке пула: транзакция фиксируется,
+        если функция завершилась без исключения, иначе откатывается.
+        """
+        def timed(cursor):
+            with metrics.timer("db_query_seconds", db="postgres_async", call=call):
+                return interaction(cursor, *args)
+
+        def failed(failure):
+            logging.error(f"{error or call}: {failure.getErrorMessage()}")
+            return default
+
+        return self.pool.runInteraction(timed).addErrback(failed)
+
+    @staticmethod
+    def _chunks(items: List, size: int = BULK_CHUNK_SIZE):
+        for i in range(0, len(items), size):
+            yield items[i:i + size]
+
+    # ------------------------------------------------------------------
+    # Методы Database
+    # ------------------------------------------------------------------
+
+    def get_team_url(self, team_name: str):
+        """URL команды по названию -> Deferred[Optional[str]]"""
+        def interaction(cursor):
+            cursor.execute(self._sql("SELECT team_url FROM teams WHERE team_name = %s"), (team_name,))
+            result = cursor.fetchone()
+            return result[0] if result else None
+
+        return self._run("get_team_url", interaction,
+                         error=f"Ошибка получения URL команды {team_name}")
+
+    def get_all_teams(self):
+        """Все команды -> Deferred[List[(название_команды, url)]]"""
+        def interaction(cursor):
+            cursor.execute("SELECT team_name, team_url FROM teams ORDER BY team_name")
+            return [tuple(row) for row in cursor.fetchall()]
+
+        return self._run("get_all_teams", interaction, default=[],
+                         error="Ошибка получения списка команд")
+
+    def add_team(self, team_name: str, team_url: str):
+        """Добавление/обновление команды -> Deferred[bool]"""
+        def interaction(cursor):
+            cursor.execute(self._sql(
+                "INSERT INTO teams (team_name, team_url) VALUES (%s, %s) "
+                "ON CONFLICT (team_name) DO UPDATE SET team_url = EXCLUDED.team_url"
+            ), (team_name, team_url))
+            logging.info(f"Команда {team_name} добавлена/обновлена")
+            return True
+
+        return self._run("add_team", interaction, default=False,
+                         error=f"Ошибка добавления команды {team_name}")
+
+    def update_team_url(self, team_name: str, new_url: str):
+        """Обновление URL команды -> Deferred[bool]"""
+        def interaction(cursor):
+            cursor.execute(self._sql("UPDATE teams SET team_url = %s WHERE team_name = %s"),
+                           (new_url, team_name))
+            logging.info(f"URL команды {team_name} обновлен")
+            return True
+
+        return self._run("update_team_url", interaction, default=False,
+                         error=f"Ошибка обновления URL команды {team_name}")
+
+    def delete_team(self, team_name: str):
+        """Удаление команды -> Deferred[bool]"""
+        def interaction(cursor):
+            cursor.execute(self._sql("DELETE FROM teams WHERE team_name = %s"), (team_name,))
+            logging.info(f"Команда {team_name} удалена")
+            return True
+
+        return self._run("delete_team", interaction, default=False,
+                         error=f"Ошибка удаления команды {team_name}")
+
+    def team_exists(self, team_name: str):
+        """Есть ли команда в базе -> Deferred[bool]"""
+        def interaction(cursor):
+            cursor.execute(self._sql("SELECT 1 FROM teams WHERE team_name = %s"), (team_name,))
+            return cursor.fetchone() is not None
+
+        return self._run("team_exists", interaction, default=False,
+                         error=f"Ошибка проверки существования команды {team_name}")
+
+    # ------------------------------------------------------------------
+    # Пакетные методы
+    # ------------------------------------------------------------------
+
+    def _select_by_names(self, cursor, columns: str, team_names: List[str]) -> List[Tuple]:
+        rows = []
+        for chunk in self._chunks(team_names):
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(self._sql(f"SELECT {columns} FROM teams WHERE team_name IN ({placeholders})"),
+                           tuple(chunk))
+            rows.extend(cursor.fetchall())
+        return rows
+
+    def get_team_urls(self, team_names: Iterable[str]):
+        """URL набора команд -> Deferred[Dict[название, url]] (ненайденных в словаре нет)"""
+        team_names = list(dict.fromkeys(team_names))
+
+        def interaction(cursor) -> Dict[str, str]:
+            return {name: url for name, url in self._select_by_names(cursor, "team_name, team_url", team_names)}
+
+        return self._run("get_team_urls", interaction, default={},
+                         error=f"Ошибка получения URL {len(team_names)} команд")
+
+    def existing_teams(self, team_names: Iterable[str]):
+        """Какие из команд есть в базе -> Deferred[Set[str]]"""
+        team_names = list(dict.fromkeys(team_names))
+
+        def interaction(cursor) -> Set[str]:
+            return {row[0] for row in self._select_by_names(cursor, "team_name", team_names)}
+
+        return self._run("existing_teams", interaction, default=set(),
+                         error=f"Ошибка проверки {len(team_names)} команд")
+
+    def add_teams(self, teams: Iterable[Tuple[str, str]]):
+        """
+        Добавление/обновление набора команд [(название, url), ...] одной транзакцией
+        -> Deferred[int] (сколько записано; 0 при ошибке - транзакция откатывается целиком)
+        """
+        # Последний URL команды побеждает, как при последовательных add_team
+        teams = list(dict(teams).items())
+
+        def interaction(cursor) -> int:
+            query = self._sql(
+                "INSERT INTO teams (team_name, team_url) VALUES (%s, %s) "
+                "ON CONFLICT (team_name) DO UPDATE SET team_url = EXCLUDED.team_url"
+            )
+            for chunk in self._chunks(teams):
+                cursor.executemany(query, chunk)
+            logging.info(f"Команд добавлено/обновлено: {len(teams)}")
+            return len(teams)
+
+        return self._run("add_teams", interaction, default=0,
+                         error=f"Ошибка добавления {len(teams)} команд")
+
+    # ------------------------------------------------------------------
+    # Травмы
+    # ------------------------------------------------------------------
+
+    def write_injuries(self, rows: List[Tuple]):
+        """
+        Пакетная запись строк injury_db.injury_rows() одной транзакцией (таблица
+        создается при первой записи) -> Deferred[int] (записано строк; 0 при ошибке)
+        """
+        def interaction(cursor) -> int:
+            if not self._injury_tables_ready:
+                create_injury_tables(cursor, self.backend)
+            return write_injury_rows(cursor, self.backend, rows)
+
+        def written(count):
+            if count:
+                self._injury_tables_ready = True
+                logging.info(f"Травм записано в БД: {count}")
+            return count
+
+        if not rows:
+            return defer.succeed(0)
+        return self._run("write_injuries", interaction, default=0,
+                         error=f"Ошибка записи {len(rows)} травм").addCallback(written)
+
+    def injured_players(self, team_name: str, day: Optional[date] = None):
+        """
+        Травмированные игроки команды на дату (по умолчанию сегодня)
+        -> Deferred[List[(player_id, player_name, injury_type, from_date, to_date)]]
+        """
+        params = injured_on_params(team_name, day or date.today())
+
+        def interaction(cursor):
+            cursor.execute(self._sql(INJURED_ON_SQL), params)
+            return [tuple(row) for row in cursor.fetchall()]
+
+        return self._run("injured_players", interaction, default=[],
+                         error=f"Ошибка получения травмированных игроков {team_name}")
+
+
+_shared: Optional[AsyncDatabase] = None
+
+
+def get_async_db() -> AsyncDatabase:
+    """Общий пул процесса (создается при первом обращении)"""
+    global _shared
+    if _shared is None:
+        _shared = AsyncDatabase()
+    return _shared
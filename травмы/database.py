@@ -4,6 +4,18 @@ import psycopg2
 import logging
 from typing import Optional, Tuple, List
 
+from utils import metrics
+
+# Параметры подключения - измените под вашу конфигурацию
+# (общие для Database и пула AsyncDatabase из async_database.py)
+PG_CONFIG = {
+    'database': "sport_db",       # название вашей БД
+    'user': "postgres",           # ваш пользователь
+    'password': "your_password",  # ваш пароль
+    'host': "localhost",
+    'port': "5432",
+}
+
 class Database:
     """Класс для работы с базой данных PostgreSQL"""
     
@@ -12,17 +24,11 @@ class Database:
         self.conn = None
         self.connect()
     
+    @metrics.timed("db_query_seconds", db="postgres", call="connect")
     def connect(self):
         """Установка соединения с базой данных"""
         try:
-            # Параметры подключения - измените под вашу конфигурацию
-            self.conn = psycopg2.connect(
-                database="sport_db",  # название вашей БД
-                user="postgres",      # ваш пользователь
-                password="your_password",  # ваш пароль
-                host="localhost",
-                port="5432"
-            )
+            self.conn = psycopg2.connect(**PG_CONFIG)
             logging.info("Успешное подключение к базе данных")
         except Exception as e:
             logging.error(f"Ошибка подключения к базе данных: {e}")
@@ -34,6 +40,7 @@ class Database:
             self.conn.close()
             logging.info("Соединение с БД закрыто")
     
+    @metrics.timed("db_query_seconds", db="postgres", call="get_team_url")
     def get_team_url(self, team_name: str) -> Optional[str]:
         """
         Получение URL команды по названию
@@ -56,6 +63,7 @@ class Database:
             logging.error(f"Ошибка получения URL команды {team_name}: {e}")
             return None
     
+    @metrics.timed("db_query_seconds", db="postgres", call="get_all_teams")
     def get_all_teams(self) -> List[Tuple[str, str]]:
         """
         Получение всех команд из базы данных
@@ -73,6 +81,7 @@ class Database:
             logging.error(f"Ошибка получения списка команд: {e}")
             return []
     
+    @metrics.timed("db_query_seconds", db="postgres", call="add_team")
     def add_team(self, team_name: str, team_url: str) -> bool:
         """
         Добавление новой команды в базу данных
@@ -98,6 +107,7 @@ class Database:
             self.conn.rollback()
             return False
     
+    @metrics.timed("db_query_seconds", db="postgres", call="update_team_url")
     def update_team_url(self, team_name: str, new_url: str) -> bool:
         """
         Обновление URL команды
@@ -123,6 +133,7 @@ class Database:
             self.conn.rollback()
             return False
     
+    @metrics.timed("db_query_seconds", db="postgres", call="delete_team")
     def delete_team(self, team_name: str) -> bool:
         """
         Удаление команды из базы данных
@@ -147,6 +158,7 @@ class Database:
             self.conn.rollback()
             return False
     
+    @metrics.timed("db_query_seconds", db="postgres", call="team_exists")
     def team_exists(self, team_name: str) -> bool:
         """
         Проверка существования команды в базе данных
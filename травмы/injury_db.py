@@ -0,0 +1,177 @@
+# injury_db.py
+"""
+Травмы в базе данных: таблица injuries и пакетная запись результатов паука.
+
+Паук травм копит записи за обход команды и в конце одной транзакцией пишет их
+через пул AsyncDatabase (async_database.py):
+    PostgreSQL     - COPY во временную таблицу, затем INSERT ... ON CONFLICT из нее;
+    MySQL/SQLite   - многострочные INSERT пачками по INSERT_CHUNK_ROWS.
+Ключ - (player_id, from_date, injury_type): повторный обход не дублирует травму, а
+обновляет дату окончания, дни и пропущенные матчи (незакрытая травма закрывается).
+
+Кто травмирован в команде на дату - индексный запрос (INJURED_ON_SQL) вместо
+обхода папок injuries/.
+"""
+
+import csv
+import io
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from utils.injury_store import OPEN_INJURY_MAX_DAYS, parse_injury_date, player_key
+
+INSERT_CHUNK_ROWS = 100   # Строк в одном INSERT (SQLite: не больше 999 параметров)
+
+INJURY_COLUMNS = ('player_id', 'player_name', 'team_name', 'season', 'injury_type',
+                  'from_date', 'to_date', 'days', 'matches_missed')
+KEY_COLUMNS = ('player_id', 'from_date', 'injury_type')
+UPDATE_COLUMNS = ('player_name', 'team_name', 'season', 'to_date', 'days', 'matches_missed')
+
+# DB-API модуль -> диалект SQL
+BACKENDS = {'psycopg2': 'postgres', 'pymysql': 'mysql', 'MySQLdb': 'mysql', 'sqlite3': 'sqlite'}
+
+_TABLE_COLUMNS_SQL = """
+    player_id BIGINT NOT NULL,
+    player_name VARCHAR(255),
+    team_name VARCHAR(255),
+    season VARCHAR(16),
+    injury_type VARCHAR(255) NOT NULL,
+    from_date DATE NOT NULL,
+    to_date DATE,
+    days INTEGER,
+    matches_missed INTEGER,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (player_id, from_date, injury_type)"""
+
+# SQL для создания таблицы (выполняется автоматически при первой записи)
+CREATE_INJURY_TABLES_SQL = {
+    'postgres': [
+        f"CREATE TABLE IF NOT EXISTS injuries ({_TABLE_COLUMNS_SQL}\n)",
+        "CREATE INDEX IF NOT EXISTS idx_injuries_team_dates ON injuries (team_name, from_date)",
+    ],
+    'sqlite': [
+        f"CREATE TABLE IF NOT EXISTS injuries ({_TABLE_COLUMNS_SQL}\n)",
+        "CREATE INDEX IF NOT EXISTS idx_injuries_team_dates ON injuries (team_name, from_date)",
+    ],
+    # В MySQL нет CREATE INDEX IF NOT EXISTS - индекс в определении таблицы
+    'mysql': [
+        f"CREATE TABLE IF NOT EXISTS injuries ({_TABLE_COLUMNS_SQL},\n"
+        "    INDEX idx_injuries_team_dates (team_name, from_date)\n)",
+    ],
+}
+
+# Травмированные игроки команды на дату: начало не позже даты, конец не раньше
+# (незакрытая травма - не старше OPEN_INJURY_MAX_DAYS, как в utils/injury_store.py)
+INJURED_ON_SQL = (
+    "SELECT player_id, player_name, injury_type, from_date, to_date FROM injuries "
+    "WHERE team_name = %s AND from_date <= %s "
+    "AND (to_date >= %s OR (to_date IS NULL AND from_date >= %s)) "
+    "ORDER BY player_id, from_date"
+)
+
+
+def injury_rows(records: Iterable[Dict]) -> List[Tuple]:
+    """
+    Строки таблицы injuries из записей паука (игрок со списком injuries).
+    Травмы без разобранной даты начала пропускаются; дубли по ключу - последняя запись.
+    """
+    rows = {}
+    for record in records:
+        player_id = player_key(record.get('player_url')) or str(record.get('player_id') or '')
+        if not player_id.isdigit():
+            continue
+        for injury in record.get('injuries') or []:
+            start = parse_injury_date(injury.get('from_date'))
+            if start is None or not injury.get('injury_type'):
+                continue
+            end = parse_injury_date(injury.get('to_date'))
+            row = (
+                int(player_id),
+                record.get('player_name'),
+                record.get('team'),
+                injury.get('season'),
+                injury['injury_type'],
+                start.isoformat(),
+                end.isoformat() if end else None,
+                injury.get('days') or 0,
+                injury.get('matches_missed') or 0,
+            )
+            rows[(row[0], row[5], row[4])] = row
+    return list(rows.values())
+
+
+def create_injury_tables(cursor, backend: str) -> None:
+    for statement in CREATE_INJURY_TABLES_SQL[backend]:
+        cursor.execute(statement)
+
+
+def _copy_rows(cursor, rows: List[Tuple]) -> None:
+    """PostgreSQL: COPY во временную таблицу и upsert из нее одним запросом"""
+    columns = ", ".join(INJURY_COLUMNS)
+    cursor.execute("CREATE TEMP TABLE injuries_staging "
+                   "(LIKE injuries INCLUDING DEFAULTS) ON COMMIT DROP")
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)  # None -> пустое поле -> NULL в формате CSV
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY injuries_staging ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in UPDATE_COLUMNS)
+    cursor.execute(
+        f"INSERT INTO injuries ({columns}) SELECT {columns} FROM injuries_staging "
+        f"ON CONFLICT ({', '.join(KEY_COLUMNS)}) DO UPDATE SET {updates}, updated_at = CURRENT_TIMESTAMP"
+    )
+
+
+def _insert_rows(cursor, backend: str, rows: List[Tuple]) -> None:
+    """MySQL/SQLite: многострочные INSERT с обновлением по ключу"""
+    placeholder = "?" if backend == 'sqlite' else "%s"
+    row_sql = "(" + ", ".join([placeholder] * len(INJURY_COLUMNS)) + ")"
+    if backend == 'mysql':
+        updates = ", ".join(f"{column} = VALUES({column})" for column in UPDATE_COLUMNS)
+        conflict = f"ON DUPLICATE KEY UPDATE {updates}, updated_at = CURRENT_TIMESTAMP"
+    else:
+        updates = ", ".join(f"{column} = excluded.{column}" for column in UPDATE_COLUMNS)
+        conflict = f"ON CONFLICT ({', '.join(KEY_COLUMNS)}) DO UPDATE SET {updates}, updated_at = CURRENT_TIMESTAMP"
+
+    for i in range(0, len(rows), INSERT_CHUNK_ROWS):
+        chunk = rows[i:i + INSERT_CHUNK_ROWS]
+        cursor.execute(
+            f"INSERT INTO injuries ({', '.join(INJURY_COLUMNS)}) VALUES "
+            f"{', '.join([row_sql] * len(chunk))} {conflict}",
+            tuple(value for row in chunk for value in row)
+        )
+
+
+def write_injury_rows(cursor, backend: str, rows: List[Tuple]) -> int:
+    """Запись строк injury_rows() в рамках текущей транзакции; возвращает число строк"""
+    if not rows:
+        return 0
+    if backend == 'postgres':
+        _copy_rows(cursor, rows)
+    else:
+        _insert_rows(cursor, backend, rows)
+    return len(rows)
+
+
+def injured_on_params(team_name: str, day: date) -> Tuple:
+    """Параметры INJURED_ON_SQL"""
+    oldest_open = day - timedelta(days=OPEN_INJURY_MAX_DAYS)
+    return team_name, day.isoformat(), day.isoformat(), oldest_open.isoformat()
+
+
+class InjuryWriter:
+    """Буфер записей паука за обход; flush - одна пакетная транзакция через AsyncDatabase"""
+
+    def __init__(self):
+        self.records: List[Dict] = []
+
+    def add(self, record: Dict) -> None:
+        self.records.append(record)
+
+    def flush(self, db):
+        """
+        Запись накопленного в базу -> Deferred[int] (записано строк; при ошибке 0,
+        буфер очищается в любом случае - травмы остаются в JSON и хранилище травм)
+        """
+        rows = injury_rows(self.records)
+        self.records = []
+        return db.write_injuries(rows)
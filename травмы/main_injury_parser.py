@@ -4,8 +4,12 @@
 ГЛАВНЫЙ МОДУЛЬ ПАРСЕРА ТРАВМ TRANSFERMARKT
 ===========================================
 Собирает историю травм футболистов из указанных команд
+
+--incremental: загружаются только новые в составе игроки, игроки с незакрытой или
+недавней травмой и записи старше --ttl-days (utils/injury_crawl_state.py)
 """
 
+import argparse
 import json
 import logging
 import os
@@ -17,7 +21,9 @@ from datetime import datetime
 from twisted.internet import reactor, defer
 from scrapy.crawler import CrawlerRunner
 from scrapy.utils.log import configure_logging
-from database import Database
+from async_database import get_async_db
+from utils.catalog import KIND_UPCOMING, find_artifacts
+from utils.injury_crawl_state import REFRESH_TTL_DAYS, InjuryCrawlState
 from utils.logger import setup_logger
 from scraper.transfermarkt_injury_spider import TransfermarktInjurySpider
 from scraper.base_scraper import BaseScraper
@@ -79,28 +85,18 @@ def log_failed_team(team_name, error_msg):
         logging.error(f"Не удалось записать в лог ошибок: {str(e)}")
 
 def get_team_url_from_db(team_name):
-    """Получает URL команды из базы данных"""
-    db = Database()
-    try:
-        with db.conn.cursor() as cursor:
-            cursor.execute(
-                "SELECT team_url FROM Teams WHERE team_name = %s",
-                (team_name,)
-            )
-            team = cursor.fetchone()
-            
-            if not team:
-                logging.error(f"Команда '{team_name}' не найдена в базе данных")
-                return None
-            
-            logging.info(f"Найден URL команды: {team[0]}")
-            return team[0]
-            
-    except Exception as e:
-        logging.error(f"Ошибка получения URL команды: {str(e)}")
-        return None
-    finally:
-        db.close()
+    """
+    Получает URL команды из базы данных.
+    Возвращает Deferred: запрос выполняется в пуле соединений, реактор не блокируется.
+    """
+    def found(team_url):
+        if not team_url:
+            logging.error(f"Команда '{team_name}' не найдена в базе данных")
+            return None
+        logging.info(f"Найден URL команды: {team_url}")
+        return team_url
+
+    return get_async_db().get_team_url(team_name).addCallback(found)
 
 def get_all_matches_from_competitions():
     """Собирает все матчи из папки competitions"""
@@ -110,20 +106,17 @@ def get_all_matches_from_competitions():
         logging.error(f"Папка {COMPETITIONS_DIR} не существует")
         return all_matches
     
-    for root, dirs, files in os.walk(COMPETITIONS_DIR):
-        for filename in files:
-            if filename.endswith('.json') and 'upcoming_matches' in filename:
-                file_path = os.path.join(root, filename)
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
+    for file_path in find_artifacts(COMPETITIONS_DIR, KIND_UPCOMING):
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            
+            for match in data.get('matches', []):
+                all_matches.append(match)
+                logging.info(f"Матч: {match['home_team']} vs {match['away_team']}")
                     
-                    for match in data.get('matches', []):
-                        all_matches.append(match)
-                        logging.info(f"Матч: {match['home_team']} vs {match['away_team']}")
-                            
-                except Exception as e:
-                    logging.error(f"Ошибка чтения {filename}: {str(e)}")
+        except Exception as e:
+            logging.error(f"Ошибка чтения {os.path.basename(file_path)}: {str(e)}")
     
     logging.info(f"Всего матчей: {len(all_matches)}")
     return all_matches
@@ -133,9 +126,10 @@ def get_all_matches_from_competitions():
 # =============================================================================
 
 @defer.inlineCallbacks
-def process_team_injuries(team_name, match_folder, runner, retry_count=0):
+def process_team_injuries(team_name, match_folder, runner, retry_count=0, incremental_ttl=None):
     """
     Асинхронно обрабатывает травмы игроков одной команды
+    (incremental_ttl - TTL записей в днях для инкрементального режима, None - все игроки)
     """
     logging.info(f"{'='*40}")
     logging.info(f"ОБРАБОТКА ТРАВМ КОМАНДЫ: {team_name}")
@@ -151,7 +145,7 @@ def process_team_injuries(team_name, match_folder, runner, retry_count=0):
             time.sleep(delay)
             
             # Получаем URL команды
-            team_url = get_team_url_from_db(team_name)
+            team_url = yield get_team_url_from_db(team_name)
             if not team_url:
                 error_msg = "URL команды не найден в базе данных"
                 log_failed_team(team_name, error_msg)
@@ -178,6 +172,17 @@ def process_team_injuries(team_name, match_folder, runner, retry_count=0):
                         log_failed_team(team_name, "Нет URL травм после всех попыток")
                         defer.returnValue(False)
 
+                if incremental_ttl is not None:
+                    # Состояние перечитывается: его обновил паук предыдущей команды
+                    total_urls = len(injury_urls)
+                    injury_urls, reasons = InjuryCrawlState().select(injury_urls, ttl_days=incremental_ttl)
+                    logging.info(f"Инкрементально: к загрузке {len(injury_urls)} из {total_urls} "
+                                 f"(новые {reasons['new']}, незакрытые {reasons['open']}, "
+                                 f"недавние {reasons['recent']}, устаревшие {reasons['stale']})")
+                    if not injury_urls:
+                        logging.info(f"✅ Травмы команды {team_name} актуальны")
+                        defer.returnValue(True)
+
                 # Сохраняем URL травм во временный файл
                 if save_injury_urls_to_json(injury_urls):
                     # Запускаем Scrapy паука для парсинга травм
@@ -221,7 +226,7 @@ def process_team_injuries(team_name, match_folder, runner, retry_count=0):
     defer.returnValue(False)
 
 @defer.inlineCallbacks
-def process_match_injuries(match, match_index, runner):
+def process_match_injuries(match, match_index, runner, incremental_ttl=None):
     """
     Асинхронно обрабатывает травмы игроков для одного матча
     """
@@ -240,14 +245,14 @@ def process_match_injuries(match, match_index, runner):
     
     # Обрабатываем домашнюю команду
     logging.info(f"\n🏠 ДОМАШНЯЯ КОМАНДА: {home_team}")
-    success_home = yield process_team_injuries(home_team, match_folder, runner)
+    success_home = yield process_team_injuries(home_team, match_folder, runner, incremental_ttl=incremental_ttl)
     
     if success_home:
         time.sleep(random.uniform(2, 5))
     
     # Обрабатываем гостевую команду
     logging.info(f"\n✈️ ГОСТЕВАЯ КОМАНДА: {away_team}")
-    success_away = yield process_team_injuries(away_team, match_folder, runner)
+    success_away = yield process_team_injuries(away_team, match_folder, runner, incremental_ttl=incremental_ttl)
     
     if success_home and success_away:
         logging.info(f"\n✅ МАТЧ #{match_index} ПОЛНОСТЬЮ ОБРАБОТАН")
@@ -265,9 +270,12 @@ def process_match_injuries(match, match_index, runner):
 # =============================================================================
 
 @defer.inlineCallbacks
-def main():
+def main(incremental_ttl=None):
     """
     ГЛАВНАЯ ФУНКЦИЯ ПАРСЕРА ТРАВМ
+    
+    Аргументы:
+        incremental_ttl (int): инкрементальный режим с TTL записей в днях (None - все игроки)
     """
     if sys.platform.startswith('win'):
         sys.stdout.reconfigure(encoding='utf-8')
@@ -298,7 +306,7 @@ def main():
     
     for i, match in enumerate(all_matches, 1):
         try:
-            success = yield process_match_injuries(match, i, runner)
+            success = yield process_match_injuries(match, i, runner, incremental_ttl)
             if success:
                 successful_matches += 1
             
@@ -327,8 +335,15 @@ def main():
     reactor.stop()
 
 if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Парсер травм Transfermarkt")
+    arg_parser.add_argument("--incremental", action="store_true",
+                            help="загружать только новых игроков, незакрытые/недавние травмы и устаревшие записи")
+    arg_parser.add_argument("--ttl-days", type=int, default=REFRESH_TTL_DAYS,
+                            help="в --incremental: через сколько дней загружать игрока заново")
+    args = arg_parser.parse_args()
+    
     try:
-        main()
+        main(args.ttl_days if args.incremental else None)
         reactor.run()
     except KeyboardInterrupt:
         logging.info("\n⚠️ Программа остановлена пользователем")
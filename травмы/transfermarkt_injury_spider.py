@@ -8,6 +8,16 @@ from scrapy.exceptions import CloseSpider
 from fake_useragent import UserAgent
 from scrapy import Request
 
+from utils import metrics
+from utils.injury_crawl_state import InjuryCrawlState
+from utils.injury_store import InjuryStore, player_key
+from injury_db import InjuryWriter
+
+try:
+    from async_database import get_async_db
+except ImportError:  # Нет драйвера PostgreSQL - травмы только в JSON и хранилище травм
+    get_async_db = None
+
 class TransfermarktInjurySpider(scrapy.Spider):
     """Парсер истории травм игроков с Transfermarkt"""
     
@@ -35,12 +45,19 @@ class TransfermarktInjurySpider(scrapy.Spider):
         'USER_AGENT': UserAgent().random,
         'COOKIES_ENABLED': True,
         'COOKIES_DEBUG': False,
+        # Запись/воспроизведение ответов (HTTP_REPLAY_MODE, см. utils/http_replay.py)
+        'DOWNLOADER_MIDDLEWARES': {'utils.http_replay.ReplayDownloaderMiddleware': 950},
+        # Задержки, коды ответов и повторы по командам (см. scraper/crawl_stats.py)
+        'EXTENSIONS': {'scraper.crawl_stats.CrawlStatsExtension': 500},
     }
     
     def __init__(self, team_name=None, match_folder=None, *args, **kwargs):
         super(TransfermarktInjurySpider, self).__init__(*args, **kwargs)
         self.team_name = team_name 
         self.match_folder = match_folder
+        self.injury_store = InjuryStore()  # Травмы с разобранными датами для готовности игроков
+        self.crawl_state = InjuryCrawlState()  # Хэши таблиц для инкрементального режима
+        self.injury_writer = InjuryWriter()  # Травмы обхода - в БД одной транзакцией при закрытии
         self.ua = UserAgent()
         self.logger.info(f"Паук травм инициализирован для команды: {team_name}")
         self.logger.info(f"Папка для сохранения: {match_folder}")
@@ -72,8 +89,12 @@ class TransfermarktInjurySpider(scrapy.Spider):
             self.logger.error(f"Ошибка загрузки URL: {str(e)}")
             raise CloseSpider('Ошибка в стартовых URL')
 
+    @metrics.timed("spider_parse_seconds", spider="transfermarkt_injury_spider")
     def parse(self, response):
         """Обработка страницы травм игрока"""
+        metrics.inc("spider_responses_total", spider=self.name, status=response.status)
+        if response.meta.get('download_latency') is not None:
+            metrics.observe("spider_download_seconds", response.meta['download_latency'], spider=self.name)
         if response.status != 200:
             self.logger.error(f"Ошибка {response.status}: {response.url}")
             return
@@ -81,8 +102,8 @@ class TransfermarktInjurySpider(scrapy.Spider):
         try:
             self.logger.info(f"Парсим травмы игрока: {response.url}")
             
-            # Извлекаем ID игрока из URL
-            player_id = response.url.split('/')[-1].split('?')[0]
+            # ID игрока из URL (.../verletzungen/spieler/{id}/plus/1 - последний сегмент не ID)
+            player_id = player_key(response.url) or response.url.split('/')[-1].split('?')[0]
             
             injury_data = {
                 'player_name': self.parse_player_name(response),
@@ -95,7 +116,12 @@ class TransfermarktInjurySpider(scrapy.Spider):
                 'team': self.team_name
             }
 
-            self.save_injury_data(injury_data)
+            with metrics.timer("spider_save_seconds", spider=self.name):
+                self.save_injury_data(injury_data)
+                self.injury_store.append([injury_data])
+            self.injury_writer.add(injury_data)
+            if not self.crawl_state.record(player_id, injury_data['injuries'], self.team_name):
+                self.logger.info(f"  Таблица травм не изменилась: {injury_data['player_name']}")
 
         except Exception as e:
             self.logger.error(f"Ошибка парсинга травм {response.url}: {str(e)}")
@@ -246,4 +272,18 @@ class TransfermarktInjurySpider(scrapy.Spider):
             self.logger.info(f"  Пропущено матчей: {injury_data['total_matches_missed']}")
 
         except Exception as e:
-            self.logger.error(f"Ошибка сохранения в {file_name}: {str(e)}")
\ No newline at end of file
+            self.logger.error(f"Ошибка сохранения в {file_name}: {str(e)}")
+
+    def closed(self, reason):
+        """
+        Состояние инкрементального парсинга и травмы в БД - одной записью после всех
+        страниц команды (Deferred записи в БД Scrapy дожидается перед остановкой)
+        """
+        try:
+            self.crawl_state.save()
+        except OSError as e:
+            self.logger.error(f"Не удалось сохранить состояние парсинга травм: {str(e)}")
+
+        if get_async_db is None or not self.injury_writer.records:
+            return None
+        return self.injury_writer.flush(get_async_db())
\ No newline at end of file